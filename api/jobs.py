@@ -0,0 +1,79 @@
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import JSONResponse
+from typing import Optional
+import os
+
+from api.multimodal_reasoning import TactileMode, build_unified_request, run_unified_request
+from services.job_queue import get_job_queue, JobQueueFullError
+from services.metrics import observe_request_parsing
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+
+# Longest long-poll (seconds); keep below client timeouts (the frontend uses 60 s)
+JOB_MAX_WAIT = float(os.getenv("JOB_MAX_WAIT", "30"))
+
+@router.post("/unified-analysis")
+async def submit_unified_analysis(
+    prompt: str = Form(...),
+    prompt_type: str = Form("Tactile-Text"),
+    tactile_file: Optional[UploadFile] = File(None),
+    image: Optional[UploadFile] = File(None),
+    text_context: Optional[str] = Form(None),
+    add_contextual_info: bool = Form(False),
+    use_cache: bool = Form(True),
+    tactile_mode: TactileMode = Form("raw")
+):
+    """
+    Queue a unified multimodal analysis and return its job id immediately.
+    Uploads are read before the job is queued, so the job does not depend on the request.
+    """
+    observe_request_parsing()
+    try:
+        request = await build_unified_request(
+            prompt, prompt_type, tactile_file, image, text_context, add_contextual_info, tactile_mode
+        )
+    except Exception as e:
+        return {"success": False, "error": f"Processing failed: {str(e)}"}
+
+    async def run():
+        response = await run_unified_request(request, use_cache)
+        return response.dict()
+
+    try:
+        job = get_job_queue().submit("unified-analysis", run)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/jobs/{job.id}",
+        "result_url": f"/api/jobs/{job.id}/result"
+    }
+
+@router.get("/stats")
+async def get_job_stats():
+    """Get job queue depth, outcomes and queue/run timing"""
+    try:
+        return {"success": True, "jobs": get_job_queue().get_stats()}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str, wait: float = 0):
+    """Job status; with wait > 0, long-poll up to that many seconds (capped at JOB_MAX_WAIT) for completion"""
+    job = await get_job_queue().wait(job_id, min(max(wait, 0), JOB_MAX_WAIT))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return {"success": True, "job": job.to_dict(include_result=job.finished)}
+
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: str, wait: float = 0):
+    """Job result once finished; 202 with the current status while it is still queued or running"""
+    job = await get_job_queue().wait(job_id, min(max(wait, 0), JOB_MAX_WAIT))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if not job.finished:
+        return JSONResponse(status_code=202, content={"success": True, "job": job.to_dict()})
+    return {"success": True, "job": job.to_dict(include_result=True)}
@@ -1,26 +1,43 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from fastapi.responses import JSONResponse
-from typing import Optional, List, Dict, Any
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Optional, List, Dict, Any, Literal, Tuple, get_args
 from pydantic import BaseModel
+import asyncio
 import json
 import os
+import uuid
+from contextlib import aclosing
 import aiofiles
 
-from services.gpt_integration import GPTService
+from services.gpt_integration import get_gpt_service
 from services.prompt_engineering import PromptEngineer, TaskType, ModalityType
+from services.tactile_features import summarize_tactile, get_feature_cache_stats
+from services.shared_cache import get_shared_cache
+from services.tactile_downsampling import downsample_tactile
+from services.tactile_binary import is_binary_tactile, summarize_binary_tactile
+from services.tactile_streaming import (
+    StreamingTactileParser, StreamingTactileSummary, TactileTooLargeError, TACTILE_MAX_UPLOAD_BYTES
+)
+from services.metrics import stage_timer, observe_request_parsing
 
 router = APIRouter(prefix="/api/multimodal", tags=["multimodal"])
 
 # Initialize services
-gpt_service = GPTService()
+gpt_service = get_gpt_service()
 prompt_engineer = PromptEngineer()
 
+# "raw" embeds the tactile file as-is; "features" sends a compact numeric feature summary;
+# "downsampled" sends each channel reduced to fit TACTILE_TOKEN_BUDGET (anything else is a 422)
+TactileMode = Literal["raw", "features", "downsampled"]
+
 # Pydantic models for request/response
 class MultimodalRequest(BaseModel):
     prompt: str
     tactile_data: Optional[str] = None
     text_context: Optional[str] = None
     prompt_type: Optional[str] = "tactile-text"
+    use_cache: Optional[bool] = True
+    tactile_mode: TactileMode = "raw"
 
 class MultimodalResponse(BaseModel):
     success: bool
@@ -28,10 +45,13 @@ class MultimodalResponse(BaseModel):
     error: Optional[str] = None
     prompt_used: Optional[str] = None
     model_info: Optional[Dict[str, Any]] = None
+    cached: Optional[bool] = None
+    tactile_info: Optional[Dict[str, Any]] = None
 
 class FewShotRequest(BaseModel):
     examples: List[Dict[str, Any]]
     current_input: Dict[str, Any]
+    use_cache: Optional[bool] = True
 
 class TemplateRequest(BaseModel):
     name: str
@@ -42,64 +62,157 @@ class TemplateRequest(BaseModel):
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Tactile uploads up to this size are parsed in memory; larger JSON/CSV uploads in features/downsampled
+# mode are parsed incrementally, anything else is spooled to UPLOAD_DIR
+TACTILE_SPOOL_THRESHOLD = int(os.getenv("TACTILE_SPOOL_THRESHOLD", str(8 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+TACTILE_MODES = get_args(TactileMode)
+
+def unique_upload_path(filename: Optional[str], file_prefix: str = "file") -> str:
+    """Build a collision-free path in UPLOAD_DIR, keeping the original extension"""
+    file_extension = os.path.splitext(filename or "")[1]
+    return os.path.join(UPLOAD_DIR, f"{file_prefix}_{uuid.uuid4().hex}{file_extension}")
+
 async def save_upload_file(upload_file: UploadFile, file_prefix: str = "file") -> str:
     """Save uploaded file and return the file path"""
-    file_extension = os.path.splitext(upload_file.filename)[1]
-    file_path = os.path.join(UPLOAD_DIR, f"{file_prefix}_{upload_file.filename}")
+    file_path = unique_upload_path(upload_file.filename, file_prefix)
     
     async with aiofiles.open(file_path, 'wb') as f:
-        content = await upload_file.read()
-        await f.write(content)
+        while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
     
     return file_path
 
-async def read_tactile_file(file_path: str) -> str:
-    """Read and parse tactile data file"""
+def format_tactile_content(content: bytes, tactile_mode: str = "raw") -> Tuple[str, Dict[str, Any]]:
+    """Format tactile file content for the prompt; returns (text, info about how it was reduced)"""
+    if tactile_mode == "features":
+        summary = summarize_tactile(content)
+        if summary is not None:
+            return f"Tactile features (summary): {summary}", {"mode": "features"}
+    elif tactile_mode == "downsampled":
+        reduced = downsample_tactile(content)
+        if reduced is not None:
+            data, counts = reduced
+            return f"Tactile data (downsampled JSON): {data}", {"mode": "downsampled", **counts}
+    # Raw mode, or no numeric channels found: use the content as-is
+    
+    content = content.decode('utf-8')
+    
+    # Try to parse as JSON first
     try:
-        async with aiofiles.open(file_path, 'r', encoding='utf-8') as f:
-            content = await f.read()
-            
-        # Try to parse as JSON first
-        try:
-            data = json.loads(content)
-            return f"Tactile data (JSON): {json.dumps(data, indent=2)}"
-        except json.JSONDecodeError:
-            # If not JSON, treat as plain text
-            return f"Tactile data (Text): {content}"
-            
-    except Exception as e:
-        return f"Error reading tactile file: {str(e)}"
+        data = json.loads(content)
+        return f"Tactile data (JSON): {json.dumps(data, indent=2)}", {"mode": "raw"}
+    except json.JSONDecodeError:
+        # If not JSON, treat as plain text
+        return f"Tactile data (Text): {content}", {"mode": "raw"}
 
-@router.post("/unified-analysis", response_model=MultimodalResponse)
-async def unified_multimodal_analysis(
-    prompt: str = Form(...),
-    prompt_type: str = Form("Tactile-Text"),
-    tactile_file: Optional[UploadFile] = File(None),
-    image: Optional[UploadFile] = File(None),
-    text_context: Optional[str] = Form(None),
-    add_contextual_info: bool = Form(False)
-):
-    """
-    统一的多模态分析端点 - 支持触觉文件、图片和文本的任意组合
+async def read_tactile_file(file_path: str, tactile_mode: str = "raw") -> Tuple[str, Dict[str, Any]]:
+    """Read and parse tactile data file"""
+    async with aiofiles.open(file_path, 'rb') as f:
+        head = await f.read(16)
+        if is_binary_tactile(head, file_path):
+            # Binary recordings are memory-mapped and summarized in chunks off the event loop
+            return await asyncio.to_thread(summarize_binary_tactile, file_path, tactile_mode)
+        content = head + await f.read()
+    
+    return format_tactile_content(content, tactile_mode)
+
+async def stream_tactile_upload(upload_file: UploadFile, chunks: List[bytes], tactile_mode: str) -> Tuple[str, Dict[str, Any]]:
+    """Parse a large JSON/CSV upload chunk by chunk into running aggregates (constant memory)"""
+    parser = StreamingTactileParser(StreamingTactileSummary(tactile_mode))
+    for chunk in chunks:
+        await asyncio.to_thread(parser.feed, chunk)
+    chunks.clear()
+    while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+        await asyncio.to_thread(parser.feed, chunk)
+    summary = await asyncio.to_thread(parser.close)
+    text, info = summary.result()
+    return text, {**info, "format": parser.format}
+
+async def read_tactile_upload(upload_file: UploadFile, tactile_mode: str = "raw") -> Tuple[str, Dict[str, Any]]:
+    """Read and parse a tactile upload in memory, streaming or spooling to disk above TACTILE_SPOOL_THRESHOLD
+
+    Raises TactileTooLargeError for uploads over TACTILE_MAX_UPLOAD_BYTES and ValueError for unreadable files.
     """
+    if upload_file.size is not None and upload_file.size > TACTILE_MAX_UPLOAD_BYTES:
+        raise TactileTooLargeError(f"Tactile upload exceeds the {TACTILE_MAX_UPLOAD_BYTES} byte limit")
+    
     try:
-        # 处理触觉数据
-        tactile_data = None
-        if tactile_file:
-            tactile_file_path = await save_upload_file(tactile_file, "tactile")
-            tactile_data = await read_tactile_file(tactile_file_path)
-            # 处理完后删除临时文件
+        chunks = []
+        size = 0
+        while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > TACTILE_SPOOL_THRESHOLD:
+                break
+        else:
+            content = b"".join(chunks)
+            if is_binary_tactile(content[:16], upload_file.filename):
+                return await asyncio.to_thread(summarize_binary_tactile, content, tactile_mode)
+            return format_tactile_content(content, tactile_mode)
+        
+        if tactile_mode in ("features", "downsampled") and not is_binary_tactile(chunks[0][:16], upload_file.filename):
+            return await stream_tactile_upload(upload_file, chunks, tactile_mode)
+        
+        # Raw text or binary recordings: write what we have plus the rest of the stream to a spill file
+        file_path = unique_upload_path(upload_file.filename, "tactile")
+        try:
+            async with aiofiles.open(file_path, 'wb') as f:
+                for chunk in chunks:
+                    await f.write(chunk)
+                chunks = None
+                while chunk := await upload_file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > TACTILE_MAX_UPLOAD_BYTES:
+                        raise TactileTooLargeError(f"Tactile upload exceeds the {TACTILE_MAX_UPLOAD_BYTES} byte limit")
+                    await f.write(chunk)
+            return await read_tactile_file(file_path, tactile_mode)
+        finally:
             try:
-                os.remove(tactile_file_path)
-            except:
+                os.remove(file_path)
+            except OSError:
                 pass
+    
+    except TactileTooLargeError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Error reading tactile file: {str(e)}") from e
 
-        # 处理图片数据
-        image_bytes = None
-        if image:
+def prepare_tactile_text(tactile_data: Optional[str], tactile_mode: str = "raw") -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+    """Replace inline tactile data with its feature summary or downsampled form when requested"""
+    if tactile_data and tactile_mode in ("features", "downsampled"):
+        with stage_timer("tactile_read"):
+            text, info = format_tactile_content(tactile_data.encode('utf-8'), tactile_mode)
+        if info["mode"] != "raw":
+            return text, info
+    return tactile_data, None
+
+async def build_unified_request(
+    prompt: str,
+    prompt_type: str,
+    tactile_file: Optional[UploadFile],
+    image: Optional[UploadFile],
+    text_context: Optional[str],
+    add_contextual_info: bool,
+    tactile_mode: str = "raw"
+) -> Dict[str, Any]:
+    """Read uploads and build the enhanced prompt shared by the unified endpoints"""
+    # 处理触觉数据
+    tactile_data = None
+    tactile_info = None
+    if tactile_file:
+        with stage_timer("tactile_read"):
+            tactile_data, tactile_info = await read_tactile_upload(tactile_file, tactile_mode)
+
+    # 处理图片数据
+    image_bytes = None
+    if image:
+        with stage_timer("upload_read"):
             image_bytes = await image.read()
 
-        # 构建增强的prompt
+    # 构建增强的prompt
+    with stage_timer("prompt_build"):
         enhanced_prompt = prompt
         
         if tactile_data and "tactile" in prompt_type.lower():
@@ -111,28 +224,73 @@ async def unified_multimodal_analysis(
         if add_contextual_info:
             enhanced_prompt += f"\n\nPlease provide detailed analysis considering all available modalities and their interactions."
 
-        # 根据prompt类型选择处理方式
-        if image_bytes and ("vision" in prompt_type.lower() or "combined" in prompt_type.lower()):
-            # 使用vision模型
-            result = await gpt_service.generate_vision_response(
-                enhanced_prompt, 
-                image_bytes,
-                system_message="You are an advanced multimodal AI assistant specialized in analyzing tactile, visual, and textual information."
-            )
-        else:
-            # 使用文本模型
-            result = await gpt_service.generate_text_response(
-                enhanced_prompt,
-                system_message="You are an advanced multimodal AI assistant specialized in analyzing tactile and textual information."
-            )
+    # 根据prompt类型选择处理方式
+    if image_bytes and ("vision" in prompt_type.lower() or "combined" in prompt_type.lower()):
+        # 使用vision模型
+        return {
+            "prompt": enhanced_prompt,
+            "image_bytes": image_bytes,
+            "system_message": "You are an advanced multimodal AI assistant specialized in analyzing tactile, visual, and textual information.",
+            "tactile_info": tactile_info
+        }
+    # 使用文本模型
+    return {
+        "prompt": enhanced_prompt,
+        "image_bytes": None,
+        "system_message": "You are an advanced multimodal AI assistant specialized in analyzing tactile and textual information.",
+        "tactile_info": tactile_info
+    }
 
-        return MultimodalResponse(
-            success=result["success"],
-            response=result.get("response"),
-            error=result.get("error"),
-            prompt_used=enhanced_prompt,
-            model_info=gpt_service.get_model_info()
+async def run_unified_request(request: Dict[str, Any], use_cache: bool = True) -> MultimodalResponse:
+    """Send a request built by build_unified_request to the text or vision model"""
+    if request["image_bytes"]:
+        result = await gpt_service.generate_vision_response(
+            request["prompt"], 
+            request["image_bytes"],
+            system_message=request["system_message"],
+            use_cache=use_cache
+        )
+    else:
+        result = await gpt_service.generate_text_response(
+            request["prompt"],
+            system_message=request["system_message"],
+            use_cache=use_cache
+        )
+
+    return MultimodalResponse(
+        success=result["success"],
+        response=result.get("response"),
+        error=result.get("error"),
+        prompt_used=request["prompt"],
+        model_info=gpt_service.get_model_info(result.get("model")),
+        cached=result.get("cached", False),
+        tactile_info=request["tactile_info"]
+    )
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Format a Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/unified-analysis", response_model=MultimodalResponse)
+async def unified_multimodal_analysis(
+    prompt: str = Form(...),
+    prompt_type: str = Form("Tactile-Text"),
+    tactile_file: Optional[UploadFile] = File(None),
+    image: Optional[UploadFile] = File(None),
+    text_context: Optional[str] = Form(None),
+    add_contextual_info: bool = Form(False),
+    use_cache: bool = Form(True),
+    tactile_mode: TactileMode = Form("raw")
+):
+    """
+    统一的多模态分析端点 - 支持触觉文件、图片和文本的任意组合
+    """
+    observe_request_parsing()
+    try:
+        request = await build_unified_request(
+            prompt, prompt_type, tactile_file, image, text_context, add_contextual_info, tactile_mode
         )
+        return await run_unified_request(request, use_cache)
 
     except Exception as e:
         return MultimodalResponse(
@@ -140,25 +298,85 @@ async def unified_multimodal_analysis(
             error=f"Processing failed: {str(e)}"
         )
 
+@router.post("/unified-analysis/stream")
+async def unified_multimodal_analysis_stream(
+    prompt: str = Form(...),
+    prompt_type: str = Form("Tactile-Text"),
+    tactile_file: Optional[UploadFile] = File(None),
+    image: Optional[UploadFile] = File(None),
+    text_context: Optional[str] = Form(None),
+    add_contextual_info: bool = Form(False),
+    use_cache: bool = Form(True),
+    tactile_mode: TactileMode = Form("raw")
+):
+    """
+    统一多模态分析的流式版本 (Server-Sent Events)
+    Emits 'delta' events with token chunks, then a final 'done' event with usage and model info.
+    """
+    observe_request_parsing()
+    try:
+        request = await build_unified_request(
+            prompt, prompt_type, tactile_file, image, text_context, add_contextual_info, tactile_mode
+        )
+    except Exception as e:
+        # `e` is unbound once the except block ends, so format the message now
+        error_event = format_sse("error", {"error": f"Processing failed: {str(e)}"})
+        
+        async def error_stream():
+            yield error_event
+        return StreamingResponse(error_stream(), media_type="text/event-stream")
+
+    async def event_stream():
+        # aclosing: when the client disconnects, the upstream stream is closed right away rather than at GC
+        async with aclosing(gpt_service.stream_response(
+            request["prompt"],
+            request["image_bytes"],
+            system_message=request["system_message"],
+            use_cache=use_cache
+        )) as events:
+            async for event in events:
+                if event["type"] == "delta":
+                    yield format_sse("delta", {"content": event["content"]})
+                elif event["type"] == "done":
+                    yield format_sse("done", {
+                        "usage": event["usage"],
+                        "ttft_ms": event["ttft_ms"],
+                        "total_ms": event["total_ms"],
+                        "prompt_used": request["prompt"],
+                        "model_info": gpt_service.get_model_info(event.get("model")),
+                        "cached": event["cached"],
+                        "tactile_info": request["tactile_info"]
+                    })
+                else:
+                    yield format_sse("error", {"error": event["error"]})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # 保留原有的端点以保持兼容性
 @router.post("/tactile-text", response_model=MultimodalResponse)
 async def analyze_tactile_text(request: MultimodalRequest):
     """Analyze tactile and text data combination"""
     try:
-        prompt = prompt_engineer.create_tactile_text_prompt(
-            request.tactile_data or "",
-            request.text_context or "",
-            request.prompt
-        )
+        tactile_data, tactile_info = prepare_tactile_text(request.tactile_data, request.tactile_mode)
+        instruction = request.prompt
+        if request.text_context:
+            instruction += f"\n\nText Context: {request.text_context}"
+        prompt = prompt_engineer.create_tactile_text_prompt(tactile_data or "", instruction)
         
-        result = await gpt_service.generate_text_response(prompt)
+        result = await gpt_service.generate_text_response(prompt, use_cache=request.use_cache)
         
         return MultimodalResponse(
             success=result["success"],
             response=result.get("response"),
             error=result.get("error"),
             prompt_used=prompt,
-            model_info=gpt_service.get_model_info()
+            model_info=gpt_service.get_model_info(result.get("model")),
+            cached=result.get("cached", False),
+            tactile_info=tactile_info
         )
     
     except Exception as e:
@@ -171,9 +389,11 @@ async def analyze_tactile_text(request: MultimodalRequest):
 async def analyze_vision_text(
     prompt: str = Form(...),
     text_context: Optional[str] = Form(None),
-    image: UploadFile = File(...)
+    image: UploadFile = File(...),
+    use_cache: bool = Form(True)
 ):
     """Analyze vision and text data combination"""
+    observe_request_parsing()
     try:
         image_bytes = await image.read()
         
@@ -181,19 +401,21 @@ async def analyze_vision_text(
         if text_context:
             enhanced_prompt += f"\n\nText Context: {text_context}"
         
-        full_prompt = prompt_engineer.create_vision_text_prompt(
-            enhanced_prompt,
-            text_context or ""
-        )
+        with stage_timer("prompt_build"):
+            full_prompt = prompt_engineer.create_vision_text_prompt(
+                enhanced_prompt,
+                text_context or ""
+            )
         
-        result = await gpt_service.generate_vision_response(full_prompt, image_bytes)
+        result = await gpt_service.generate_vision_response(full_prompt, image_bytes, use_cache=use_cache)
         
         return MultimodalResponse(
             success=result["success"],
             response=result.get("response"),
             error=result.get("error"),
             prompt_used=full_prompt,
-            model_info=gpt_service.get_model_info()
+            model_info=gpt_service.get_model_info(result.get("model")),
+            cached=result.get("cached", False)
         )
     
     except Exception as e:
@@ -207,19 +429,24 @@ async def analyze_multimodal_complete(
     prompt: str = Form(...),
     tactile_data: Optional[str] = Form(None),
     text_context: Optional[str] = Form(None),
-    image: Optional[UploadFile] = File(None)
+    image: Optional[UploadFile] = File(None),
+    use_cache: bool = Form(True),
+    tactile_mode: TactileMode = Form("raw")
 ):
     """Complete multimodal analysis with all data types"""
+    observe_request_parsing()
     try:
         image_bytes = None
         if image:
             image_bytes = await image.read()
         
+        tactile_data, tactile_info = prepare_tactile_text(tactile_data, tactile_mode)
         result = await gpt_service.process_multimodal_request(
             prompt=prompt,
             tactile_data=tactile_data,
             image_bytes=image_bytes,
-            text_context=text_context
+            text_context=text_context,
+            use_cache=use_cache
         )
         
         return MultimodalResponse(
@@ -227,7 +454,9 @@ async def analyze_multimodal_complete(
             response=result.get("response"),
             error=result.get("error"),
             prompt_used=prompt,
-            model_info=gpt_service.get_model_info()
+            model_info=gpt_service.get_model_info(result.get("model")),
+            cached=result.get("cached", False),
+            tactile_info=tactile_info
         )
     
     except Exception as e:
@@ -242,14 +471,16 @@ async def few_shot_learning_analysis(request: FewShotRequest):
     try:
         result = await gpt_service.generate_few_shot_response(
             request.examples,
-            request.current_input
+            request.current_input,
+            use_cache=request.use_cache
         )
         
         return MultimodalResponse(
             success=result["success"],
             response=result.get("response"),
             error=result.get("error"),
-            model_info=gpt_service.get_model_info()
+            model_info=gpt_service.get_model_info(result.get("model")),
+            cached=result.get("cached", False)
         )
     
     except Exception as e:
@@ -285,6 +516,66 @@ async def get_model_info():
     """Get current model information"""
     try:
         info = gpt_service.get_model_info()
-        return {"success": True, "model_info": info}
+        return {
+            "success": True,
+            "model_info": info,
+            "stream_stats": gpt_service.get_stream_stats(),
+            "routing_stats": gpt_service.get_routing_stats()
+        }
     except Exception as e:
-        return {"success": False, "error": str(e)} 
\ No newline at end of file
+        return {"success": False, "error": str(e)} 
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Get response cache hit/miss and request coalescing counters"""
+    try:
+        return {
+            "success": True,
+            "cache_stats": gpt_service.get_cache_stats(),
+            "coalescing": gpt_service.get_coalescing_stats(),
+            "tactile_feature_cache": get_feature_cache_stats(),
+            "image_cache": gpt_service.get_image_cache_stats(),
+            "shared_cache": shared_cache.get_stats() if (shared_cache := get_shared_cache()) is not None else None
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@router.get("/image-stats")
+async def get_image_stats():
+    """Get image preprocessing queue depth and wait time"""
+    try:
+        return {"success": True, "image_stats": gpt_service.get_image_stats()}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@router.get("/resilience-stats")
+async def get_resilience_stats():
+    """Get upstream retry, circuit breaker and hedging counters"""
+    try:
+        return {
+            "success": True,
+            "resilience": gpt_service.get_resilience_stats(),
+            "hedging": gpt_service.get_hedging_stats()
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@router.get("/rate-limit-stats")
+async def get_rate_limit_stats():
+    """Get upstream rate limiter queue depth and wait time"""
+    try:
+        return {"success": True, "rate_limit": gpt_service.get_rate_limit_stats()}
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+@router.get("/backend-stats")
+async def get_backend_stats():
+    """Get upstream backend routing, load and health, and record/replay counters"""
+    try:
+        return {
+            "success": True,
+            "backends": gpt_service.get_backend_stats(),
+            "record_replay": gpt_service.get_record_replay_stats()
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
@@ -1,22 +1,32 @@
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+import asyncio
 import json
+import os
 
 from services.prompt_engineering import PromptEngineer
-from services.gpt_integration import GPTService
+from services.gpt_integration import get_gpt_service
+from services.rate_limiting import request_priority, PRIORITY_BATCH
 
 router = APIRouter()
 
 # Initialize services
 prompt_engineer = PromptEngineer()
-gpt_service = GPTService()
+gpt_service = get_gpt_service()
+
+# Batch QA settings
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("QA_BATCH_CONCURRENCY", "5"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("QA_BATCH_MAX_CONCURRENCY", "20"))
+BATCH_QUESTION_TIMEOUT = float(os.getenv("QA_BATCH_QUESTION_TIMEOUT", "60"))
 
 # Pydantic models
 class SingleModalityQARequest(BaseModel):
     question: str
     modality_type: str  # "tactile", "vision", or "text"
     modality_data: str
+    use_cache: Optional[bool] = True
 
 class DualModalityQARequest(BaseModel):
     question: str
@@ -52,7 +62,7 @@ async def single_modality_qa(request: SingleModalityQARequest):
         prompt = prompt_engineer.create_qa_prompt(request.question, modality_data)
         
         # Process with GPT
-        result = await gpt_service.process_qa_request(request.question, modality_data)
+        result = await gpt_service.process_qa_request(request.question, modality_data, request.use_cache)
         
         return QAResponse(
             success=result["success"],
@@ -70,7 +80,8 @@ async def dual_modality_qa(
     question: str = Form(...),
     tactile_data: Optional[str] = Form(None),
     text_data: Optional[str] = Form(None),
-    image: Optional[UploadFile] = File(None)
+    image: Optional[UploadFile] = File(None),
+    use_cache: bool = Form(True)
 ):
     """
     Answer questions using dual modality inputs (combinations of tactile, vision, and text).
@@ -101,7 +112,7 @@ async def dual_modality_qa(
             )
         
         # Process with GPT
-        result = await gpt_service.process_qa_request(question, context_data)
+        result = await gpt_service.process_qa_request(question, context_data, use_cache)
         
         return QAResponse(
             success=result["success"],
@@ -119,7 +130,8 @@ async def multimodal_qa(
     question: str = Form(...),
     tactile_data: str = Form(...),
     text_data: str = Form(...),
-    image: UploadFile = File(...)
+    image: UploadFile = File(...),
+    use_cache: bool = Form(True)
 ):
     """
     Answer questions using all three modalities: tactile, vision, and text.
@@ -141,7 +153,7 @@ async def multimodal_qa(
         }
         
         # Process with GPT
-        result = await gpt_service.process_qa_request(question, context_data)
+        result = await gpt_service.process_qa_request(question, context_data, use_cache)
         
         return QAResponse(
             success=result["success"],
@@ -160,7 +172,8 @@ async def contextual_qa(
     context_instruction: str = Form(...),
     tactile_data: Optional[str] = Form(None),
     text_data: Optional[str] = Form(None),
-    image: Optional[UploadFile] = File(None)
+    image: Optional[UploadFile] = File(None),
+    use_cache: bool = Form(True)
 ):
     """
     Answer questions with additional contextual instructions.
@@ -181,7 +194,8 @@ async def contextual_qa(
         
         if image and image.content_type.startswith('image/'):
             image_data = await image.read()
-            context_data["image"] = image_data
+            # Resize/encode once and reuse the prepared image
+            context_data["image"] = await gpt_service.prepare_image(image_data)
             modalities_used.append("vision")
         
         # Validate that we have at least one modality
@@ -195,7 +209,7 @@ async def contextual_qa(
         enhanced_question = f"{question}\n\nContext Instructions: {context_instruction}"
         
         # Process with GPT
-        result = await gpt_service.process_qa_request(enhanced_question, context_data)
+        result = await gpt_service.process_qa_request(enhanced_question, context_data, use_cache)
         
         return QAResponse(
             success=result["success"],
@@ -265,11 +279,17 @@ async def batch_qa(
     questions_json: str = Form(...),
     tactile_data: Optional[str] = Form(None),
     text_data: Optional[str] = Form(None),
-    image: Optional[UploadFile] = File(None)
+    image: Optional[UploadFile] = File(None),
+    use_cache: bool = Form(True),
+    max_concurrency: int = Form(BATCH_DEFAULT_CONCURRENCY),
+    question_timeout: float = Form(BATCH_QUESTION_TIMEOUT),
+    stream: bool = Form(False)
 ):
     """
     Process multiple questions against the same set of multimodal data.
     Questions should be provided as a JSON array in the questions_json field.
+    Questions run concurrently (bounded by max_concurrency), each with its own timeout.
+    With stream=true, results are returned as NDJSON lines in completion order.
     """
     try:
         # Parse questions from JSON
@@ -295,7 +315,8 @@ async def batch_qa(
         
         if image and image.content_type.startswith('image/'):
             image_data = await image.read()
-            context_data["image"] = image_data
+            # Resize/encode once and reuse the prepared image
+            context_data["image"] = await gpt_service.prepare_image(image_data)
             modalities_used.append("vision")
         
         # Validate that we have at least one modality
@@ -305,16 +326,52 @@ async def batch_qa(
                 detail="At least one modality input is required"
             )
         
-        # Process each question
-        results = []
-        for question in questions:
-            result = await gpt_service.process_qa_request(question, context_data)
-            results.append({
+        # Process questions concurrently with bounded parallelism
+        concurrency = max(1, min(max_concurrency, BATCH_MAX_CONCURRENCY))
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def answer(index: int, question: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    # Batch items yield to interactive requests when the rate limit is saturated
+                    with request_priority(PRIORITY_BATCH):
+                        result = await asyncio.wait_for(
+                            gpt_service.process_qa_request(question, context_data, use_cache),
+                            timeout=question_timeout
+                        )
+                except asyncio.TimeoutError:
+                    result = {"success": False, "error": f"Timed out after {question_timeout}s"}
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+            return {
+                "index": index,
                 "question": question,
                 "success": result["success"],
                 "answer": result.get("response"),
                 "error": result.get("error")
-            })
+            }
+        
+        tasks = [asyncio.ensure_future(answer(i, q)) for i, q in enumerate(questions)]
+        
+        if stream:
+            # Emit each result as an NDJSON line as soon as it completes
+            async def result_stream():
+                try:
+                    for completed in asyncio.as_completed(tasks):
+                        yield json.dumps(await completed, ensure_ascii=False) + "\n"
+                    yield json.dumps({
+                        "done": True,
+                        "modalities_used": modalities_used,
+                        "total_questions": len(questions)
+                    }) + "\n"
+                finally:
+                    for task in tasks:
+                        task.cancel()
+            
+            return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+        
+        # Results keep the input order
+        results = await asyncio.gather(*tasks)
         
         return {
             "success": True,
@@ -324,4 +381,4 @@ async def batch_qa(
         }
     
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
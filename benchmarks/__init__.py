@@ -0,0 +1,4 @@
+"""
+Offline benchmarks: run the API against a local mock OpenAI-compatible server
+to measure this service's own overhead (see benchmarks/run.py)
+"""
@@ -0,0 +1,125 @@
+"""
+Stub OpenAI-compatible chat completions server with configurable latency
+
+    python -m benchmarks.mock_server --port 9100 --latency-ms 100 --tokens 200
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Overridden from the command line
+SETTINGS = {
+    "latency_ms": 100.0,      # time to first token / full non-streamed response
+    "jitter_ms": 0.0,         # uniform +/- jitter added to latency_ms
+    "tokens": 200,            # completion tokens per response
+    "token_delay_ms": 0.0,    # delay between streamed tokens
+    "chunk_tokens": 5         # tokens per streamed chunk
+}
+
+app = FastAPI(title="Mock OpenAI-compatible server")
+
+STATS = {"requests": 0, "streamed": 0, "request_bytes": 0}
+
+def _latency() -> float:
+    jitter = SETTINGS["jitter_ms"]
+    return max(0.0, SETTINGS["latency_ms"] + random.uniform(-jitter, jitter)) / 1000
+
+def _usage(body: Dict[str, Any]) -> Dict[str, int]:
+    # Roughly 4 characters per token, like services.rate_limiting.estimate_tokens
+    prompt_tokens = len(json.dumps(body.get("messages", []))) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": SETTINGS["tokens"],
+        "total_tokens": prompt_tokens + SETTINGS["tokens"]
+    }
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    raw = await request.body()
+    body = json.loads(raw)
+    STATS["requests"] += 1
+    STATS["request_bytes"] += len(raw)
+    model = body.get("model", "mock")
+    words = ["tok"] * SETTINGS["tokens"]
+
+    if not body.get("stream"):
+        await asyncio.sleep(_latency())
+        return JSONResponse({
+            "id": f"mock-{STATS['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop"
+            }],
+            "usage": _usage(body)
+        })
+
+    STATS["streamed"] += 1
+
+    async def events():
+        await asyncio.sleep(_latency())
+        step = max(1, SETTINGS["chunk_tokens"])
+        for i in range(0, len(words), step):
+            chunk = {
+                "id": "mock-stream",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": " ".join(words[i:i + step]) + " "}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            if SETTINGS["token_delay_ms"]:
+                await asyncio.sleep(SETTINGS["token_delay_ms"] * step / 1000)
+        final = {
+            "id": "mock-stream",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            "usage": _usage(body)
+        }
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "mock", "object": "model"}]}
+
+@app.get("/stats")
+async def stats():
+    return STATS
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=SETTINGS["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=SETTINGS["jitter_ms"])
+    parser.add_argument("--tokens", type=int, default=SETTINGS["tokens"])
+    parser.add_argument("--token-delay-ms", type=float, default=SETTINGS["token_delay_ms"])
+    args = parser.parse_args()
+
+    SETTINGS.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens=args.tokens,
+        token_delay_ms=args.token_delay_ms
+    )
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
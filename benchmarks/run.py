@@ -0,0 +1,381 @@
+"""
+Benchmark the API against a local mock provider and compare with a stored baseline
+
+    python -m benchmarks.run                          # all scenarios, compare with benchmarks/baseline.json
+    python -m benchmarks.run --scenarios unified-text,few-shot --scale 0.2
+    python -m benchmarks.run --save-baseline          # record the current numbers as the new baseline
+    python -m benchmarks.run --replay recordings/upstream.jsonl   # provider timing from a recording
+    python -m benchmarks.run --app-dir ../reference --save-baseline   # baseline from another checkout
+
+Starts benchmarks.mock_server and main:app (uvicorn) as subprocesses, so the API's CPU time
+and peak RSS are measured separately from the load generator and the mock. Exits with status 1
+when a scenario regresses by more than --tolerance against the baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+from benchmarks.workloads import Scenario, build_scenarios
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SAMPLE_INTERVAL = 0.05
+# Metrics compared against the baseline and whether higher is worse
+COMPARED_METRICS = {
+    "throughput_rps": False,
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "cpu_ms_per_request": True,
+    "peak_rss_mb": True
+}
+
+def _psutil_available() -> bool:
+    try:
+        import psutil  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class ProcessMonitor:
+    """CPU time and resident memory of the server process and its children (psutil if installed, else /proc)
+
+    Children matter: with the default IMAGE_EXECUTOR=process, image decoding runs in pool workers.
+    RSS is summed over processes, so pages shared with the workers are counted more than once.
+    """
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self._process = None
+        if _psutil_available():
+            import psutil
+            self._process = psutil.Process(pid)
+        self._clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+    def _children(self) -> List[int]:
+        """Live descendant PIDs (reaped children are already in the parent's cutime/cstime)"""
+        if self._process is not None:
+            import psutil
+            try:
+                return [child.pid for child in self._process.children(recursive=True)]
+            except psutil.Error:
+                return []
+        parents = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                stat = self._stat(int(entry))
+                if stat:
+                    parents.setdefault(int(stat[1]), []).append(int(entry))
+        found, queue = [], [self.pid]
+        while queue:
+            children = parents.get(queue.pop(), [])
+            found += children
+            queue += children
+        return found
+
+    def _stat(self, pid: int) -> List[str]:
+        """Fields of /proc/<pid>/stat after the parenthesised command name (state, ppid, ...); [] if gone"""
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                return f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            return []
+
+    def cpu_seconds(self) -> float:
+        if self._process is not None:
+            import psutil
+            times = self._process.cpu_times()
+            total = times.user + times.system + times.children_user + times.children_system
+            for pid in self._children():
+                try:
+                    child = psutil.Process(pid).cpu_times()
+                    total += child.user + child.system
+                except psutil.Error:
+                    pass
+            return total
+        # utime, stime, cutime, cstime are fields 14-17 (11-14 after the command name); children: utime, stime
+        fields = self._stat(self.pid)
+        ticks = sum(int(value) for value in fields[11:15])
+        for pid in self._children():
+            child = self._stat(pid)
+            if child:
+                ticks += int(child[11]) + int(child[12])
+        return ticks / self._clock_ticks
+
+    def _rss(self, pid: int) -> int:
+        if self._process is not None:
+            import psutil
+            try:
+                return psutil.Process(pid).memory_info().rss
+            except psutil.Error:
+                return 0
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def rss_bytes(self) -> int:
+        return sum(self._rss(pid) for pid in [self.pid] + self._children())
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Process exited with status {process.returncode} before {url} was ready")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else 0.0
+
+async def _send(client: httpx.AsyncClient, scenario: Scenario) -> bool:
+    kwargs = scenario.build()
+    files = kwargs.get("files") or {}
+    try:
+        response = await client.request(scenario.method, scenario.path, **kwargs)
+        if response.status_code != 200:
+            return False
+        if response.headers.get("content-type", "").startswith("text/event-stream"):
+            return "event: done" in response.text
+        body = response.json()
+        return bool(body.get("success", True))
+    finally:
+        for _, handle, _ in files.values():
+            handle.close()
+
+async def run_scenario(base_url: str, scenario: Scenario, monitor: ProcessMonitor,
+                       scale: float = 1.0, concurrency: Optional[int] = None,
+                       upstream_latency_ms: float = 0.0) -> Dict[str, Any]:
+    """Send the scenario's requests and summarize latency, throughput, CPU and memory"""
+    requests = max(1, int(scenario.requests * scale))
+    concurrency = concurrency or scenario.concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+    peak_rss = 0
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=600.0, limits=limits) as client:
+        # Warm-up: first-use costs (payload generation, worker pools) stay out of the numbers
+        await _send(client, scenario)
+
+        sampling = True
+
+        async def sample_rss():
+            nonlocal peak_rss
+            while sampling:
+                peak_rss = max(peak_rss, monitor.rss_bytes())
+                await asyncio.sleep(SAMPLE_INTERVAL)
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    ok = await _send(client, scenario)
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append((time.perf_counter() - start) * 1000)
+                if not ok:
+                    errors += 1
+
+        sampler = asyncio.ensure_future(sample_rss())
+        cpu_start = monitor.cpu_seconds()
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(requests)])
+        elapsed = time.perf_counter() - started
+        cpu_used = monitor.cpu_seconds() - cpu_start
+        sampling = False
+        await sampler
+
+    ordered = sorted(latencies)
+    p50 = percentile(ordered, 0.5)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": requests / elapsed if elapsed else 0.0,
+        "mean_ms": sum(ordered) / len(ordered),
+        "p50_ms": p50,
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        # Median latency not explained by the mock provider's configured latency
+        "overhead_p50_ms": max(0.0, p50 - upstream_latency_ms * scenario.upstream_calls),
+        "cpu_ms_per_request": cpu_used * 1000 / requests,
+        "peak_rss_mb": peak_rss / (1024 * 1024)
+    }
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float) -> List[str]:
+    """Regressions beyond tolerance (relative) for scenarios present in both runs"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change > tolerance) if higher_is_worse else (change < -tolerance):
+                regressions.append(f"{name}: {metric} {old:.1f} -> {new:.1f} ({change:+.0%})")
+    return regressions
+
+def print_table(results: Dict[str, Dict[str, Any]]) -> None:
+    header = f"{'scenario':<26}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'ovh50':>9}{'cpu/req':>9}{'rss MB':>9}{'err':>5}"
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        print(f"{name:<26}{r['throughput_rps']:>9.1f}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+              f"{r['overhead_p50_ms']:>9.1f}{r['cpu_ms_per_request']:>9.1f}{r['peak_rss_mb']:>9.1f}{r['errors']:>5}")
+
+def select_scenarios(names: Optional[str]) -> List[Scenario]:
+    scenarios = build_scenarios()
+    if not names:
+        return scenarios
+    wanted = [n.strip() for n in names.split(",") if n.strip()]
+    return [s for s in scenarios if any(w in s.name for w in wanted)]
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", help="Comma-separated scenario names (substring match); default all")
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply each scenario's request count")
+    parser.add_argument("--concurrency", type=int, help="Override each scenario's concurrency")
+    parser.add_argument("--upstream-latency-ms", type=float, default=100.0, help="Mock provider latency")
+    parser.add_argument("--upstream-tokens", type=int, default=200, help="Completion tokens per mock response")
+    parser.add_argument("--replay", help="Serve provider responses from a GPT_UPSTREAM_MODE=record file instead of the mock")
+    parser.add_argument("--replay-latency-scale", type=float, default=1.0, help="Scale recorded latencies")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write results to --baseline")
+    parser.add_argument("--app-dir", default=ROOT,
+                        help="Checkout whose app is benchmarked (e.g. a git worktree of the reference commit)")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("--output", help="Also write results as JSON to this path")
+    args = parser.parse_args()
+
+    scenarios = select_scenarios(args.scenarios)
+    if args.list:
+        for s in scenarios:
+            print(f"{s.name:<26}{s.method} {s.path}  requests={s.requests} concurrency={s.concurrency}")
+        return 0
+    if not scenarios:
+        print("No matching scenarios")
+        return 2
+
+    mock_port, app_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "GPT_BACKENDS": json.dumps([{"name": "mock", "base_url": f"http://127.0.0.1:{mock_port}/v1", "api_key": "mock"}]),
+        # Every request must reach the (mock) provider
+        "GPT_CACHE_ENABLED": "false",
+        "GPT_COALESCE_ENABLED": "false"
+    }
+    if args.replay:
+        # Recorded responses are served to every request in turn, whatever its prompt
+        env.update(
+            GPT_UPSTREAM_MODE="replay",
+            GPT_RECORDING_FILE=os.path.abspath(args.replay),
+            GPT_REPLAY_LATENCY_SCALE=str(args.replay_latency_scale),
+            GPT_REPLAY_ON_MISS="any"
+        )
+        # Replayed latency varies per recording, so overhead is reported as the full latency
+        args.upstream_latency_ms = 0.0
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_server", "--port", str(mock_port),
+         "--latency-ms", str(args.upstream_latency_ms), "--tokens", str(args.upstream_tokens)],
+        cwd=ROOT, env=env
+    )
+    app_dir = os.path.abspath(args.app_dir)
+    # Older checkouts mount the QA router only in benchmarks/app.py
+    target = "benchmarks.app:app" if os.path.exists(os.path.join(app_dir, "benchmarks", "app.py")) else "main:app"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1",
+         "--port", str(app_port), "--log-level", "warning"],
+        cwd=app_dir, env=env
+    )
+    try:
+        wait_ready(f"http://127.0.0.1:{mock_port}/v1/models", mock)
+        wait_ready(f"http://127.0.0.1:{app_port}/health", server)
+        monitor = ProcessMonitor(server.pid)
+
+        results = {}
+        for scenario in scenarios:
+            print(f"running {scenario.name} ...", flush=True)
+            results[scenario.name] = asyncio.run(run_scenario(
+                f"http://127.0.0.1:{app_port}", scenario, monitor,
+                scale=args.scale, concurrency=args.concurrency,
+                upstream_latency_ms=args.upstream_latency_ms
+            ))
+    finally:
+        for process in (server, mock):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    print()
+    print_table(results)
+    report = {
+        "upstream_latency_ms": args.upstream_latency_ms,
+        "upstream_tokens": args.upstream_tokens,
+        "scale": args.scale,
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {"results": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        baseline.update({k: v for k, v in report.items() if k != "results"})
+        baseline["results"].update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline.get("results", {}), args.tolerance)
+    if regressions:
+        print(f"\nRegressions (tolerance {args.tolerance:.0%}):")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\nNo regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Benchmark scenarios and the synthetic payloads they upload
+"""
+
+import io
+import json
+import os
+from typing import Dict, Any, Callable, List, Optional
+
+import numpy as np
+from PIL import Image
+
+# Generated payloads are cached here between runs
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache")
+
+KB = 1024
+MB = 1024 * 1024
+
+def _cache_path(name: str) -> str:
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, name)
+
+def make_image(target_bytes: int) -> str:
+    """JPEG of random noise close to target_bytes (noise defeats compression, so size tracks pixel count)"""
+    path = _cache_path(f"image_{target_bytes}.jpg")
+    if os.path.exists(path):
+        return path
+
+    rng = np.random.default_rng(0)
+    # Measure bytes per pixel on a sample, then size the real image from it
+    sample = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, (256, 256, 3), dtype=np.uint8)).save(sample, "JPEG", quality=90)
+    pixels = target_bytes / (sample.tell() / (256 * 256))
+    width = max(16, int((pixels * 4 / 3) ** 0.5))
+    height = max(16, int(pixels / width))
+
+    pixels_array = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    Image.fromarray(pixels_array).save(path, "JPEG", quality=90)
+    return path
+
+def make_tactile(target_bytes: int) -> str:
+    """JSON recording with normal/shear channels, written in slices so 100 MB files need little memory"""
+    path = _cache_path(f"tactile_{target_bytes}.json")
+    if os.path.exists(path):
+        return path
+
+    rng = np.random.default_rng(1)
+    # Each sample is two numbers like "0.1234, " (~8 bytes)
+    samples = max(8, target_bytes // 16)
+    slice_size = 1_000_000
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"sample_rate": 1000')
+        for channel in ("normal", "shear"):
+            f.write(f', "{channel}": [')
+            for start in range(0, samples, slice_size):
+                values = rng.random(min(slice_size, samples - start))
+                if start:
+                    f.write(", ")
+                f.write(", ".join(f"{v:.4f}" for v in values))
+            f.write("]")
+        f.write("}")
+    return path
+
+def size_label(size: int) -> str:
+    return f"{size // MB}MB" if size >= MB else f"{size // KB}KB"
+
+class Scenario:
+    """One workload: how to build a request, how many to send and how many at once"""
+
+    def __init__(self,
+                 name: str,
+                 method: str,
+                 path: str,
+                 build: Callable[[], Dict[str, Any]],
+                 requests: int = 50,
+                 concurrency: int = 10,
+                 upstream_calls: int = 1):
+        self.name = name
+        self.method = method
+        self.path = path
+        # Returns httpx request kwargs (data/files/json); file objects in "files" are closed after the request
+        self.build = build
+        self.requests = requests
+        self.concurrency = concurrency
+        # Sequential upstream round trips per request, for the overhead estimate
+        self.upstream_calls = upstream_calls
+
+def _unified(prompt_type: str, image: Optional[int] = None, tactile: Optional[int] = None) -> Callable[[], Dict[str, Any]]:
+    image_path = make_image(image) if image else None
+    tactile_path = make_tactile(tactile) if tactile else None
+
+    def build() -> Dict[str, Any]:
+        files = {}
+        if image_path:
+            files["image"] = ("image.jpg", open(image_path, "rb"), "image/jpeg")
+        if tactile_path:
+            files["tactile_file"] = ("tactile.json", open(tactile_path, "rb"), "application/json")
+        return {
+            "data": {
+                "prompt": "Describe the surface.",
+                "prompt_type": prompt_type,
+                "tactile_mode": "features",
+                "use_cache": "false"
+            },
+            "files": files or None
+        }
+    return build
+
+def _vision_text(image: int) -> Callable[[], Dict[str, Any]]:
+    image_path = make_image(image)
+
+    def build() -> Dict[str, Any]:
+        return {
+            "data": {"prompt": "What material is this?", "text_context": "Lab sample", "use_cache": "false"},
+            "files": {"image": ("image.jpg", open(image_path, "rb"), "image/jpeg")}
+        }
+    return build
+
+def _multimodal_complete(image: int) -> Callable[[], Dict[str, Any]]:
+    image_path = make_image(image)
+    tactile_data = json.dumps({"normal": [round(0.01 * i, 2) for i in range(1000)]})
+
+    def build() -> Dict[str, Any]:
+        return {
+            "data": {
+                "prompt": "Combine all modalities.",
+                "tactile_data": tactile_data,
+                "text_context": "Lab sample",
+                "tactile_mode": "features",
+                "use_cache": "false"
+            },
+            "files": {"image": ("image.jpg", open(image_path, "rb"), "image/jpeg")}
+        }
+    return build
+
+def _few_shot() -> Dict[str, Any]:
+    return {"json": {
+        "examples": [
+            {"tactile": "pressure 0.8, vibration 120 Hz", "text": "metal plate", "output": "smooth, rigid"},
+            {"tactile": "pressure 0.2, vibration 30 Hz", "text": "foam block", "output": "soft, compliant"},
+            {"tactile": "pressure 0.5, vibration 300 Hz", "text": "sandpaper", "output": "rough, abrasive"}
+        ],
+        "current_input": {"tactile": "pressure 0.6, vibration 200 Hz", "text": "unknown sample"},
+        "use_cache": False
+    }}
+
+def _batch_qa(questions: int) -> Callable[[], Dict[str, Any]]:
+    def build() -> Dict[str, Any]:
+        return {"data": {
+            "questions_json": json.dumps([f"Question {i}: how rough is the surface?" for i in range(questions)]),
+            "tactile_data": "pressure 0.6, vibration 200 Hz",
+            "text_data": "unknown sample",
+            "use_cache": "false"
+        }}
+    return build
+
+IMAGE_SIZES = (100 * KB, 1 * MB, 5 * MB, 20 * MB)
+TACTILE_SIZES = (1 * KB, 1 * MB, 10 * MB, 100 * MB)
+
+def build_scenarios() -> List[Scenario]:
+    """All scenarios; payload files are generated lazily on first use"""
+    scenarios = [
+        Scenario("unified-text", "POST", "/api/multimodal/unified-analysis", _unified("Text"), 200, 20),
+        Scenario("unified-stream", "POST", "/api/multimodal/unified-analysis/stream", _unified("Text"), 200, 20)
+    ]
+    for size in IMAGE_SIZES:
+        scenarios.append(Scenario(
+            f"unified-image-{size_label(size)}", "POST", "/api/multimodal/unified-analysis",
+            _lazy(_unified, "Vision-Text", image=size),
+            requests=100 if size < 5 * MB else 20, concurrency=10 if size < 5 * MB else 4
+        ))
+    for size in TACTILE_SIZES:
+        scenarios.append(Scenario(
+            f"unified-tactile-{size_label(size)}", "POST", "/api/multimodal/unified-analysis",
+            _lazy(_unified, "Tactile-Text", tactile=size),
+            requests=100 if size < 10 * MB else 5, concurrency=10 if size < 10 * MB else 1
+        ))
+    scenarios += [
+        Scenario("vision-text-1MB", "POST", "/api/multimodal/vision-text", _lazy(_vision_text, 1 * MB), 100, 10),
+        Scenario("multimodal-complete-1MB", "POST", "/api/multimodal/multimodal-complete",
+                 _lazy(_multimodal_complete, 1 * MB), 100, 10),
+        Scenario("few-shot-learning", "POST", "/api/multimodal/few-shot-learning", _few_shot, 200, 20),
+        # 10 questions at the default batch concurrency of 5 = two sequential upstream rounds
+        Scenario("batch-qa-10", "POST", "/api/qa/batch-qa", _batch_qa(10), 50, 5, upstream_calls=2)
+    ]
+    return scenarios
+
+def _lazy(factory: Callable[..., Callable[[], Dict[str, Any]]], *args, **kwargs) -> Callable[[], Dict[str, Any]]:
+    """Defer payload generation until the scenario is actually run"""
+    built = []
+
+    def build() -> Dict[str, Any]:
+        if not built:
+            built.append(factory(*args, **kwargs))
+        return built[0]()
+    return build
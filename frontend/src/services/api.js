@@ -51,6 +51,77 @@ export const multimodalAPI = {
     }
   },
 
+  // 统一多模态分析 (流式, Server-Sent Events)
+  // onDelta(text) 在每个token块到达时调用, 返回最终的 done 事件数据
+  processUnifiedAnalysisStream: async (formData, onDelta) => {
+    const response = await fetch(`${API_BASE_URL}/api/multimodal/unified-analysis/stream`, {
+      method: 'POST',
+      body: formData,
+    });
+    if (!response.ok || !response.body) {
+      throw { error: `HTTP ${response.status}` };
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let final = null;
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const message = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = 'message';
+        let data = '';
+        message.split('\n').forEach((line) => {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        if (!data) continue;
+
+        const payload = JSON.parse(data);
+        if (event === 'delta') {
+          onDelta && onDelta(payload.content);
+        } else if (event === 'done') {
+          final = payload;
+        } else if (event === 'error') {
+          throw payload;
+        }
+      }
+    }
+    return final;
+  },
+
+  // 统一多模态分析 (后台任务): 提交后长轮询结果, 不受60秒请求超时限制
+  processUnifiedAnalysisJob: async (formData, waitSeconds = 25) => {
+    const submitted = await api.post('/api/jobs/unified-analysis', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    if (!submitted.success) {
+      return submitted;
+    }
+
+    while (true) {
+      const { job } = await api.get(`/api/jobs/${submitted.job_id}`, {
+        params: { wait: waitSeconds },
+      });
+      if (job.status === 'succeeded') {
+        return job.result;
+      }
+      if (job.status === 'failed') {
+        return { success: false, error: job.error };
+      }
+    }
+  },
+
   // 触觉-文本分析
   processTactileText: async (data) => {
     try {
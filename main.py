@@ -1,17 +1,28 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Optional, List
+import argparse
+import atexit
 import os
+import tempfile
 import uvicorn
 from pathlib import Path
 
 # Import our custom modules
-from api.multimodal_reasoning import router as multimodal_router
-# from api.qa_system import router as qa_router
+from api.multimodal_reasoning import router as multimodal_router, gpt_service
+from api.jobs import router as jobs_router
+from api.qa_system import router as qa_router
 from services.prompt_engineering import PromptEngineer
-from services.gpt_integration import GPTService
+from services.gpt_integration import GPTService, close_shared_http_client
+from services.image_processing import shutdown_image_processor
+from services.backend_pool import close_backend_pool
+from services.job_queue import shutdown_job_queue
+from services.metrics import MetricsMiddleware, render_metrics
+from services.profiling import ProfilingMiddleware
+from services.record_replay import close_upstream_recorder
+from services.shared_cache import close_shared_cache
 
 app = FastAPI(
     title="Tactile-Text-Vision Multimodal Reasoning System",
@@ -28,18 +39,69 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request profiles (PROFILE_SAMPLE_RATE / PROFILE_HEADER_ENABLED)
+app.add_middleware(ProfilingMiddleware)
+
+# Per-endpoint latency and request/response size metrics (see /metrics) and Server-Timing headers
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(multimodal_router, tags=["Multimodal Reasoning"])
-# app.include_router(qa_router, tags=["Question Answering"])
+app.include_router(jobs_router, tags=["Jobs"])
+app.include_router(qa_router, prefix="/api/qa", tags=["Question Answering"])
 
 # Create upload directory
 upload_dir = Path("uploads")
 upload_dir.mkdir(exist_ok=True)
 
+@app.on_event("startup")
+async def startup_event():
+    """Warm the response cache from its on-disk store so a restart doesn't start cold"""
+    gpt_service.warm_cache()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop job workers, release pooled upstream connections, recordings, image workers and the shared cache"""
+    await shutdown_job_queue()
+    await close_backend_pool()
+    await close_shared_http_client()
+    close_upstream_recorder()
+    shutdown_image_processor()
+    close_shared_cache()
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "message": "Tactile-Text-Vision Multimodal Reasoning System is running"}
 
+@app.get("/metrics")
+async def metrics():
+    """Stage latency, request/response size and token usage metrics in Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+def _remove_shared_cache(path: str) -> None:
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the multimodal reasoning API server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", "1")),
+                        help="Worker processes (default: WEB_CONCURRENCY or 1)")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Workers share caches and job status through one SQLite file unless SHARED_CACHE_PATH points elsewhere
+        if not os.getenv("SHARED_CACHE_PATH"):
+            shared_path = os.path.join(tempfile.gettempdir(), f"tactile_shared_cache_{os.getpid()}.sqlite3")
+            os.environ["SHARED_CACHE_PATH"] = shared_path
+            atexit.register(_remove_shared_cache, shared_path)
+        # Workers re-import the app; image pools size themselves from the worker count
+        os.environ["WEB_CONCURRENCY"] = str(args.workers)
+        uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port) 
\ No newline at end of file
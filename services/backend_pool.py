@@ -0,0 +1,257 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Iterable, List, Optional
+import openai
+
+from services.resilience import CircuitBreaker, get_circuit_breaker, is_outage
+from services.rate_limiting import RateLimiter, get_rate_limiter, RATE_LIMIT_RPM, RATE_LIMIT_TPM
+
+# Backend pool settings
+# GPT_BACKENDS: JSON list of {"name", "base_url", "api_key", "model", "max_concurrency", "rpm", "tpm"};
+# GPT_BACKENDS_FILE: path to a file with the same JSON. Unset = the single built-in backend.
+BACKENDS_JSON = os.getenv("GPT_BACKENDS", "")
+BACKENDS_FILE = os.getenv("GPT_BACKENDS_FILE", "")
+# "least_outstanding" (in-flight / max_concurrency) or "ewma" (latency EWMA weighted by load)
+ROUTING_POLICY = os.getenv("GPT_ROUTING_POLICY", "least_outstanding").lower()
+BACKEND_MAX_CONCURRENCY = int(os.getenv("GPT_BACKEND_MAX_CONCURRENCY", "64"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("GPT_HEALTH_CHECK_INTERVAL", "15"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("GPT_HEALTH_CHECK_TIMEOUT", "5"))
+# Consecutive failed calls after which a backend is ejected until a health check passes
+EJECT_AFTER_FAILURES = int(os.getenv("GPT_BACKEND_EJECT_FAILURES", "3"))
+EWMA_ALPHA = 0.3
+
+class Backend:
+    """One OpenAI-compatible endpoint + key, with its own concurrency limit and health state"""
+
+    def __init__(self,
+                 name: str,
+                 base_url: str,
+                 api_key: str,
+                 http_client,
+                 model: Optional[str] = None,
+                 max_concurrency: int = BACKEND_MAX_CONCURRENCY,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        # None = use the model requested by GPTService
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.http_client = http_client
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=self.base_url,
+            http_client=http_client,
+            max_retries=0
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        # Keyed by name: two backends on one base_url (e.g. different keys) fail independently
+        self.breaker: CircuitBreaker = get_circuit_breaker(f"backend:{name}")
+        self.rate_limiter = rate_limiter or RateLimiter(rpm=0, tpm=0)
+
+        self.outstanding = 0
+        self.ewma_ms: Optional[float] = None
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def available(self) -> bool:
+        # An open breaker past its reset timeout must stay selectable so the half-open probe can go out
+        return self.healthy and self.breaker.ready()
+
+    def score(self, policy: str) -> float:
+        """Lower is better"""
+        if policy == "ewma":
+            # Unmeasured backends get tried first
+            return (self.ewma_ms or 0.0) * (self.outstanding + 1)
+        return self.outstanding / self.max_concurrency
+
+    def record(self, latency_ms: float, ok: bool, can_eject: bool) -> None:
+        """Track latency of successful calls; repeated failures eject the backend"""
+        self.requests += 1
+        if ok:
+            self.consecutive_failures = 0
+            self.ewma_ms = latency_ms if self.ewma_ms is None else (
+                EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * self.ewma_ms
+            )
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        if can_eject and self.healthy and self.consecutive_failures >= EJECT_AFTER_FAILURES:
+            self.healthy = False
+            self.ejections += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "model": self.model,
+            "healthy": self.healthy,
+            "breaker": self.breaker.state,
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "ewma_ms": self.ewma_ms,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "rate_limit_queue_depth": self.rate_limiter.get_stats()["queue_depth"]
+        }
+
+class BackendPool:
+    """Routes upstream calls across backends; ejects failing ones and reinstates them via health checks"""
+
+    def __init__(self, backends: List[Backend], policy: str = ROUTING_POLICY,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        if not backends:
+            raise ValueError("Backend pool needs at least one backend")
+        self.backends = backends
+        self.policy = policy
+        self.health_check_interval = health_check_interval
+        self._health_task: Optional[asyncio.Task] = None
+
+    @property
+    def primary(self) -> Backend:
+        return self.backends[0]
+
+    def _ejection_enabled(self) -> bool:
+        # A lone backend is never ejected (its circuit breaker still fails fast)
+        return len(self.backends) > 1
+
+    def select(self, exclude: Iterable[Backend] = ()) -> Backend:
+        """Pick the best available backend, preferring ones not in exclude (already tried for this call)"""
+        self._ensure_health_checks()
+        excluded = set(id(backend) for backend in exclude)
+        available = [b for b in self.backends if b.available()]
+        # If nothing is available, let the least loaded backend's breaker report why
+        candidates = [b for b in available if id(b) not in excluded] or available or self.backends
+        return min(candidates, key=lambda b: b.score(self.policy))
+
+    @asynccontextmanager
+    async def lease(self, backend: Backend):
+        """Hold one of the backend's concurrency slots, recording latency and outcome"""
+        backend.outstanding += 1
+        try:
+            async with backend.semaphore:
+                start = time.perf_counter()
+                try:
+                    yield backend
+                except Exception as e:
+                    # Client errors (4xx) say nothing about backend health or speed
+                    if is_outage(e):
+                        backend.record((time.perf_counter() - start) * 1000, False, self._ejection_enabled())
+                    raise
+                backend.record((time.perf_counter() - start) * 1000, True, self._ejection_enabled())
+        finally:
+            backend.outstanding -= 1
+
+    async def check_backend(self, backend: Backend) -> bool:
+        """A backend is healthy if GET /models answers without a server error"""
+        try:
+            response = await backend.http_client.get(
+                f"{backend.base_url}/models",
+                headers={"Authorization": f"Bearer {backend.api_key}"},
+                timeout=HEALTH_CHECK_TIMEOUT
+            )
+            return response.status_code < 500
+        except Exception:
+            return False
+
+    async def run_health_checks(self) -> None:
+        """Probe every backend once, ejecting or reinstating it"""
+        results = await asyncio.gather(*[self.check_backend(backend) for backend in self.backends])
+        for backend, ok in zip(self.backends, results):
+            if ok and not backend.healthy:
+                backend.healthy = True
+                backend.consecutive_failures = 0
+            elif not ok and backend.healthy:
+                backend.healthy = False
+                backend.ejections += 1
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self.run_health_checks()
+            except Exception:
+                pass
+
+    def _ensure_health_checks(self) -> None:
+        if not self._ejection_enabled() or self.health_check_interval <= 0:
+            return
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get routing policy and per-backend load/health"""
+        return {
+            "policy": self.policy,
+            "backends": {backend.name: backend.get_stats() for backend in self.backends}
+        }
+
+def load_backend_configs() -> List[Dict[str, Any]]:
+    """Backend definitions from GPT_BACKENDS / GPT_BACKENDS_FILE (empty if unset)"""
+    if BACKENDS_FILE:
+        with open(BACKENDS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    if BACKENDS_JSON:
+        return json.loads(BACKENDS_JSON)
+    return []
+
+def build_backend_pool(default: Dict[str, Any], http_client) -> BackendPool:
+    """Pool from config, or a single backend from default (base_url, api_key) sharing the global rate limiter"""
+    configs = load_backend_configs()
+    if not configs:
+        return BackendPool([Backend(
+            "default",
+            default["base_url"],
+            default["api_key"],
+            http_client,
+            max_concurrency=default.get("max_concurrency", BACKEND_MAX_CONCURRENCY),
+            rate_limiter=get_rate_limiter()
+        )])
+
+    backends = []
+    for i, config in enumerate(configs):
+        backends.append(Backend(
+            config.get("name", f"backend_{i}"),
+            config["base_url"],
+            config.get("api_key", default["api_key"]),
+            http_client,
+            model=config.get("model"),
+            max_concurrency=int(config.get("max_concurrency", BACKEND_MAX_CONCURRENCY)),
+            # Each key has its own budget; the env limits apply per key unless overridden
+            rate_limiter=RateLimiter(
+                rpm=float(config.get("rpm", RATE_LIMIT_RPM)),
+                tpm=float(config.get("tpm", RATE_LIMIT_TPM))
+            )
+        ))
+    return BackendPool(backends)
+
+_shared_backend_pool: Optional[BackendPool] = None
+
+def get_backend_pool(default: Dict[str, Any], http_client) -> BackendPool:
+    """Return the process-wide backend pool shared by all GPTService instances"""
+    global _shared_backend_pool
+    if _shared_backend_pool is None:
+        _shared_backend_pool = build_backend_pool(default, http_client)
+    return _shared_backend_pool
+
+async def close_backend_pool() -> None:
+    """Stop health checks (called on application shutdown)"""
+    global _shared_backend_pool
+    if _shared_backend_pool is not None:
+        await _shared_backend_pool.close()
+    _shared_backend_pool = None
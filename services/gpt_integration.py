@@ -2,16 +2,103 @@ import openai
 import base64
 import json
 import os
-from typing import Dict, Any, Optional, List
-from PIL import Image
-import io
+from typing import Dict, Any, Optional, List, AsyncIterator, Union, Callable, Awaitable, Tuple
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
 from dotenv import load_dotenv
 import httpx
 import asyncio
+import time
+
+from services.response_cache import ResponseCache, make_cache_key, hash_bytes
+from services.request_coalescing import SingleFlight
+from services.resilience import RetryPolicy, call_through
+from services.rate_limiting import estimate_tokens
+from services.backend_pool import get_backend_pool
+from services.model_router import get_model_router
+from services.hedging import Hedger
+from services.image_processing import resize_image, get_image_processor, IMAGE_FAST_MODE
+from services.metrics import stage_timer, observe_stage, record_llm_call
+from services.record_replay import get_upstream_recorder
+from services.shared_cache import get_persistent_cache
 
 # Load environment variables
 load_dotenv()
 
+# Connection pool / concurrency settings for upstream calls
+HTTP_MAX_CONNECTIONS = int(os.getenv("GPT_HTTP_MAX_CONNECTIONS", "200"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("GPT_HTTP_MAX_KEEPALIVE", "50"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("GPT_HTTP_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("GPT_HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("GPT_HTTP_READ_TIMEOUT", "120"))
+HTTP2_ENABLED = os.getenv("GPT_HTTP2", "true").lower() in ("1", "true", "yes")
+MAX_CONCURRENT_REQUESTS = int(os.getenv("GPT_MAX_CONCURRENCY", "256"))
+# Streams hold their slot until the client has read the last token, so they get a separate limit
+# and slow readers can't starve non-streaming calls
+MAX_CONCURRENT_STREAMS = int(os.getenv("GPT_MAX_CONCURRENT_STREAMS", "128"))
+# Preload recently used persisted responses into memory at startup
+CACHE_WARMUP = os.getenv("GPT_CACHE_WARMUP", "true").lower() in ("1", "true", "yes")
+
+# Resized/encoded images keyed by upload content hash (shared across workers with SHARED_CACHE_PATH)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+IMAGE_CACHE_TTL = float(os.getenv("IMAGE_CACHE_TTL", "3600"))
+
+prepared_image_cache = ResponseCache(max_bytes=IMAGE_CACHE_MAX_BYTES, default_ttl=IMAGE_CACHE_TTL, namespace="images")
+
+_shared_http_client: Optional[httpx.AsyncClient] = None
+_shared_gpt_service: Optional["GPTService"] = None
+
+@asynccontextmanager
+async def close_stream(stream):
+    """Release a streamed response's pooled connection even if iteration stops early (client disconnect)"""
+    try:
+        yield stream
+    finally:
+        if hasattr(stream, "response"):
+            await stream.response.aclose()
+        elif hasattr(stream, "aclose"):
+            await stream.aclose()
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional 'h2' package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled HTTP client shared by all GPTService instances"""
+    global _shared_http_client
+    if _shared_http_client is None or _shared_http_client.is_closed:
+        _shared_http_client = httpx.AsyncClient(
+            http2=HTTP2_ENABLED and _http2_available(),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        )
+    return _shared_http_client
+
+async def close_shared_http_client() -> None:
+    """Close the shared HTTP client (called on application shutdown)"""
+    global _shared_http_client
+    if _shared_http_client is not None and not _shared_http_client.is_closed:
+        await _shared_http_client.aclose()
+    _shared_http_client = None
+
+class PreparedImage:
+    """An image already resized and base64-encoded, reusable across many requests"""
+    
+    def __init__(self, data_url: str, digest: str):
+        self.data_url = data_url
+        # Digest of the original upload, so cache keys match the raw-bytes path
+        self.digest = digest
+
+ImageInput = Union[bytes, PreparedImage]
+
 class GPTService:
     def __init__(self):
         # Together AI 配置 - 兼容 OpenAI API
@@ -21,11 +108,47 @@ class GPTService:
         self.max_tokens = 1500
         self.temperature = 0.7
         
-        # Initialize OpenAI client with Together AI settings
-        self.client = openai.OpenAI(
-            api_key=self.api_key,
-            base_url=self.base_url
+        # Upstream backends on the shared connection pool: GPT_BACKENDS, or just the Together AI
+        # endpoint above. Each has its own client, concurrency limit, circuit breaker (fails fast
+        # while the endpoint is down) and RPM/TPM rate limiter (interactive calls before batch ones).
+        self.backend_pool = get_backend_pool(
+            {"base_url": self.base_url, "api_key": self.api_key},
+            get_shared_http_client()
         )
+        self.client = self.backend_pool.primary.client
+        self.circuit_breaker = self.backend_pool.primary.breaker
+        self.rate_limiter = self.backend_pool.primary.rate_limiter
+        
+        # Backoff for transient errors (the SDK's own retries are disabled)
+        self.retry_policy = RetryPolicy()
+        
+        # Per-request model choice: fast text models for text-only work, vision models for images
+        self.model_router = get_model_router(self.model)
+        
+        # Optional duplicate request when the first one is slower than recent latency percentiles
+        self.hedger = Hedger()
+        
+        # GPT_UPSTREAM_MODE=record/replay: capture provider responses with timing, or serve them offline
+        self.recorder = get_upstream_recorder()
+        
+        # Bound the number of in-flight upstream calls for this worker
+        self.max_concurrency = MAX_CONCURRENT_REQUESTS
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.max_streams = MAX_CONCURRENT_STREAMS
+        self._stream_semaphore = asyncio.Semaphore(self.max_streams)
+        
+        # Recent time-to-first-token samples (ms) for streamed responses
+        self._ttft_samples = deque(maxlen=500)
+        
+        # Content-addressed cache of successful completions, backed by GPT_PERSISTENT_CACHE_PATH
+        # (or the cross-worker SHARED_CACHE_PATH) when configured
+        self.response_cache = ResponseCache(namespace="llm", shared=get_persistent_cache())
+        
+        # Identical concurrent requests share a single upstream call
+        self.coalescer = SingleFlight()
+        
+        # Image decode/resize/encode runs in a shared worker pool
+        self.image_processor = get_image_processor()
         
         # Meta Llama Vision Free 支持 vision，启用视觉功能
         self.vision_supported = True
@@ -43,49 +166,168 @@ class GPTService:
         return base64.b64encode(image_bytes).decode('utf-8')
     
     def resize_image_if_needed(self, image_bytes: bytes, max_size: int = 1024) -> bytes:
-        """Resize image if it's too large"""
-        try:
-            image = Image.open(io.BytesIO(image_bytes))
+        """Resize image if it's too large (blocking; async callers use resize_image_async)"""
+        return resize_image(image_bytes, max_size)
+    
+    async def resize_image_async(self, image_bytes: bytes, max_size: int = 1024) -> bytes:
+        """Resize image in the shared preprocessing pool without blocking the event loop"""
+        with stage_timer("image_resize"):
+            return await self.image_processor.resize(image_bytes, max_size)
+    
+    async def prepare_image(self, image_bytes: bytes) -> PreparedImage:
+        """Resize and encode an image once so it can be attached to several requests"""
+        digest = hash_bytes(image_bytes)
+        key = f"{digest}:1024:{IMAGE_FAST_MODE}"
+        cached = prepared_image_cache.get(key)
+        if cached is not None:
+            return PreparedImage(cached["data_url"], digest)
+        
+        processed_image = await self.resize_image_async(image_bytes)
+        with stage_timer("base64_encode"):
+            base64_image = self.encode_image_from_bytes(processed_image)
+        data_url = f"data:image/jpeg;base64,{base64_image}"
+        prepared_image_cache.set(key, {"data_url": data_url})
+        return PreparedImage(data_url, digest)
+    
+    async def _ensure_prepared(self, image: ImageInput) -> PreparedImage:
+        """Accept either raw bytes or an already prepared image"""
+        if isinstance(image, PreparedImage):
+            return image
+        return await self.prepare_image(image)
+    
+    def _build_messages(self, prompt: str, system_message: str = None, image_url: str = None) -> List[Dict[str, Any]]:
+        """Build the chat messages list, optionally attaching an image data URL"""
+        messages = []
+        
+        if system_message:
+            messages.append({"role": "system", "content": system_message})
+        
+        if image_url is None:
+            messages.append({"role": "user", "content": prompt})
+        else:
+            # Create message with image and text
+            # Together AI uses a different format for vision models
+            messages.append({
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": image_url
+                        }
+                    }
+                ]
+            })
+        
+        return messages
+    
+    def _choose_model(self, messages: List[Dict[str, Any]], has_image: bool) -> str:
+        """Model for this request, by modality, prompt length and observed latency"""
+        return self.model_router.choose(has_image, estimate_tokens(messages, 0))
+    
+    def _cache_key(self, prompt: str, system_message: str = None, image: Optional[ImageInput] = None) -> str:
+        """Cache key for a request under the current model settings"""
+        image_digest = None
+        if isinstance(image, PreparedImage):
+            image_digest = image.digest
+        elif image:
+            image_digest = hash_bytes(image)
+        # Keyed on the routing candidates rather than the chosen model, so latency-driven switches still hit;
+        # models pinned on backends replace the routed one, so they are part of the key too
+        route_key = self.model_router.route_key(image_digest is not None)
+        pinned = sorted({backend.model for backend in self.backend_pool.backends if backend.model})
+        if pinned:
+            route_key += "|backends:" + ",".join(pinned)
+        return make_cache_key(
+            route_key,
+            self.temperature, self.max_tokens, system_message, prompt, image_digest
+        )
+    
+    async def _create_completion(self, **params) -> Tuple[Any, str]:
+        """Send a chat completion request to the best available backend with retries
+
+        Returns the response and the model actually sent (a backend's configured model overrides params["model"]).
+        """
+        estimated_tokens = estimate_tokens(params["messages"], params.get("max_tokens", self.max_tokens))
+        tried = []
+        sent_models = []
+        
+        async def attempt():
+            # Retries prefer a backend that hasn't failed this call yet
+            backend = self.backend_pool.select(exclude=tried)
+            tried.append(backend)
             
-            # Check if resizing is needed
-            if max(image.size) > max_size:
-                # Calculate new size maintaining aspect ratio
-                ratio = max_size / max(image.size)
-                new_size = tuple(int(dim * ratio) for dim in image.size)
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
+            async def send():
+                # Every attempt counts against the backend's rate limits; concurrency slots are released while backing off
+                with stage_timer("rate_limit_wait"):
+                    await backend.rate_limiter.acquire(estimated_tokens)
+                model = backend.model or params["model"]
+                sent_models.append(model)
+                async with self._semaphore, self.backend_pool.lease(backend):
+                    start = time.perf_counter()
+                    try:
+                        response = await self.recorder.create(backend.client, **{**params, "model": model})
+                    except Exception:
+                        record_llm_call(model, None, ok=False)
+                        raise
+                    latency = time.perf_counter() - start
+                    self.model_router.record(model, latency * 1000)
+                observe_stage("provider_call", latency)
+                record_llm_call(model, response.usage)
+                backend.rate_limiter.record_usage(estimated_tokens, response.usage.total_tokens if response.usage else None)
+                return response, model
             
-            # Convert back to bytes
-            output = io.BytesIO()
-            image.save(output, format='JPEG', quality=85)
-            return output.getvalue()
-        except Exception as e:
-            # If resizing fails, return original bytes
-            return image_bytes
+            return await call_through(backend.breaker, send)
+        
+        async def call_with_retries():
+            return await self.retry_policy.call(attempt)
+        
+        try:
+            # A hedge shares `tried`, so it goes to a different backend when there is one
+            return await self.hedger.run(params["model"], call_with_retries)
+        except openai.APIError:
+            self.model_router.record_failure(sent_models[-1] if sent_models else params["model"])
+            raise
     
-    async def generate_text_response(self, prompt: str, system_message: str = None) -> Dict[str, Any]:
+    async def _run_once(self, cache_key: str, use_cache: bool, complete: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """Run complete(), coalescing identical in-flight requests that allow cached results"""
+        if not use_cache:
+            return await complete()
+        return dict(await self.coalescer.do(cache_key, complete))
+    
+    async def generate_text_response(self, prompt: str, system_message: str = None, use_cache: bool = True) -> Dict[str, Any]:
         """Generate text-only response using configured model"""
         try:
-            messages = []
-            
-            if system_message:
-                messages.append({"role": "system", "content": system_message})
-            
-            messages.append({"role": "user", "content": prompt})
+            cache_key = self._cache_key(prompt, system_message)
+            if use_cache:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return {**cached, "cached": True}
             
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model=self.model,  # Use configured model
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature
-            )
+            async def complete() -> Dict[str, Any]:
+                with stage_timer("prompt_build"):
+                    messages = self._build_messages(prompt, system_message)
+                    model = self._choose_model(messages, has_image=False)
+                
+                response, model = await self._create_completion(
+                    model=model,
+                    messages=messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature
+                )
+                
+                result = {
+                    "success": True,
+                    "response": response.choices[0].message.content,
+                    "usage": response.usage.dict() if response.usage else {},
+                    "model": model
+                }
+                if use_cache:
+                    self.response_cache.set(cache_key, result)
+                return result
             
-            return {
-                "success": True,
-                "response": response.choices[0].message.content,
-                "usage": response.usage.dict() if response.usage else {},
-                "model": self.model
-            }
+            return await self._run_once(cache_key, use_cache, complete)
         
         except Exception as e:
             return {
@@ -94,8 +336,11 @@ class GPTService:
                 "response": None
             }
     
-    async def generate_vision_response(self, prompt: str, image_bytes: bytes, system_message: str = None) -> Dict[str, Any]:
-        """Generate response using vision model for image + text analysis"""
+    async def generate_vision_response(self, prompt: str, image_bytes: ImageInput, system_message: str = None, use_cache: bool = True) -> Dict[str, Any]:
+        """Generate response using vision model for image + text analysis
+        
+        image_bytes may be raw upload bytes or a PreparedImage from prepare_image().
+        """
         try:
             # Check if current model supports vision
             if not self.vision_supported:
@@ -105,46 +350,41 @@ class GPTService:
                     "response": None
                 }
             
-            # Resize image if needed
-            processed_image = self.resize_image_if_needed(image_bytes)
-            base64_image = self.encode_image_from_bytes(processed_image)
-            
-            messages = []
-            
-            if system_message:
-                messages.append({"role": "system", "content": system_message})
-            
-            # Create message with image and text
-            # Together AI uses a different format for vision models
-            user_message = {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": prompt},
-                    {
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
-                        }
-                    }
-                ]
-            }
-            messages.append(user_message)
+            # Key on the original upload so hits skip image preprocessing entirely
+            cache_key = self._cache_key(prompt, system_message, image_bytes)
+            if use_cache:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    return {**cached, "cached": True}
             
-            response = await asyncio.to_thread(
-                self.client.chat.completions.create,
-                model=self.model,
-                messages=messages,
-                max_tokens=self.max_tokens,
-                temperature=self.temperature,
-                stream=False
-            )
+            async def complete() -> Dict[str, Any]:
+                # Resize and encode image if not already prepared
+                prepared_image = await self._ensure_prepared(image_bytes)
+                
+                with stage_timer("prompt_build"):
+                    messages = self._build_messages(prompt, system_message, prepared_image.data_url)
+                    model = self._choose_model(messages, has_image=True)
+                
+                response, model = await self._create_completion(
+                    model=model,
+                    messages=messages,
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    stream=False
+                )
+                
+                result = {
+                    "success": True,
+                    "response": response.choices[0].message.content,
+                    "usage": response.usage.dict() if response.usage else {},
+                    "model": model
+                }
+                if use_cache:
+                    self.response_cache.set(cache_key, result)
+                return result
             
-            return {
-                "success": True,
-                "response": response.choices[0].message.content,
-                "usage": response.usage.dict() if response.usage else {},
-                "model": self.model
-            }
+            # Duplicates also skip image preprocessing
+            return await self._run_once(cache_key, use_cache, complete)
         
         except Exception as e:
             return {
@@ -153,11 +393,148 @@ class GPTService:
                 "response": None
             }
     
+    async def stream_response(self,
+                              prompt: str,
+                              image_bytes: Optional[ImageInput] = None,
+                              system_message: str = None,
+                              use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a completion as events: 'delta' for each token chunk, then 'done' or 'error'
+
+        A stream occupies one of GPT_MAX_CONCURRENT_STREAMS slots until it ends or the consumer closes
+        this generator (e.g. on client disconnect), which also closes the upstream connection.
+        """
+        try:
+            cache_key = self._cache_key(prompt, system_message, image_bytes)
+            if use_cache:
+                cached = self.response_cache.get(cache_key)
+                if cached is not None:
+                    yield {"type": "delta", "content": cached["response"]}
+                    yield {
+                        "type": "done",
+                        "usage": cached.get("usage", {}),
+                        "model": cached.get("model", self.model),
+                        "ttft_ms": 0.0,
+                        "total_ms": 0.0,
+                        "cached": True
+                    }
+                    return
+            
+            image_url = None
+            if image_bytes:
+                if not self.vision_supported:
+                    yield {
+                        "type": "error",
+                        "error": f"Current model '{self.model}' does not support vision. Please use a vision-capable model for image analysis."
+                    }
+                    return
+                image_url = (await self._ensure_prepared(image_bytes)).data_url
+            
+            with stage_timer("prompt_build"):
+                messages = self._build_messages(prompt, system_message, image_url)
+                model = self._choose_model(messages, has_image=image_url is not None)
+            
+            start = time.perf_counter()
+            ttft_ms = None
+            usage = {}
+            parts = []
+            estimated_tokens = estimate_tokens(messages, self.max_tokens)
+            tried = []
+            
+            async def open_stream():
+                backend = self.backend_pool.select(exclude=tried)
+                tried.append(backend)
+                
+                async def send():
+                    with stage_timer("rate_limit_wait"):
+                        await backend.rate_limiter.acquire(estimated_tokens)
+                    return await self.recorder.create(
+                        backend.client,
+                        model=backend.model or model,
+                        messages=messages,
+                        max_tokens=self.max_tokens,
+                        temperature=self.temperature,
+                        stream=True
+                    )
+                
+                # The lease covers opening too, so the backend's max_concurrency bounds streams; once
+                # the stream exists it is closed (then the lease released) by the caller's exit stack
+                async with AsyncExitStack() as attempt:
+                    await attempt.enter_async_context(self.backend_pool.lease(backend))
+                    stream = await call_through(backend.breaker, send)
+                    await attempt.enter_async_context(close_stream(stream))
+                    held.push_async_exit(attempt.pop_all())
+                return backend, stream
+            
+            async with self._stream_semaphore, AsyncExitStack() as held:
+                # Only opening the stream is retried; errors after the first token are reported as-is
+                backend, stream = await self.retry_policy.call(open_stream)
+                # Report the model actually sent (a backend's configured model overrides the routed one)
+                model = backend.model or model
+                async for chunk in stream:
+                    # Some providers attach usage to the final chunk
+                    chunk_usage = getattr(chunk, "usage", None)
+                    if chunk_usage:
+                        usage = chunk_usage if isinstance(chunk_usage, dict) else chunk_usage.dict()
+                    
+                    if not chunk.choices:
+                        continue
+                    content = chunk.choices[0].delta.content
+                    if not content:
+                        continue
+                    
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                        self._ttft_samples.append(ttft_ms)
+                        observe_stage("provider_ttft", ttft_ms / 1000)
+                    parts.append(content)
+                    yield {"type": "delta", "content": content}
+            
+            backend.rate_limiter.record_usage(estimated_tokens, usage.get("total_tokens"))
+            observe_stage("provider_stream", time.perf_counter() - start)
+            record_llm_call(model, usage)
+            
+            if use_cache:
+                self.response_cache.set(cache_key, {
+                    "success": True,
+                    "response": "".join(parts),
+                    "usage": usage,
+                    "model": model
+                })
+            
+            yield {
+                "type": "done",
+                "usage": usage,
+                "model": model,
+                "ttft_ms": ttft_ms,
+                "total_ms": (time.perf_counter() - start) * 1000,
+                "cached": False
+            }
+        
+        except Exception as e:
+            yield {"type": "error", "error": str(e)}
+    
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Get per-model latency percentiles and routing counts"""
+        return self.model_router.get_stats()
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Get time-to-first-token statistics for recent streamed responses"""
+        samples = sorted(self._ttft_samples)
+        if not samples:
+            return {"count": 0}
+        return {
+            "count": len(samples),
+            "ttft_ms_avg": sum(samples) / len(samples),
+            "ttft_ms_p50": samples[len(samples) // 2],
+            "ttft_ms_p95": samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        }
+    
     async def process_multimodal_request(self, 
                                        prompt: str, 
                                        tactile_data: Optional[str] = None,
-                                       image_bytes: Optional[bytes] = None,
-                                       text_context: Optional[str] = None) -> Dict[str, Any]:
+                                       image_bytes: Optional[ImageInput] = None,
+                                       text_context: Optional[str] = None,
+                                       use_cache: bool = True) -> Dict[str, Any]:
         """Process a multimodal request with various input combinations"""
         
         # Construct enhanced prompt with available modalities
@@ -179,7 +556,7 @@ class GPTService:
         
         # Choose appropriate method based on available inputs and model capabilities
         if image_bytes and self.vision_supported:
-            return await self.generate_vision_response(enhanced_prompt, image_bytes, system_message)
+            return await self.generate_vision_response(enhanced_prompt, image_bytes, system_message, use_cache)
         elif image_bytes and not self.vision_supported:
             # If image provided but model doesn't support vision, return error
             return {
@@ -188,11 +565,12 @@ class GPTService:
                 "response": None
             }
         else:
-            return await self.generate_text_response(enhanced_prompt, system_message)
+            return await self.generate_text_response(enhanced_prompt, system_message, use_cache)
     
     async def process_qa_request(self, 
                                question: str,
-                               context_data: Dict[str, Any]) -> Dict[str, Any]:
+                               context_data: Dict[str, Any],
+                               use_cache: bool = True) -> Dict[str, Any]:
         """Process a question-answering request with multimodal context"""
         
         # Build context from available modalities
@@ -226,7 +604,8 @@ class GPTService:
             return await self.generate_vision_response(
                 qa_prompt, 
                 context_data["image"], 
-                system_message
+                system_message,
+                use_cache
             )
         elif "image" in context_data and not self.vision_supported:
             return {
@@ -235,11 +614,12 @@ class GPTService:
                 "response": None
             }
         else:
-            return await self.generate_text_response(qa_prompt, system_message)
+            return await self.generate_text_response(qa_prompt, system_message, use_cache)
     
     async def generate_few_shot_response(self, 
                                        examples: List[Dict[str, Any]], 
-                                       current_input: Dict[str, Any]) -> Dict[str, Any]:
+                                       current_input: Dict[str, Any],
+                                       use_cache: bool = True) -> Dict[str, Any]:
         """Generate response using few-shot learning approach"""
         
         # Format examples
@@ -282,7 +662,8 @@ class GPTService:
             return await self.generate_vision_response(
                 few_shot_prompt, 
                 current_input["image"], 
-                system_message
+                system_message,
+                use_cache
             )
         elif "image" in current_input and not self.vision_supported:
             return {
@@ -291,14 +672,81 @@ class GPTService:
                 "response": None
             }
         else:
-            return await self.generate_text_response(few_shot_prompt, system_message)
+            return await self.generate_text_response(few_shot_prompt, system_message, use_cache)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get response cache hit/miss counters"""
+        return self.response_cache.get_stats()
+    
+    def warm_cache(self) -> Dict[str, Any]:
+        """Compact the on-disk response store and preload its recent entries (called on startup)"""
+        store = self.response_cache.shared
+        if store is None or not CACHE_WARMUP:
+            return {"warmed": 0}
+        start = time.perf_counter()
+        compaction = store.compact() if store is get_persistent_cache() else None
+        warmed = self.response_cache.warm()
+        return {"warmed": warmed, "compaction": compaction, "ms": (time.perf_counter() - start) * 1000}
     
-    def get_model_info(self) -> Dict[str, Any]:
-        """Get information about the current model configuration"""
+    def get_image_cache_stats(self) -> Dict[str, Any]:
+        """Get prepared image cache hit/miss counters"""
+        return prepared_image_cache.get_stats()
+    
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Get counters for upstream calls saved by request coalescing"""
+        return self.coalescer.get_stats()
+    
+    def get_resilience_stats(self) -> Dict[str, Any]:
+        """Get retry counters and circuit breaker state for every backend"""
         return {
+            "retries": self.retry_policy.get_stats(),
+            "circuit_breaker": self.circuit_breaker.get_stats(),
+            "circuit_breakers": {
+                backend.name: backend.breaker.get_stats() for backend in self.backend_pool.backends
+            }
+        }
+    
+    def get_backend_stats(self) -> Dict[str, Any]:
+        """Get routing policy and per-backend load, latency and health"""
+        return self.backend_pool.get_stats()
+    
+    def get_rate_limit_stats(self) -> Dict[str, Any]:
+        """Get rate limiter queue depth, wait times and remaining budget"""
+        return self.rate_limiter.get_stats()
+    
+    def get_record_replay_stats(self) -> Dict[str, Any]:
+        """Get upstream record/replay mode and counters"""
+        return self.recorder.get_stats()
+    
+    def get_hedging_stats(self) -> Dict[str, Any]:
+        """Get hedged request counts and duplicate rate"""
+        return self.hedger.get_stats()
+    
+    def get_image_stats(self) -> Dict[str, Any]:
+        """Get image preprocessing queue depth and wait time"""
+        return self.image_processor.get_stats()
+    
+    def get_model_info(self, model_used: Optional[str] = None) -> Dict[str, Any]:
+        """Get information about the current model configuration, and the model a request was routed to"""
+        info = {
             "model": self.model,
             "base_url": self.base_url,
             "max_tokens": self.max_tokens,
             "temperature": self.temperature,
-            "vision_supported": self.vision_supported
-        } 
\ No newline at end of file
+            "vision_supported": self.vision_supported,
+            "max_concurrency": self.max_concurrency,
+            "max_streams": self.max_streams,
+            "model_routing": self.model_router.enabled,
+            "text_models": self.model_router.text_models,
+            "vision_models": self.model_router.vision_models
+        }
+        if model_used:
+            info["model_used"] = model_used
+        return info 
+
+def get_gpt_service() -> GPTService:
+    """Return the process-wide GPTService, so every router shares one cache, router and set of limits"""
+    global _shared_gpt_service
+    if _shared_gpt_service is None:
+        _shared_gpt_service = GPTService()
+    return _shared_gpt_service
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Dict, Any, Awaitable, Callable, Optional, TypeVar
+
+# Hedged request settings (off by default: hedges spend extra provider quota)
+HEDGING_ENABLED = os.getenv("GPT_HEDGING", "false").lower() in ("1", "true", "yes")
+# Send the duplicate once the first call is slower than this percentile of recent latencies
+HEDGE_PERCENTILE = float(os.getenv("GPT_HEDGE_PERCENTILE", "0.95"))
+# At most this fraction of calls may be duplicated
+HEDGE_MAX_RATE = float(os.getenv("GPT_HEDGE_MAX_RATE", "0.05"))
+HEDGE_MIN_DELAY_MS = float(os.getenv("GPT_HEDGE_MIN_DELAY_MS", "500"))
+# Latency samples needed (per model) before hedging starts
+HEDGE_MIN_SAMPLES = int(os.getenv("GPT_HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = 500
+
+T = TypeVar("T")
+
+class Hedger:
+    """Duplicates slow calls after a latency percentile; the first success wins and the other is cancelled"""
+
+    def __init__(self,
+                 enabled: bool = HEDGING_ENABLED,
+                 percentile: float = HEDGE_PERCENTILE,
+                 max_rate: float = HEDGE_MAX_RATE,
+                 min_delay_ms: float = HEDGE_MIN_DELAY_MS,
+                 min_samples: int = HEDGE_MIN_SAMPLES):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_delay_ms = min_delay_ms
+        self.min_samples = min_samples
+        self.latencies: Dict[str, deque] = {}
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.capped = 0
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there are too few samples"""
+        samples = self.latencies.get(key)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        threshold = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+        return max(threshold, self.min_delay_ms) / 1000
+
+    def _may_hedge(self) -> bool:
+        if self.hedged + 1 > self.max_rate * self.calls:
+            self.capped += 1
+            return False
+        return True
+
+    async def run(self, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """Await call(), starting a second call() if the first is slow; key groups latency samples (e.g. model)"""
+        if not self.enabled:
+            return await call()
+
+        self.calls += 1
+        start = time.perf_counter()
+        delay = self.hedge_delay(key)
+        primary = asyncio.ensure_future(call())
+        tasks = {primary}
+        hedge = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self._may_hedge():
+                    self.hedged += 1
+                    hedge = asyncio.ensure_future(call())
+                    tasks.add(hedge)
+
+            while True:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                succeeded = [task for task in done if task.exception() is None]
+                if not succeeded:
+                    # A failure only counts once no other call is still running
+                    if pending:
+                        tasks = pending
+                        continue
+                    return next(iter(done)).result()
+                winner = succeeded[0]
+                if winner is hedge:
+                    self.hedge_wins += 1
+                self.latencies.setdefault(key, deque(maxlen=LATENCY_WINDOW)).append(
+                    (time.perf_counter() - start) * 1000
+                )
+                tasks = pending
+                return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hedge counts and the duplicate rate"""
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "max_rate": self.max_rate,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "capped": self.capped,
+            "duplicate_rate": self.hedged / self.calls if self.calls else 0.0,
+            "hedge_delay_ms": {
+                key: delay * 1000 for key in self.latencies
+                if (delay := self.hedge_delay(key)) is not None
+            }
+        }
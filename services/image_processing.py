@@ -0,0 +1,228 @@
+import asyncio
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+from PIL import Image
+
+# Image preprocessing executor settings
+# IMAGE_EXECUTOR: "process" (default), "thread", or "inline" (run on the event loop)
+IMAGE_EXECUTOR = os.getenv("IMAGE_EXECUTOR", "process").lower()
+# Default pool size splits the CPUs between uvicorn workers (WEB_CONCURRENCY), each of which has its own pool
+IMAGE_WORKERS = int(os.getenv(
+    "IMAGE_WORKERS",
+    str(max(1, (os.cpu_count() or 2) // max(1, int(os.getenv("WEB_CONCURRENCY", "1")))))
+))
+IMAGE_MAX_QUEUE = int(os.getenv("IMAGE_MAX_QUEUE", "64"))
+# Opt-in fast mode: decoder-level downscaling (JPEG draft / reduce) + bilinear instead of full decode + LANCZOS
+IMAGE_FAST_MODE = os.getenv("IMAGE_FAST_MODE", "false").lower() in ("1", "true", "yes")
+
+class ImageQueueFullError(RuntimeError):
+    """Raised when too many images are already waiting for preprocessing"""
+
+def _decoded_bytes(image: Image.Image) -> int:
+    """Approximate size of the decoded pixel buffer"""
+    return image.size[0] * image.size[1] * len(image.getbands())
+
+def resize_image_with_info(image_bytes: bytes,
+                           max_size: int = 1024,
+                           fast: bool = IMAGE_FAST_MODE) -> Tuple[bytes, Dict[str, Any]]:
+    """Resize image if it's too large and re-encode it as JPEG, returning per-image stats"""
+    cpu_start = time.thread_time()
+    info = {"path": "fast" if fast else "lanczos", "input_bytes": len(image_bytes)}
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        source_size = image.size
+        info["source_size"] = source_size
+        # What a full-resolution decode would allocate
+        info["full_decode_bytes"] = source_size[0] * source_size[1] * len(image.getbands())
+
+        needs_resize = max(source_size) > max_size
+        if needs_resize:
+            # Calculate new size maintaining aspect ratio
+            ratio = max_size / max(source_size)
+            new_size = tuple(int(dim * ratio) for dim in source_size)
+
+        if fast and not needs_resize and image.format == "JPEG":
+            # Already small enough and already JPEG: send as-is without decoding
+            info["path"] = "passthrough"
+            info["decoded_bytes"] = 0
+            info["output_bytes"] = len(image_bytes)
+            info["cpu_ms"] = (time.thread_time() - cpu_start) * 1000
+            return image_bytes, info
+
+        if fast and needs_resize:
+            if image.format == "JPEG":
+                # Let libjpeg decode at 1/2, 1/4 or 1/8 scale, no smaller than the target
+                image.draft(image.mode, new_size)
+            image.load()
+            info["decoded_bytes"] = _decoded_bytes(image)
+            factor = min(image.size[0] // new_size[0], image.size[1] // new_size[1])
+            if factor >= 2:
+                # Cheap box reduction down to within 2x of the target
+                image = image.reduce(factor)
+            image = image.resize(new_size, Image.Resampling.BILINEAR)
+        else:
+            image.load()
+            info["decoded_bytes"] = _decoded_bytes(image)
+            if needs_resize:
+                image = image.resize(new_size, Image.Resampling.LANCZOS)
+
+        if fast and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        # Convert back to bytes
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=85)
+        result = output.getvalue()
+    except Exception:
+        # If resizing fails, return original bytes
+        info["path"] = "failed"
+        result = image_bytes
+
+    info["output_bytes"] = len(result)
+    info["cpu_ms"] = (time.thread_time() - cpu_start) * 1000
+    return result, info
+
+def resize_image(image_bytes: bytes, max_size: int = 1024, fast: bool = IMAGE_FAST_MODE) -> bytes:
+    """Resize image if it's too large and re-encode it as JPEG"""
+    return resize_image_with_info(image_bytes, max_size, fast)[0]
+
+def _timed_resize(image_bytes: bytes, max_size: int, fast: bool) -> Tuple[bytes, Dict[str, Any], float, float]:
+    """Worker entry point: returns the result and stats with wall-clock start/end times"""
+    started = time.time()
+    result, info = resize_image_with_info(image_bytes, max_size, fast)
+    return result, info, started, time.time()
+
+class ImageProcessor:
+    """Runs image preprocessing off the event loop with a bounded queue"""
+
+    def __init__(self,
+                 executor_type: str = IMAGE_EXECUTOR,
+                 max_workers: int = IMAGE_WORKERS,
+                 max_queue: int = IMAGE_MAX_QUEUE,
+                 fast_mode: bool = IMAGE_FAST_MODE):
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.fast_mode = fast_mode
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.pool_restarts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_process_ms = 0.0
+        # Per-path aggregates (passthrough / fast / lanczos / failed) and recent per-image records
+        self.path_stats: Dict[str, Dict[str, float]] = {}
+        self.recent = deque(maxlen=20)
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.executor_type == "inline":
+            return None
+        if self._executor is None:
+            if self.executor_type == "thread":
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image")
+            else:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def resize(self, image_bytes: bytes, max_size: int = 1024) -> bytes:
+        """Resize/re-encode an image in the configured executor"""
+        if self._pending >= self.max_queue:
+            self.rejected += 1
+            raise ImageQueueFullError(
+                f"Image preprocessing queue is full ({self.max_queue} pending), please retry later"
+            )
+
+        self._pending += 1
+        submitted = time.time()
+        try:
+            executor = self._get_executor()
+            if executor is None:
+                result, info, started, finished = _timed_resize(image_bytes, max_size, self.fast_mode)
+            else:
+                loop = asyncio.get_running_loop()
+                try:
+                    result, info, started, finished = await loop.run_in_executor(
+                        executor, _timed_resize, image_bytes, max_size, self.fast_mode
+                    )
+                except BrokenExecutor:
+                    # A worker died (e.g. killed by the OOM killer): start a fresh pool for the next image
+                    if self._executor is executor:
+                        self._executor = None
+                        self.pool_restarts += 1
+                        executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+        finally:
+            self._pending -= 1
+
+        wait_ms = max(0.0, (started - submitted) * 1000)
+        self.completed += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.total_process_ms += (finished - started) * 1000
+        self._record(info)
+        return result
+
+    def _record(self, info: Dict[str, Any]) -> None:
+        stats = self.path_stats.setdefault(
+            info["path"], {"count": 0, "cpu_ms": 0.0, "decoded_bytes": 0, "full_decode_bytes": 0}
+        )
+        stats["count"] += 1
+        stats["cpu_ms"] += info.get("cpu_ms", 0.0)
+        stats["decoded_bytes"] += info.get("decoded_bytes", 0)
+        stats["full_decode_bytes"] += info.get("full_decode_bytes", 0)
+        self.recent.append(info)
+
+    def shutdown(self) -> None:
+        """Stop worker processes/threads, dropping queued work (waiting lets the pool close its pipes before exit)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth and wait/processing time counters"""
+        return {
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "pool_restarts": self.pool_restarts,
+            "avg_wait_ms": self.total_wait_ms / self.completed if self.completed else 0.0,
+            "max_wait_ms": self.max_wait_ms,
+            "avg_process_ms": self.total_process_ms / self.completed if self.completed else 0.0,
+            "fast_mode": self.fast_mode,
+            "paths": {
+                path: {
+                    "count": stats["count"],
+                    "avg_cpu_ms": stats["cpu_ms"] / stats["count"],
+                    "avg_decoded_bytes": stats["decoded_bytes"] / stats["count"],
+                    "avg_full_decode_bytes": stats["full_decode_bytes"] / stats["count"]
+                }
+                for path, stats in self.path_stats.items()
+            },
+            "recent": list(self.recent)
+        }
+
+_shared_image_processor: Optional[ImageProcessor] = None
+
+def get_image_processor() -> ImageProcessor:
+    """Return the process-wide image processor shared by all GPTService instances"""
+    global _shared_image_processor
+    if _shared_image_processor is None:
+        _shared_image_processor = ImageProcessor()
+    return _shared_image_processor
+
+def shutdown_image_processor() -> None:
+    """Shut down the shared image processor (called on application shutdown)"""
+    global _shared_image_processor
+    if _shared_image_processor is not None:
+        _shared_image_processor.shutdown()
+    _shared_image_processor = None
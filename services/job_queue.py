@@ -0,0 +1,266 @@
+import asyncio
+import contextvars
+import time
+import os
+import uuid
+from collections import OrderedDict, deque
+from typing import Dict, Any, Awaitable, Callable, Optional
+
+from services.shared_cache import SharedCache, get_shared_cache
+
+# Background job settings
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+# Finished jobs are kept this long (seconds), and at most JOB_MAX_RETAINED of them
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+JOB_MAX_RETAINED = int(os.getenv("JOB_MAX_RETAINED", "1000"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "600"))
+# How often (seconds) a long-poll for a job owned by another worker re-reads the shared cache
+JOB_SHARED_POLL_INTERVAL = 0.25
+# Backoff (seconds) for publishing a finished job when the shared cache is busy; other workers poll for it
+JOB_PUBLISH_RETRY_DELAYS = (0.05, 0.2, 1.0, 3.0)
+
+class JobQueueFullError(RuntimeError):
+    """Raised when too many jobs are already waiting to run"""
+
+class Job:
+    """One submitted unit of work and its outcome"""
+
+    def __init__(self, kind: str, run: Callable[[], Awaitable[Any]]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._run = run
+        # Run in the submitter's context so request-scoped state (priority, metrics endpoint) carries over
+        self._context = contextvars.copy_context()
+        self._done = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self, include_result: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_ms": (self.started_at - self.submitted_at) * 1000 if self.started_at else None,
+            "run_ms": (self.finished_at - self.started_at) * 1000 if self.finished_at and self.started_at else None,
+            "error": self.error
+        }
+        if include_result:
+            data["result"] = self.result
+        return data
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "Job":
+        """Read-only view of a job run by another worker process"""
+        job = cls.__new__(cls)
+        job.id = data["job_id"]
+        job.kind = data["kind"]
+        job.status = data["status"]
+        job.result = data.get("result")
+        job.error = data.get("error")
+        job.submitted_at = data["submitted_at"]
+        job.started_at = data.get("started_at")
+        job.finished_at = data.get("finished_at")
+        job._run = job._context = job._done = None
+        return job
+
+class JobQueue:
+    """In-memory job store with a bounded queue and a fixed pool of asyncio workers
+
+    Jobs run in the process that accepted them. With SHARED_CACHE_PATH set, status snapshots are
+    also written to the shared cache so any worker can answer status and result requests.
+    """
+
+    def __init__(self,
+                 workers: int = JOB_WORKERS,
+                 max_queued: int = JOB_MAX_QUEUED,
+                 result_ttl: float = JOB_RESULT_TTL,
+                 max_retained: int = JOB_MAX_RETAINED,
+                 timeout: float = JOB_TIMEOUT,
+                 shared: Optional[SharedCache] = None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self.timeout = timeout
+        self.shared = shared if shared is not None else get_shared_cache()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks = []
+        self._running = 0
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.recent_queue_ms = deque(maxlen=500)
+        self.recent_run_ms = deque(maxlen=500)
+
+    def _ensure_workers(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if not self._worker_tasks:
+            loop = asyncio.get_running_loop()
+            self._worker_tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, kind: str, run: Callable[[], Awaitable[Any]]) -> Job:
+        """Queue run() as a job; raises JobQueueFullError when JOB_MAX_QUEUED jobs are waiting"""
+        self._ensure_workers()
+        self._purge()
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            raise JobQueueFullError(f"Job queue is full ({self.max_queued} waiting), please retry later")
+        job = Job(kind, run)
+        self._jobs[job.id] = job
+        self._queue.put_nowait(job)
+        self.submitted += 1
+        self._publish(job)
+        return job
+
+    def _publish(self, job: Job) -> bool:
+        """Write the job's current state to the shared cache for other workers; False if it was busy"""
+        if self.shared is None:
+            return True
+        return self.shared.set("jobs", job.id, job.to_dict(include_result=job.finished), self.timeout + self.result_ttl)
+
+    async def _publish_finished(self, job: Job) -> None:
+        """Unlike queued/running snapshots, the final one must land, so retry it without blocking the loop"""
+        for delay in JOB_PUBLISH_RETRY_DELAYS:
+            if self._publish(job):
+                return
+            await asyncio.sleep(delay)
+        self._publish(job)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = "running"
+            job.started_at = time.time()
+            self._running += 1
+            self._publish(job)
+            try:
+                task = job._context.run(asyncio.ensure_future, job._run())
+                job.result = await asyncio.wait_for(task, timeout=self.timeout)
+                job.status = "succeeded"
+                self.succeeded += 1
+            except asyncio.TimeoutError:
+                job.status = "failed"
+                job.error = f"Job timed out after {self.timeout}s"
+                self.failed += 1
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                self.failed += 1
+            finally:
+                self._running -= 1
+                job.finished_at = time.time()
+                job._run = job._context = None
+                self.recent_queue_ms.append((job.started_at - job.submitted_at) * 1000)
+                self.recent_run_ms.append((job.finished_at - job.started_at) * 1000)
+                job._done.set()
+                self._queue.task_done()
+                await self._publish_finished(job)
+
+    def _purge(self) -> None:
+        """Drop finished jobs past their TTL, then the oldest finished ones over JOB_MAX_RETAINED"""
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished:
+            if now - job.finished_at > self.result_ttl:
+                del self._jobs[job.id]
+                self.expired += 1
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.max_retained)]:
+            del self._jobs[job.id]
+            self.expired += 1
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Job by id (from this process or, failing that, the shared cache), or None if unknown or expired"""
+        self._purge()
+        job = self._jobs.get(job_id)
+        if job is None and self.shared is not None:
+            snapshot = self.shared.get("jobs", job_id)
+            if snapshot is not None:
+                job = Job.from_snapshot(snapshot)
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Job]:
+        """Long-poll: return once the job finishes or timeout seconds pass"""
+        job = self.get(job_id)
+        if job is None or job.finished or timeout <= 0:
+            return job
+        if job._done is None:
+            # Running in another worker: poll its shared snapshot
+            deadline = time.monotonic() + timeout
+            while not job.finished and time.monotonic() < deadline:
+                await asyncio.sleep(min(JOB_SHARED_POLL_INTERVAL, deadline - time.monotonic()))
+                job = self.get(job_id) or job
+            return job
+        try:
+            await asyncio.wait_for(job._done.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def shutdown(self) -> None:
+        """Cancel workers (called on application shutdown)"""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, outcome counters and job-level timing"""
+        def summary(samples) -> Dict[str, Any]:
+            ordered = sorted(samples)
+            if not ordered:
+                return {"count": 0}
+            return {
+                "count": len(ordered),
+                "avg": sum(ordered) / len(ordered),
+                "p50": ordered[len(ordered) // 2],
+                "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            }
+
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._running,
+            "retained": len(self._jobs),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+            "queue_ms": summary(self.recent_queue_ms),
+            "run_ms": summary(self.recent_run_ms)
+        }
+
+_shared_job_queue: Optional[JobQueue] = None
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue"""
+    global _shared_job_queue
+    if _shared_job_queue is None:
+        _shared_job_queue = JobQueue()
+    return _shared_job_queue
+
+async def shutdown_job_queue() -> None:
+    """Stop job workers (called on application shutdown)"""
+    global _shared_job_queue
+    if _shared_job_queue is not None:
+        await _shared_job_queue.shutdown()
+    _shared_job_queue = None
@@ -0,0 +1,213 @@
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple
+
+# Prometheus-format metrics served at /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Per-request stage breakdown in a Server-Timing response header
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = tuple(float(4 ** i) for i in range(4, 16))  # 256 B .. 256 MiB
+
+# The ASGI scope of the request being handled, for endpoint labels and parse timing
+_request_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("request_scope", default=None)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter per label set"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+class Histogram:
+    """Fixed-bucket histogram per label set"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, labels: Tuple[str, ...] = ()) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+STAGE_SECONDS = Histogram(
+    "app_stage_duration_seconds", "Time spent in each request processing stage", ("stage", "endpoint")
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "app_http_request_duration_seconds", "HTTP request latency", ("endpoint", "method", "status")
+)
+HTTP_REQUEST_BYTES = Histogram(
+    "app_http_request_size_bytes", "HTTP request body size", ("endpoint",), SIZE_BUCKETS
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "app_http_response_size_bytes", "HTTP response body size", ("endpoint",), SIZE_BUCKETS
+)
+LLM_REQUESTS = Counter(
+    "app_llm_requests_total", "Upstream completion calls", ("endpoint", "model", "outcome")
+)
+LLM_TOKENS = Counter(
+    "app_llm_tokens_total", "Tokens reported in upstream usage", ("endpoint", "model", "type")
+)
+
+REGISTRY = [STAGE_SECONDS, HTTP_REQUEST_SECONDS, HTTP_REQUEST_BYTES, HTTP_RESPONSE_BYTES, LLM_REQUESTS, LLM_TOKENS]
+
+def current_endpoint() -> str:
+    """Route template of the current request (e.g. /api/multimodal/unified-analysis), or "none" outside one"""
+    scope = _request_scope.get()
+    if scope is None:
+        return "none"
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+def observe_stage(stage: str, seconds: float) -> None:
+    if METRICS_ENABLED:
+        STAGE_SECONDS.observe(seconds, (stage, current_endpoint()))
+    if SERVER_TIMING_ENABLED:
+        scope = _request_scope.get()
+        if scope is not None:
+            # Repeated stages (e.g. retried provider calls) add up
+            timings = scope.setdefault("server_timing", {})
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def stage_timer(stage: str):
+    """Record the duration of the with-block as a stage of the current request"""
+    if not (METRICS_ENABLED or SERVER_TIMING_ENABLED):
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+def observe_request_parsing() -> None:
+    """Call first thing in a handler: time from request arrival to here is body receipt + multipart parsing"""
+    scope = _request_scope.get()
+    if scope is not None and "metrics_start" in scope:
+        observe_stage("multipart_parse", time.perf_counter() - scope["metrics_start"])
+
+def server_timing_header(timings: Dict[str, float], total_seconds: float) -> bytes:
+    """Server-Timing value with each stage and the total so far in milliseconds"""
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries).encode("latin-1")
+
+def record_llm_call(model: str, usage: Any, ok: bool = True) -> None:
+    """Count an upstream call and its token usage (an openai usage object or dict)"""
+    if not METRICS_ENABLED:
+        return
+    endpoint = current_endpoint()
+    LLM_REQUESTS.inc((endpoint, model, "success" if ok else "error"))
+    if not usage:
+        return
+    if not isinstance(usage, dict):
+        usage = {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if usage.get(kind):
+            LLM_TOKENS.inc((endpoint, model, kind[:-len("_tokens")]), usage[kind])
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and request/response sizes per route template
+
+    Also adds the Server-Timing header; for streamed responses it covers the stages before the first byte.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (METRICS_ENABLED or SERVER_TIMING_ENABLED):
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        scope["metrics_start"] = start
+        token = _request_scope.set(scope)
+        sizes = {"request": 0, "response": 0}
+        status = {"code": 500}
+
+        async def counting_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                sizes["request"] += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                timings = scope.get("server_timing")
+                if SERVER_TIMING_ENABLED and timings:
+                    message = {**message, "headers": list(message.get("headers", [])) + [
+                        (b"server-timing", server_timing_header(timings, time.perf_counter() - start)),
+                        # Lets cross-origin pages (the dev frontend) read the timings
+                        (b"timing-allow-origin", b"*")
+                    ]}
+            elif message["type"] == "http.response.body":
+                sizes["response"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            _request_scope.reset(token)
+            if METRICS_ENABLED:
+                endpoint = getattr(scope.get("route"), "path", "unmatched")
+                HTTP_REQUEST_SECONDS.observe(
+                    time.perf_counter() - start, (endpoint, scope["method"], str(status["code"]))
+                )
+                HTTP_REQUEST_BYTES.observe(sizes["request"], (endpoint,))
+                HTTP_RESPONSE_BYTES.observe(sizes["response"], (endpoint,))
@@ -0,0 +1,95 @@
+import os
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+# Model routing settings
+MODEL_ROUTING_ENABLED = os.getenv("GPT_MODEL_ROUTING", "true").lower() in ("1", "true", "yes")
+# Fast text-only models tried for requests without images (comma-separated)
+TEXT_MODELS = [m.strip() for m in os.getenv("GPT_TEXT_MODELS", "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free").split(",") if m.strip()]
+# Vision-capable models (comma-separated); defaults to GPTService.model
+VISION_MODELS = [m.strip() for m in os.getenv("GPT_VISION_MODELS", "").split(",") if m.strip()]
+# Prompts above this many (estimated) tokens are routed on p95 instead of p50
+LONG_PROMPT_TOKENS = int(os.getenv("GPT_ROUTER_LONG_PROMPT_TOKENS", "2000"))
+# Each candidate is tried this many times before latency decides
+MIN_SAMPLES = int(os.getenv("GPT_ROUTER_MIN_SAMPLES", "5"))
+LATENCY_WINDOW = 200
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class ModelRouter:
+    """Picks a model per request from modality, prompt length and observed p50/p95 latency"""
+
+    def __init__(self,
+                 default_model: str,
+                 text_models: List[str] = TEXT_MODELS,
+                 vision_models: List[str] = VISION_MODELS,
+                 enabled: bool = MODEL_ROUTING_ENABLED,
+                 failure_penalty_ms: float = 120000.0):
+        self.default_model = default_model
+        self.enabled = enabled
+        self.vision_models = vision_models or [default_model]
+        # Vision models can answer text too, so they stay in the running if they turn out faster
+        self.text_models = list(dict.fromkeys(text_models + self.vision_models))
+        self.failure_penalty_ms = failure_penalty_ms
+        self.latencies: Dict[str, deque] = {}
+        self.chosen: Dict[str, int] = {}
+
+    def candidates(self, has_image: bool) -> List[str]:
+        if not self.enabled:
+            return [self.default_model]
+        return self.vision_models if has_image else self.text_models
+
+    def route_key(self, has_image: bool) -> str:
+        """Stable name for the candidate set, used in cache keys so routing changes don't miss the cache"""
+        return ",".join(self.candidates(has_image))
+
+    def choose(self, has_image: bool, prompt_tokens: int = 0) -> str:
+        """Least-sampled candidate until each has MIN_SAMPLES, then lowest p50 (p95 for long prompts)"""
+        candidates = self.candidates(has_image)
+        model = candidates[0]
+        if len(candidates) > 1:
+            counts = {m: len(self.latencies.get(m, ())) for m in candidates}
+            cold = [m for m in candidates if counts[m] < MIN_SAMPLES]
+            if cold:
+                model = min(cold, key=lambda m: counts[m])
+            else:
+                fraction = 0.95 if prompt_tokens > LONG_PROMPT_TOKENS else 0.5
+                model = min(candidates, key=lambda m: percentile(list(self.latencies[m]), fraction))
+        self.chosen[model] = self.chosen.get(model, 0) + 1
+        return model
+
+    def record(self, model: str, latency_ms: float) -> None:
+        self.latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(latency_ms)
+
+    def record_failure(self, model: str) -> None:
+        """A failed call counts as a very slow one, steering traffic away from broken models"""
+        self.record(model, self.failure_penalty_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get candidate sets and per-model latency percentiles"""
+        models = {}
+        for model in dict.fromkeys(self.text_models + self.vision_models):
+            samples = list(self.latencies.get(model, ()))
+            models[model] = {
+                "chosen": self.chosen.get(model, 0),
+                "samples": len(samples),
+                "p50_ms": percentile(samples, 0.5) if samples else None,
+                "p95_ms": percentile(samples, 0.95) if samples else None
+            }
+        return {
+            "enabled": self.enabled,
+            "text_models": self.text_models,
+            "vision_models": self.vision_models,
+            "models": models
+        }
+
+_shared_model_router: Optional[ModelRouter] = None
+
+def get_model_router(default_model: str) -> ModelRouter:
+    """Return the process-wide model router, so latency observations are shared by all GPTService instances"""
+    global _shared_model_router
+    if _shared_model_router is None:
+        _shared_model_router = ModelRouter(default_model)
+    return _shared_model_router
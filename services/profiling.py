@@ -0,0 +1,97 @@
+import os
+import random
+import re
+import time
+import uuid
+
+# Opt-in request profiling, written to PROFILE_DIR (off unless one of the two triggers is enabled)
+# Fraction of requests profiled automatically
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# Honour an "X-Profile: 1" request header
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# "pyinstrument" (HTML, async-aware; used when installed) or "cprofile" (.prof for pstats/snakeviz)
+PROFILER = os.getenv("PROFILER", "pyinstrument").lower()
+
+def _pyinstrument_available() -> bool:
+    try:
+        import pyinstrument  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling sampled or explicitly requested requests, one at a time
+
+    cProfile sees the whole event loop thread, so other requests running concurrently show up
+    in its output; pyinstrument's async mode attributes time to the profiled request only.
+    """
+
+    def __init__(self, app,
+                 sample_rate: float = PROFILE_SAMPLE_RATE,
+                 header_enabled: bool = PROFILE_HEADER_ENABLED,
+                 directory: str = PROFILE_DIR,
+                 profiler: str = PROFILER):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.header_enabled = header_enabled
+        self.directory = directory
+        self.use_pyinstrument = profiler == "pyinstrument" and _pyinstrument_available()
+        # Only one profiler can be active per thread
+        self._active = False
+
+    def _wanted(self, scope) -> bool:
+        if self.header_enabled:
+            for name, value in scope.get("headers", ()):
+                if name == b"x-profile" and value in (b"1", b"true"):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _profile_path(self, scope) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope.get("path", "")).strip("_") or "root"
+        extension = "html" if self.use_pyinstrument else "prof"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{scope.get('method', 'GET')}_{slug}_{uuid.uuid4().hex[:8]}.{extension}"
+        return os.path.join(self.directory, name)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+        if self._active:
+            await self.app(scope, receive, send)
+            return
+
+        self._active = True
+        path = self._profile_path(scope)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-profile-file", path.encode("utf-8"))
+                ]}
+            await send(message)
+
+        if self.use_pyinstrument:
+            from pyinstrument import Profiler
+            profiler = Profiler(async_mode="enabled")
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+        try:
+            if self.use_pyinstrument:
+                profiler.start()
+            else:
+                profiler.enable()
+            await self.app(scope, receive, send_with_header)
+        finally:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                if self.use_pyinstrument:
+                    profiler.stop()
+                    with open(path, "w", encoding="utf-8") as f:
+                        f.write(profiler.output_html())
+                else:
+                    profiler.disable()
+                    profiler.dump_stats(path)
+            finally:
+                self._active = False
@@ -122,11 +122,14 @@ class PromptEngineer:
     
     def create_tactile_text_prompt(self, tactile_data: str, task_instruction: str) -> str:
         """Create a prompt for tactile-text analysis"""
-        return self.generate_prompt(
+        prompt = self.generate_prompt(
             "tactile_description",
             tactile_properties="the provided sensor data",
             tactile_data=tactile_data
         )
+        if task_instruction:
+            prompt += f"\nTask: {task_instruction}"
+        return prompt
     
     def create_vision_text_prompt(self, text_description: str, task_instruction: str) -> str:
         """Create a prompt for vision-text analysis"""
@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional
+
+# Client-side budgets for the shared provider key (0 disables a limit)
+RATE_LIMIT_RPM = float(os.getenv("GPT_RATE_LIMIT_RPM", "0"))
+RATE_LIMIT_TPM = float(os.getenv("GPT_RATE_LIMIT_TPM", "0"))
+RATE_LIMIT_MAX_QUEUE = int(os.getenv("GPT_RATE_LIMIT_MAX_QUEUE", "1000"))
+# Rough prompt token cost of an attached image, used until real usage is known
+IMAGE_TOKEN_ESTIMATE = int(os.getenv("GPT_IMAGE_TOKEN_ESTIMATE", "1000"))
+
+# Lower value = served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+_request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+class RateLimitQueueFullError(RuntimeError):
+    """Raised when too many upstream calls are already waiting for rate-limit budget"""
+
+@contextmanager
+def request_priority(priority: int):
+    """Run upstream calls made inside the block (and tasks it starts) at the given priority"""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+def current_priority() -> int:
+    return _request_priority.get()
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: int) -> int:
+    """Approximate prompt + completion tokens for a chat request (~4 characters per token)"""
+    chars = 0
+    images = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    chars += len(part.get("text", ""))
+                else:
+                    images += 1
+    return chars // 4 + images * IMAGE_TOKEN_ESTIMATE + max_tokens
+
+class TokenBucket:
+    """Refills continuously at capacity per minute; may go negative to record overuse"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+class RateLimiter:
+    """RPM/TPM token buckets with a priority queue: waiting calls are admitted lowest priority value first"""
+
+    def __init__(self,
+                 rpm: float = RATE_LIMIT_RPM,
+                 tpm: float = RATE_LIMIT_TPM,
+                 max_queue: int = RATE_LIMIT_MAX_QUEUE):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_queue = max_queue
+        # Entries: (priority, sequence, estimated tokens, future)
+        self._queue: list = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.wait_ms_by_priority: Dict[int, List[float]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.requests is not None or self.tokens is not None
+
+    def _wait_time(self, estimated_tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.wait_time(estimated_tokens))
+        return wait
+
+    def _take(self, estimated_tokens: int) -> None:
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(estimated_tokens)
+
+    def _give_back(self, estimated_tokens: int) -> None:
+        """Return budget taken for a call that was admitted but never sent"""
+        if self.requests is not None:
+            self.requests.tokens = min(self.requests.capacity, self.requests.tokens + 1)
+        if self.tokens is not None:
+            refund = min(estimated_tokens, self.tokens.capacity)
+            self.tokens.tokens = min(self.tokens.capacity, self.tokens.tokens + refund)
+
+    def _withdraw(self, entry: tuple) -> None:
+        """Drop a cancelled waiter so it neither counts toward max_queue nor holds up the calls behind it"""
+        try:
+            self._queue.remove(entry)
+        except ValueError:
+            # Already admitted: the budget it took is unused
+            self._give_back(entry[2])
+            return
+        heapq.heapify(self._queue)
+        if self._timer is not None:
+            # The wake-up may have been timed for the withdrawn call
+            self._timer.cancel()
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Admit queued calls in priority order while budget allows; otherwise wake up when it refills"""
+        self._timer = None
+        while self._queue:
+            priority, _, estimated_tokens, future = self._queue[0]
+            if future.done():
+                # Caller cancelled while waiting
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_time(estimated_tokens)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            self._take(estimated_tokens)
+            future.set_result(None)
+
+    async def acquire(self, estimated_tokens: int, priority: Optional[int] = None) -> None:
+        """Wait until one request and estimated_tokens fit the budgets"""
+        if not self.enabled:
+            return
+        if priority is None:
+            priority = current_priority()
+
+        started = time.perf_counter()
+        if not self._queue and self._wait_time(estimated_tokens) == 0:
+            self._take(estimated_tokens)
+        else:
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise RateLimitQueueFullError(
+                    f"Upstream rate-limit queue is full ({self.max_queue} waiting), please retry later"
+                )
+            future = asyncio.get_running_loop().create_future()
+            entry = (priority, next(self._sequence), estimated_tokens, future)
+            heapq.heappush(self._queue, entry)
+            if self._timer is not None:
+                # A higher-priority arrival may need a different wake-up time
+                self._timer.cancel()
+            self._dispatch()
+            try:
+                await future
+            except asyncio.CancelledError:
+                self._withdraw(entry)
+                raise
+
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.admitted += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        samples = self.wait_ms_by_priority.setdefault(priority, [0, 0.0])
+        samples[0] += 1
+        samples[1] += wait_ms
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """Correct the token bucket once the provider reports real usage"""
+        if self.tokens is not None and actual_tokens:
+            self.tokens._refill()
+            self.tokens.tokens -= actual_tokens - min(estimated_tokens, self.tokens.capacity)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue depth, wait times and remaining budget"""
+        depth: Dict[int, int] = {}
+        for priority, _, _, future in self._queue:
+            if not future.done():
+                depth[priority] = depth.get(priority, 0) + 1
+        return {
+            "enabled": self.enabled,
+            "rpm_limit": self.requests.capacity if self.requests else None,
+            "tpm_limit": self.tokens.capacity if self.tokens else None,
+            "requests_available": self.requests.tokens if self.requests else None,
+            "tokens_available": self.tokens.tokens if self.tokens else None,
+            "queue_depth": sum(depth.values()),
+            "queue_depth_by_priority": depth,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.total_wait_ms / self.admitted if self.admitted else 0.0,
+            "max_wait_ms": self.max_wait_ms,
+            "avg_wait_ms_by_priority": {
+                priority: total / count for priority, (count, total) in self.wait_ms_by_priority.items()
+            }
+        }
+
+_shared_rate_limiter: Optional[RateLimiter] = None
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter shared by all GPTService instances (one provider key)"""
+    global _shared_rate_limiter
+    if _shared_rate_limiter is None:
+        _shared_rate_limiter = RateLimiter()
+    return _shared_rate_limiter
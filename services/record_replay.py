@@ -0,0 +1,219 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Any, AsyncIterator, List, Optional
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+# Upstream record/replay settings
+# "off", "record" (call the provider and append each response to GPT_RECORDING_FILE)
+# or "replay" (serve responses from GPT_RECORDING_FILE without any network access)
+UPSTREAM_MODE = os.getenv("GPT_UPSTREAM_MODE", "off").lower()
+RECORDING_FILE = os.getenv("GPT_RECORDING_FILE", "recordings/upstream.jsonl")
+# Replayed latency = recorded latency x scale (0 = respond immediately)
+REPLAY_LATENCY_SCALE = float(os.getenv("GPT_REPLAY_LATENCY_SCALE", "1.0"))
+# Unrecorded request in replay mode: "error", or "any" to serve recordings of the same kind in turn
+REPLAY_ON_MISS = os.getenv("GPT_REPLAY_ON_MISS", "error").lower()
+
+def _compact(value: Any) -> Any:
+    """Drop None fields (optional in the SDK models) to keep recordings small"""
+    if isinstance(value, dict):
+        return {k: _compact(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    return value
+
+class ReplayMissError(RuntimeError):
+    """Raised in replay mode when a request has no recording (and GPT_REPLAY_ON_MISS=error)"""
+
+def fingerprint(params: Dict[str, Any]) -> str:
+    """Hash of the request as sent, excluding the model so recordings survive routing changes"""
+    canonical = {key: value for key, value in params.items() if key != "model"}
+    return hashlib.sha256(
+        json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:32]
+
+class UpstreamRecorder:
+    """Records provider responses with their timing to an append-only JSONL file and replays them"""
+
+    def __init__(self,
+                 mode: str = UPSTREAM_MODE,
+                 path: str = RECORDING_FILE,
+                 latency_scale: float = REPLAY_LATENCY_SCALE,
+                 on_miss: str = REPLAY_ON_MISS):
+        self.mode = mode
+        self.path = path
+        self.latency_scale = latency_scale
+        self.on_miss = on_miss
+        self._file = None
+        self._entries: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        # Recordings by kind ("stream" / "completion") for GPT_REPLAY_ON_MISS=any
+        self._by_kind: Dict[str, List[Dict[str, Any]]] = {}
+        self._turns: Dict[str, int] = {}
+
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    async def create(self, client, **params) -> Any:
+        """Drop-in for client.chat.completions.create(**params) that records or replays"""
+        if self.mode == "replay":
+            entry = self._lookup(params)
+            if params.get("stream"):
+                return self._replay_stream(entry)
+            await self._sleep(entry["latency_ms"])
+            self.replayed += 1
+            return ChatCompletion(**entry["response"])
+
+        if self.mode != "record":
+            return await client.chat.completions.create(**params)
+
+        start = time.perf_counter()
+        response = await client.chat.completions.create(**params)
+        if params.get("stream"):
+            return self._recording_stream(params, response, start)
+        self._append({
+            "fp": fingerprint(params),
+            "model": params.get("model"),
+            "stream": False,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "response": _compact(response.dict())
+        })
+        return response
+
+    async def _recording_stream(self, params: Dict[str, Any], stream, start: float) -> AsyncIterator[Any]:
+        """Pass chunks through, then append the whole stream (content, usage, timing) as one entry"""
+        parts = []
+        usage = None
+        chunks = 0
+        ttft_ms = None
+        try:
+            async for chunk in stream:
+                chunks += 1
+                if getattr(chunk, "usage", None):
+                    usage = chunk.usage if isinstance(chunk.usage, dict) else chunk.usage.dict()
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                    parts.append(chunk.choices[0].delta.content)
+                yield chunk
+        finally:
+            # Closed early (client disconnect): release the upstream connection; nothing is recorded
+            await stream.response.aclose()
+        total_ms = (time.perf_counter() - start) * 1000
+        self._append({
+            "fp": fingerprint(params),
+            "model": params.get("model"),
+            "stream": True,
+            "latency_ms": round(total_ms, 1),
+            "ttft_ms": round(ttft_ms if ttft_ms is not None else total_ms, 1),
+            "chunks": chunks,
+            "response": {"content": "".join(parts), "usage": usage}
+        })
+
+    async def _replay_stream(self, entry: Dict[str, Any]) -> AsyncIterator[ChatCompletionChunk]:
+        """Re-emit a recorded stream: first chunk after ttft, the rest spread evenly until the recorded end"""
+        content = entry["response"]["content"]
+        count = max(1, min(entry.get("chunks", 1), len(content) or 1))
+        step = -(-len(content) // count) if content else 0
+        gap_ms = (entry["latency_ms"] - entry["ttft_ms"]) / count
+        await self._sleep(entry["ttft_ms"])
+        self.replayed += 1
+        for i in range(0, len(content), step or 1):
+            if i:
+                await self._sleep(gap_ms)
+            yield self._chunk(entry, {"content": content[i:i + step]}, None)
+        yield self._chunk(entry, {}, "stop", entry["response"].get("usage"))
+
+    def _chunk(self, entry: Dict[str, Any], delta: Dict[str, Any], finish_reason: Optional[str],
+               usage: Optional[Dict[str, Any]] = None) -> ChatCompletionChunk:
+        data = {
+            "id": "replay",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": entry.get("model") or "replay",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        if usage:
+            data["usage"] = usage
+        return ChatCompletionChunk(**data)
+
+    async def _sleep(self, recorded_ms: float) -> None:
+        if self.latency_scale > 0 and recorded_ms > 0:
+            await asyncio.sleep(recorded_ms * self.latency_scale / 1000)
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                        except json.JSONDecodeError:
+                            # A torn last line from an interrupted recording
+                            continue
+                        self._entries.setdefault(entry["fp"], []).append(entry)
+                        self._by_kind.setdefault("stream" if entry["stream"] else "completion", []).append(entry)
+        return self._entries
+
+    def _lookup(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Recordings of the same request are served in turn; misses follow GPT_REPLAY_ON_MISS"""
+        kind = "stream" if params.get("stream") else "completion"
+        key = fingerprint(params)
+        candidates = [e for e in self._load().get(key, ()) if e["stream"] == bool(params.get("stream"))]
+        if not candidates:
+            self.misses += 1
+            candidates = self._by_kind.get(kind, []) if self.on_miss == "any" else []
+            key = kind
+            if not candidates:
+                raise ReplayMissError(f"No recorded {kind} response for request {fingerprint(params)} in {self.path}")
+        turn = self._turns.get(key, 0)
+        self._turns[key] = turn + 1
+        return candidates[turn % len(candidates)]
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        if self._file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.recorded += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get mode and record/replay counters"""
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "latency_scale": self.latency_scale,
+            "on_miss": self.on_miss,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses,
+            "recordings": sum(len(v) for v in self._entries.values()) if self._entries is not None else None
+        }
+
+_shared_recorder: Optional[UpstreamRecorder] = None
+
+def get_upstream_recorder() -> UpstreamRecorder:
+    """Return the process-wide recorder shared by all GPTService instances"""
+    global _shared_recorder
+    if _shared_recorder is None:
+        _shared_recorder = UpstreamRecorder()
+    return _shared_recorder
+
+def close_upstream_recorder() -> None:
+    """Flush and close the recording file (called on application shutdown)"""
+    global _shared_recorder
+    if _shared_recorder is not None:
+        _shared_recorder.close()
+    _shared_recorder = None
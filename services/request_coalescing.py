@@ -0,0 +1,77 @@
+import asyncio
+import os
+from typing import Dict, Any, Awaitable, Callable, TypeVar
+
+# Coalescing settings
+COALESCE_ENABLED = os.getenv("GPT_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key
+
+    The call runs as its own task, so the caller that started it can go away
+    without affecting the others; it is only cancelled once every waiter has
+    been cancelled.
+    """
+
+    def __init__(self, enabled: bool = COALESCE_ENABLED):
+        self.enabled = enabled
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await fn(), or the already running call for key"""
+        if not self.enabled:
+            return await fn()
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            self.calls += 1
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters.get(key) == 1 and not task.done():
+                # Last interested caller disconnected: stop the upstream call, and forget it now
+                # so a caller arriving before the task finishes cancelling starts a fresh one
+                self.cancelled += 1
+                task.cancel()
+                self._forget_key(key, task)
+            raise
+        finally:
+            if key in self._waiters and self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget_key(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        self._forget_key(key, task)
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter has gone
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get upstream call and saved-call counters"""
+        requests = self.calls + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._inflight),
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+            "cancelled": self.cancelled,
+            "saved_ratio": self.coalesced / requests if requests else 0.0
+        }
@@ -0,0 +1,208 @@
+import asyncio
+import math
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Awaitable, Callable, Optional, TypeVar
+import openai
+
+# Retry settings for upstream calls
+RETRY_MAX_ATTEMPTS = int(os.getenv("GPT_RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("GPT_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("GPT_RETRY_MAX_DELAY", "20"))
+# Circuit breaker settings (one breaker per upstream endpoint)
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("GPT_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("GPT_BREAKER_RESET_TIMEOUT", "30"))
+
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+T = TypeVar("T")
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling upstream while an endpoint's circuit breaker is open"""
+
+def is_retryable(error: Exception) -> bool:
+    """Timeouts, connection errors, 429 and 5xx responses are worth retrying"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+def is_outage(error: Exception) -> bool:
+    """Errors that count against the circuit breaker (rate limits and client errors don't)"""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the provider via Retry-After / retry-after-ms, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class CircuitBreaker:
+    """Closed -> open after consecutive outage errors; half-open probe after the reset timeout"""
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> None:
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        if self.state == "closed":
+            return
+        if self.state == "open":
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(
+                    f"Upstream {self.name} is unavailable (circuit open), retry in {math.ceil(remaining)}s"
+                )
+            self.state = "half_open"
+        if self._probe_in_flight:
+            # Half-open: only one probe request at a time
+            self.rejected += 1
+            raise CircuitOpenError(f"Upstream {self.name} is recovering (circuit half-open), please retry")
+        self._probe_in_flight = True
+
+    def ready(self) -> bool:
+        """Whether allow() would let a call through now (without claiming the probe)"""
+        if self.state == "open":
+            return time.monotonic() >= self.opened_at + self.reset_timeout
+        return self.state == "closed" or not self._probe_in_flight
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self.state = "closed"
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Forget a probe whose outcome says nothing about upstream health (e.g. cancelled)"""
+        self._probe_in_flight = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
+
+async def call_through(breaker: CircuitBreaker, fn: Callable[[], Awaitable[T]]) -> T:
+    """Run fn() once if the breaker allows it, recording the outcome"""
+    breaker.allow()
+    try:
+        result = await fn()
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception as e:
+        if is_outage(e):
+            breaker.record_failure()
+        elif isinstance(e, openai.APIError):
+            breaker.record_success()
+        else:
+            # Local errors (e.g. rate-limit queue full) say nothing about upstream health
+            breaker.release()
+        raise
+    breaker.record_success()
+    return result
+
+class RetryPolicy:
+    """Retries transient upstream errors with full-jitter exponential backoff, honoring Retry-After"""
+
+    def __init__(self,
+                 max_attempts: int = RETRY_MAX_ATTEMPTS,
+                 base_delay: float = RETRY_BASE_DELAY,
+                 max_delay: float = RETRY_MAX_DELAY):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.retry_after_honored = 0
+
+    def backoff_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        """Seconds to wait before the next attempt, or None if the wait would exceed max_delay"""
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            return requested if requested <= self.max_delay else None
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    async def call(self, fn: Callable[[], Awaitable[T]], breaker: Optional[CircuitBreaker] = None) -> T:
+        """Run fn() with retries; each attempt goes through the circuit breaker, if given"""
+        self.calls += 1
+        attempt = 0
+        while True:
+            try:
+                if breaker is not None:
+                    return await call_through(breaker, fn)
+                return await fn()
+            except Exception as e:
+                attempt += 1
+                delay = self.backoff_delay(attempt - 1, e) if is_retryable(e) else None
+                if delay is None or attempt >= self.max_attempts:
+                    self.failures += 1
+                    raise
+                if retry_after_seconds(e) is not None:
+                    self.retry_after_honored += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_attempts": self.max_attempts,
+            "calls": self.calls,
+            "retries": self.retries,
+            "failures": self.failures,
+            "retry_after_honored": self.retry_after_honored
+        }
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_circuit_breaker(endpoint: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for an upstream endpoint"""
+    if endpoint not in _circuit_breakers:
+        _circuit_breakers[endpoint] = CircuitBreaker(endpoint)
+    return _circuit_breakers[endpoint]
+
+def get_circuit_breaker_stats() -> Dict[str, Any]:
+    """State of every endpoint's circuit breaker"""
+    return {name: breaker.get_stats() for name, breaker in _circuit_breakers.items()}
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from services.shared_cache import SharedCache, get_shared_cache
+
+# Cache settings
+CACHE_ENABLED = os.getenv("GPT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_MAX_BYTES = int(os.getenv("GPT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("GPT_CACHE_TTL", "3600"))
+# Bump when the cached response format or prompt construction changes, so persisted entries are not reused
+CACHE_KEY_VERSION = 1
+
+def hash_bytes(data: bytes) -> str:
+    """SHA-256 hex digest of raw bytes (used to identify uploaded images)"""
+    return hashlib.sha256(data).hexdigest()
+
+def make_cache_key(model: str,
+                   temperature: float,
+                   max_tokens: int,
+                   system_message: Optional[str],
+                   prompt: str,
+                   image_digest: Optional[str] = None) -> str:
+    """Build a content-addressed key for a completion request"""
+    hasher = hashlib.sha256()
+    header = json.dumps(
+        {
+            "v": CACHE_KEY_VERSION,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "system": system_message or "",
+        },
+        sort_keys=True
+    )
+    for part in (header, prompt, image_digest or ""):
+        encoded = part.encode("utf-8")
+        # Length-prefix each field so concatenations can't collide
+        hasher.update(len(encoded).to_bytes(8, "little"))
+        hasher.update(encoded)
+    return hasher.hexdigest()
+
+class ResponseCache:
+    """In-memory LRU cache for completion results with a memory cap and per-entry TTL
+
+    With a namespace and SHARED_CACHE_PATH set (or an explicit shared store, e.g. the persistent
+    LLM cache), entries are also written to that SQLite tier and memory misses are looked up there,
+    so workers share one hit rate and entries can outlive the process.
+    """
+
+    def __init__(self,
+                 max_bytes: int = CACHE_MAX_BYTES,
+                 default_ttl: float = CACHE_TTL_SECONDS,
+                 enabled: bool = CACHE_ENABLED,
+                 namespace: Optional[str] = None,
+                 shared: Optional[SharedCache] = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self.namespace = namespace
+        self.shared = shared if shared is not None else (get_shared_cache() if namespace else None)
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float, int]]" = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self.evictions = 0
+        self.warmed = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result, or None on miss/expiry"""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            return self._get_shared(key)
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(entry[0])
+
+    def _get_shared(self, key: str) -> Optional[Dict[str, Any]]:
+        """Memory miss: fall back to the shared cache and keep a local copy for its remaining TTL"""
+        found = self.shared.lookup(self.namespace, key) if self.shared is not None else None
+        if found is None:
+            self.misses += 1
+            return None
+        value, expires_at = found
+        self._set_local(key, value, expires_at - time.time())
+        self.shared_hits += 1
+        return dict(value)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Store a result, evicting least recently used entries past the memory cap"""
+        if not self.enabled:
+            return
+
+        ttl = self.default_ttl if ttl is None else ttl
+        self._set_local(key, value, ttl)
+        if self.shared is not None:
+            self.shared.set(self.namespace, key, value, ttl)
+
+    def _set_local(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        size = len(json.dumps(value, default=str)) + len(key)
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = time.monotonic() + ttl
+        self._entries[key] = (dict(value), expires_at, size)
+        self._size += size
+
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def warm(self) -> int:
+        """Preload the most recently used entries of the second tier into memory (startup warm-up)"""
+        if not self.enabled or self.shared is None:
+            return 0
+        now = time.time()
+        entries = self.shared.recent(self.namespace, self.max_bytes)
+        for key, value, expires_at in entries:
+            self._set_local(key, value, expires_at - now)
+        self.warmed += len(entries)
+        return len(entries)
+
+    def clear(self) -> None:
+        """Drop all entries"""
+        self._entries.clear()
+        self._size = 0
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._size -= size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current usage"""
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.default_ttl,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "warmed": self.warmed,
+            "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+            "shared": self.shared.path if self.shared is not None else None
+        }
@@ -0,0 +1,234 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional, Tuple
+
+# Cross-process cache settings (used by multi-worker deployments; see main.py --workers)
+# SQLite file shared by all workers; unset = each process keeps its caches to itself
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", "")
+SHARED_CACHE_MAX_BYTES = int(os.getenv("SHARED_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Expired and over-budget entries are cleaned up every this many writes
+EVICT_EVERY_WRITES = 200
+# Last-access times are refreshed at most this often (seconds) to keep reads cheap
+TOUCH_INTERVAL = 60.0
+# Reads and writes run on the event loop, so they wait at most this long (ms) for another worker's
+# write lock; a busy database counts as a cache miss or a skipped write. Startup maintenance waits longer.
+SHARED_CACHE_BUSY_TIMEOUT_MS = int(os.getenv("SHARED_CACHE_BUSY_TIMEOUT_MS", "20"))
+MAINTENANCE_BUSY_TIMEOUT_MS = 10000
+
+# Persistent LLM response cache that survives restarts; unset = responses only outlive a restart via SHARED_CACHE_PATH
+PERSISTENT_CACHE_PATH = os.getenv("GPT_PERSISTENT_CACHE_PATH", "")
+PERSISTENT_CACHE_MAX_BYTES = int(os.getenv("GPT_PERSISTENT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+# compact() rebuilds the file (VACUUM) when at least this fraction of its pages is free
+COMPACT_FREE_RATIO = float(os.getenv("GPT_PERSISTENT_CACHE_COMPACT_RATIO", "0.25"))
+
+class SharedCache:
+    """Key/value store in a SQLite database in WAL mode, so worker processes share entries
+
+    Values are JSON, grouped by namespace (e.g. "llm", "images"). Expiry uses wall-clock time so it
+    means the same in every process; the total size is capped by evicting least recently used entries.
+    """
+
+    def __init__(self, path: str, max_bytes: int = SHARED_CACHE_MAX_BYTES,
+                 busy_timeout_ms: int = SHARED_CACHE_BUSY_TIMEOUT_MS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.busy_timeout_ms = busy_timeout_ms
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # One connection per process, used from the event loop (and occasionally worker threads)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Reads treated as misses / writes skipped because another process held the lock
+        self.busy = 0
+
+    @contextmanager
+    def _patient(self):
+        """Wait up to MAINTENANCE_BUSY_TIMEOUT_MS for locks (startup work, not on the request path)"""
+        self._conn.execute(f"PRAGMA busy_timeout = {MAINTENANCE_BUSY_TIMEOUT_MS}")
+        try:
+            yield
+        finally:
+            self._conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+
+    def lookup(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, wall-clock expiry time) for key, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, key)
+                ).fetchone()
+            except sqlite3.OperationalError:
+                self.busy += 1
+                row = None
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            if now - row[2] > TOUCH_INTERVAL:
+                try:
+                    self._conn.execute(
+                        "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (now, namespace, key)
+                    )
+                except sqlite3.OperationalError:
+                    # Recency is refreshed on a later hit
+                    self.busy += 1
+        self.hits += 1
+        return json.loads(row[0]), row[1]
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Value for key, or None if missing or expired"""
+        found = self.lookup(namespace, key)
+        return found[0] if found is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> bool:
+        """Store a JSON-serializable value for ttl seconds; False if skipped because the database was busy"""
+        text = json.dumps(value, ensure_ascii=False, default=str)
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, size, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, text, len(text) + len(key), now + ttl, now)
+                )
+                self._writes += 1
+                if self._writes % EVICT_EVERY_WRITES == 0:
+                    self._evict(now)
+            except sqlite3.OperationalError:
+                self.busy += 1
+                return False
+        return True
+
+    def recent(self, namespace: str, max_bytes: int) -> List[Tuple[str, Any, float]]:
+        """Unexpired (key, value, expiry) entries, most recently used last, up to max_bytes in total"""
+        now = time.time()
+        entries = []
+        total = 0
+        with self._lock, self._patient():
+            rows = self._conn.execute(
+                "SELECT key, value, size, expires_at FROM entries WHERE namespace = ? AND expires_at > ?"
+                " ORDER BY accessed_at DESC", (namespace, now)
+            )
+            for key, value, size, expires_at in rows:
+                total += size
+                if total > max_bytes:
+                    break
+                entries.append((key, json.loads(value), expires_at))
+        entries.reverse()
+        return entries
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            try:
+                self._conn.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            except sqlite3.OperationalError:
+                self.busy += 1
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes (caller holds the lock)"""
+        self.evictions += self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        cutoff = None
+        for accessed_at, size in self._conn.execute("SELECT accessed_at, size FROM entries ORDER BY accessed_at"):
+            excess -= size
+            cutoff = accessed_at
+            if excess <= 0:
+                break
+        if cutoff is not None:
+            self.evictions += self._conn.execute("DELETE FROM entries WHERE accessed_at <= ?", (cutoff,)).rowcount
+
+    def compact(self) -> Dict[str, Any]:
+        """Evict expired/over-budget entries, rebuild the file if mostly free pages, and truncate the WAL"""
+        with self._lock, self._patient():
+            before = self._file_size()
+            vacuumed = False
+            try:
+                self._evict(time.time())
+                page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+                free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if page_count and free_pages / page_count >= COMPACT_FREE_RATIO:
+                    self._conn.execute("VACUUM")
+                    vacuumed = True
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.OperationalError:
+                # Another worker holds the database; it will be compacted next time
+                pass
+            return {"size_before": before, "size_after": self._file_size(), "vacuumed": vacuumed}
+
+    def _file_size(self) -> int:
+        """Database plus write-ahead log size in bytes"""
+        wal = self.path + "-wal"
+        return os.path.getsize(self.path) + (os.path.getsize(wal) if os.path.exists(wal) else 0)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-namespace usage and this process's hit/miss counters"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, COUNT(*), COALESCE(SUM(size), 0) FROM entries GROUP BY namespace"
+            ).fetchall()
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "namespaces": {namespace: {"entries": count, "size_bytes": size} for namespace, count, size in rows},
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "busy": self.busy,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+_shared_cache: Optional[SharedCache] = None
+
+def get_shared_cache() -> Optional[SharedCache]:
+    """Return the process-wide shared cache, or None when SHARED_CACHE_PATH is unset"""
+    global _shared_cache
+    if _shared_cache is None and SHARED_CACHE_PATH:
+        _shared_cache = SharedCache(SHARED_CACHE_PATH)
+    return _shared_cache
+
+def close_shared_cache() -> None:
+    """Close the shared and persistent cache connections (called on application shutdown)"""
+    global _shared_cache, _persistent_cache
+    if _shared_cache is not None:
+        _shared_cache.close()
+    if _persistent_cache is not None:
+        _persistent_cache.close()
+    _shared_cache = _persistent_cache = None
+
+_persistent_cache: Optional[SharedCache] = None
+
+def get_persistent_cache() -> Optional[SharedCache]:
+    """Return the on-disk LLM response store, or None when GPT_PERSISTENT_CACHE_PATH is unset"""
+    global _persistent_cache
+    if _persistent_cache is None and PERSISTENT_CACHE_PATH:
+        _persistent_cache = SharedCache(PERSISTENT_CACHE_PATH, PERSISTENT_CACHE_MAX_BYTES)
+    return _persistent_cache
@@ -0,0 +1,343 @@
+"""
+Binary tactile recordings (.npy, .npz and raw little-endian float arrays).
+
+Files are memory-mapped and processed in fixed-size chunks, so summarizing a
+recording of any size needs only a few chunks of RAM.
+
+Raw format: a 16-byte header followed by interleaved little-endian samples
+(n_samples rows x n_channels columns):
+
+    offset  size  field
+    0       4     magic b"TACT"
+    4       1     version (1)
+    5       1     bytes per value (4 = float32, 8 = float64)
+    6       2     n_channels (uint16)
+    8       4     sample_rate in Hz (float32, 0 = unknown)
+    12      4     reserved
+"""
+import io
+import json
+import math
+import mmap
+import os
+import struct
+import zipfile
+from typing import Dict, Any, Optional, Tuple, Union
+import numpy as np
+
+from services.tactile_features import (
+    dominant_frequencies, peak_frequencies, friction_channels, round_summary, _add_channels, SAMPLE_RATE_KEYS
+)
+from services.tactile_downsampling import (
+    lttb_downsample, TACTILE_TOKEN_BUDGET, TACTILE_DOWNSAMPLE_METHOD, TOKENS_PER_VALUE, VALUE_DIGITS
+)
+
+NPY_MAGIC = b"\x93NUMPY"
+ZIP_MAGIC = b"PK\x03\x04"
+RAW_MAGIC = b"TACT"
+RAW_HEADER = struct.Struct("<4sBBHfI")
+ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+BINARY_EXTENSIONS = (".npy", ".npz", ".tact", ".bin", ".f32", ".f64")
+
+# Samples per channel processed at a time
+BINARY_CHUNK_SAMPLES = int(os.getenv("TACTILE_BINARY_CHUNK_SAMPLES", str(1 << 20)))
+# LTTB runs on min/max pre-selected candidates, this many per output point (MinMaxLTTB)
+LTTB_CANDIDATE_RATIO = 8
+# Long series use a Welch-style spectrum averaged over segments of this length
+FFT_SEGMENT = 8192
+
+def is_binary_tactile(head: bytes, filename: Optional[str] = None) -> bool:
+    """Detect a binary tactile recording from its first bytes (or extension)"""
+    if head.startswith((NPY_MAGIC, ZIP_MAGIC, RAW_MAGIC)):
+        return True
+    return bool(filename) and os.path.splitext(filename)[1].lower() in BINARY_EXTENSIONS
+
+class TactileArrays:
+    """Named channel views over a memory-mapped file or an in-memory buffer"""
+
+    def __init__(self, source: Union[str, bytes]):
+        self.channels: Dict[str, np.ndarray] = {}
+        self.sample_rate: Optional[float] = None
+        self._file = None
+        self._mmap = None
+
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self._buffer = np.frombuffer(source, dtype=np.uint8)
+        else:
+            self._file = open(source, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._buffer = np.frombuffer(self._mmap, dtype=np.uint8)
+        self._parse()
+
+    def _parse(self) -> None:
+        head = self._buffer[:8].tobytes()
+        if head.startswith(NPY_MAGIC):
+            self._add("value", self._npy_at(0))
+        elif head.startswith(ZIP_MAGIC):
+            self._parse_npz()
+        elif head.startswith(RAW_MAGIC):
+            self._parse_raw()
+        else:
+            raise ValueError("Unrecognized binary tactile format")
+
+    def _npy_at(self, offset: int) -> np.ndarray:
+        """Zero-copy view of an .npy payload starting at offset"""
+        header = io.BytesIO(self._buffer[offset:offset + 65536].tobytes())
+        version = np.lib.format.read_magic(header)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+        if dtype.hasobject:
+            raise ValueError("Object arrays are not supported")
+        start = offset + header.tell()
+        count = int(np.prod(shape)) if shape else 1
+        flat = self._buffer[start:start + count * dtype.itemsize].view(dtype)
+        array = flat.reshape(shape, order="F" if fortran_order else "C")
+        if dtype.names:
+            # Structured array: expose each numeric field
+            return {name: array[name] for name in dtype.names}
+        return array
+
+    def _parse_npz(self) -> None:
+        with zipfile.ZipFile(io.BytesIO(self._buffer) if self._mmap is None else self._file) as archive:
+            for info in archive.infolist():
+                name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+                if info.compress_type == zipfile.ZIP_STORED:
+                    local = ZIP_LOCAL_HEADER.unpack(
+                        self._buffer[info.header_offset:info.header_offset + ZIP_LOCAL_HEADER.size].tobytes()
+                    )
+                    data_offset = info.header_offset + ZIP_LOCAL_HEADER.size + local[-2] + local[-1]
+                    array = self._npy_at(data_offset)
+                else:
+                    # Compressed members can't be mapped; they are inflated one at a time
+                    array = np.load(io.BytesIO(archive.read(info.filename)), allow_pickle=False)
+                self._add(name, array)
+
+    def _add(self, name: str, array: Any) -> None:
+        if isinstance(array, dict):
+            for field, values in array.items():
+                self._add(f"{name}.{field}", values)
+            return
+        if array.ndim == 0:
+            if name in SAMPLE_RATE_KEYS and float(array) > 0:
+                self.sample_rate = float(array)
+            return
+        if array.ndim in (1, 2) and np.issubdtype(array.dtype, np.number):
+            _add_channels(self.channels, name, array)
+
+    def _parse_raw(self) -> None:
+        magic, version, width, n_channels, sample_rate, _ = RAW_HEADER.unpack(
+            self._buffer[:RAW_HEADER.size].tobytes()
+        )
+        if version != 1 or width not in (4, 8) or n_channels == 0:
+            raise ValueError("Unsupported raw tactile header")
+        dtype = np.dtype("<f4" if width == 4 else "<f8")
+        payload = self._buffer[RAW_HEADER.size:]
+        rows = payload.size // (width * n_channels)
+        array = payload[:rows * width * n_channels].view(dtype).reshape(rows, n_channels)
+        _add_channels(self.channels, "channel", array)
+        self.sample_rate = float(sample_rate) if sample_rate > 0 else None
+
+    def release(self) -> None:
+        """Drop mapped pages already processed from this process's resident set"""
+        if self._mmap is not None and hasattr(mmap, "MADV_DONTNEED"):
+            self._mmap.madvise(mmap.MADV_DONTNEED)
+
+    def close(self) -> None:
+        self.channels = {}
+        self._buffer = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A view is still alive somewhere; the mapping closes with it
+                pass
+            self._file.close()
+
+    def __enter__(self) -> "TactileArrays":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def _chunks(arrays: TactileArrays, values: np.ndarray, step: int = BINARY_CHUNK_SAMPLES):
+    """Yield float64 copies of consecutive chunks, releasing mapped pages as we go"""
+    for start in range(0, values.shape[0], step):
+        yield start, np.asarray(values[start:start + step], dtype=np.float64)
+        arrays.release()
+
+def _finite_chunks(arrays: TactileArrays, values: np.ndarray, step: int = BINARY_CHUNK_SAMPLES):
+    """Like _chunks, without NaN/inf samples (as tactile_features.channel_features drops them)"""
+    for start, chunk in _chunks(arrays, values, step):
+        chunk = chunk[np.isfinite(chunk)]
+        if chunk.size:
+            yield start, chunk
+
+def _channel_features(arrays: TactileArrays, values: np.ndarray) -> Dict[str, Any]:
+    """Same statistics as tactile_features.channel_features, computed chunk by chunk"""
+    # Pass 1: moments, extremes, roughness and the averaged segment spectrum
+    segment = FFT_SEGMENT
+    step = segment * max(1, BINARY_CHUNK_SAMPLES // segment)
+    n = 0
+    total = total_sq = diff_sq = 0.0
+    low, high = math.inf, -math.inf
+    previous = None
+    spectrum = np.zeros(segment // 2 + 1)
+    segments = 0
+    for start, chunk in _finite_chunks(arrays, values, step):
+        n += chunk.size
+        total += float(chunk.sum())
+        total_sq += float(np.dot(chunk, chunk))
+        low = min(low, float(chunk.min()))
+        high = max(high, float(chunk.max()))
+        diffs = np.diff(chunk if previous is None else np.concatenate(([previous], chunk)))
+        diff_sq += float(np.dot(diffs, diffs))
+        previous = chunk[-1]
+        full = chunk.size // segment * segment
+        if full:
+            rows = chunk[:full].reshape(-1, segment)
+            rows = rows - rows.mean(axis=1, keepdims=True)
+            spectrum += np.abs(np.fft.rfft(rows, axis=1)).sum(axis=0)
+            segments += rows.shape[0]
+
+    if n == 0:
+        return {"n": 0}
+    mean = total / n
+    # Pass 2: rising crossings of the mid-range level
+    events = 0
+    if high > low:
+        level = low + 0.5 * (high - low)
+        was_above = False
+        for start, chunk in _finite_chunks(arrays, values):
+            above = chunk > level
+            events += int(np.count_nonzero(above[1:] & ~above[:-1])) + int(above[0] and not was_above)
+            was_above = bool(above[-1])
+
+    if segments:
+        frequencies = np.fft.rfftfreq(segment, d=1.0 / (arrays.sample_rate or 1.0))
+        dominant = peak_frequencies(spectrum, frequencies)
+    else:
+        # Shorter than one segment: plain FFT of the whole series
+        series = np.asarray(values, dtype=np.float64)
+        dominant = dominant_frequencies(series[np.isfinite(series)], arrays.sample_rate)
+    return {
+        "n": n,
+        "mean": mean,
+        "std": math.sqrt(max(0.0, total_sq / n - mean * mean)),
+        "min": low,
+        "max": high,
+        "dominant_freqs": dominant,
+        "roughness": math.sqrt(diff_sq / (n - 1)) if n > 1 else 0.0,
+        "contact_events": events
+    }
+
+def _friction_ratio(arrays: TactileArrays) -> Optional[float]:
+    normal, shear = friction_channels(arrays.channels)
+    if normal is None:
+        return None
+    n = arrays.channels[normal].shape[0]
+    shear = [name for name in shear if arrays.channels[name].shape[0] == n]
+    if not shear or n == 0:
+        return None
+    normal_total = shear_total = 0.0
+    for start in range(0, n, BINARY_CHUNK_SAMPLES):
+        stop = start + BINARY_CHUNK_SAMPLES
+        normal_total += float(np.abs(np.asarray(arrays.channels[normal][start:stop], dtype=np.float64)).sum())
+        squares = sum(np.asarray(arrays.channels[name][start:stop], dtype=np.float64) ** 2 for name in shear)
+        shear_total += float(np.sqrt(squares).sum())
+        arrays.release()
+    if normal_total == 0:
+        return None
+    return shear_total / normal_total
+
+def binary_features(arrays: TactileArrays) -> Dict[str, Any]:
+    """Feature summary (same schema as tactile_features.compute_features)"""
+    summary = {
+        "sample_rate": arrays.sample_rate,
+        "channels": {name: _channel_features(arrays, values) for name, values in arrays.channels.items()}
+    }
+    friction = _friction_ratio(arrays)
+    if friction is not None:
+        summary["friction_ratio"] = friction
+    return round_summary(summary)
+
+def _minmax_chunked(arrays: TactileArrays, values: np.ndarray, max_points: int) -> np.ndarray:
+    """Chunked equivalent of tactile_downsampling.minmax_downsample"""
+    n = values.shape[0]
+    buckets = max(1, max_points // 2)
+    bucket_size = math.ceil(n / buckets)
+    step = bucket_size * max(1, BINARY_CHUNK_SAMPLES // bucket_size)
+    indices = []
+    for start, chunk in _chunks(arrays, values, step):
+        rows = math.ceil(chunk.size / bucket_size)
+        padded = np.full(rows * bucket_size, np.nan)
+        padded[:chunk.size] = chunk
+        padded = padded.reshape(rows, bucket_size)
+        offsets = start + np.arange(rows) * bucket_size
+        indices.append(np.nanargmin(padded, axis=1) + offsets)
+        indices.append(np.nanargmax(padded, axis=1) + offsets)
+    return np.unique(np.concatenate(indices))
+
+def _gather(arrays: TactileArrays, values: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Read individual samples, releasing mapped pages regularly (each fault maps a readahead window)"""
+    gathered = np.empty(indices.size, dtype=np.float64)
+    for k, index in enumerate(indices.tolist()):
+        gathered[k] = values[index]
+        if k % 16 == 15:
+            arrays.release()
+    arrays.release()
+    return gathered
+
+def binary_downsample(arrays: TactileArrays,
+                      token_budget: int = TACTILE_TOKEN_BUDGET,
+                      method: str = TACTILE_DOWNSAMPLE_METHOD) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Token-budgeted downsampling (same output as tactile_downsampling.downsample_channels)"""
+    per_channel_values = max(4, int(token_budget / TOKENS_PER_VALUE / max(1, len(arrays.channels))))
+    max_points = per_channel_values // 2
+
+    data: Dict[str, Any] = {}
+    original_samples: Dict[str, int] = {}
+    reduced_samples: Dict[str, int] = {}
+    for name, values in arrays.channels.items():
+        n = int(values.shape[0])
+        original_samples[name] = n
+        if n <= per_channel_values:
+            data[name] = {"v": np.round(np.asarray(values, dtype=np.float64), VALUE_DIGITS).tolist()}
+            reduced_samples[name] = n
+            continue
+
+        if method == "lttb":
+            candidates = _minmax_chunked(arrays, values, max_points * LTTB_CANDIDATE_RATIO)
+            candidate_values = _gather(arrays, values, candidates)
+            selected = lttb_downsample(candidate_values, max_points)
+            indices, reduced = candidates[selected], candidate_values[selected]
+        else:
+            indices = _minmax_chunked(arrays, values, max_points)
+            reduced = _gather(arrays, values, indices)
+        data[name] = {"i": indices.tolist(), "v": np.round(reduced, VALUE_DIGITS).tolist()}
+        reduced_samples[name] = int(indices.size)
+
+    counts = {
+        "method": method,
+        "token_budget": token_budget,
+        "original_samples": original_samples,
+        "reduced_samples": reduced_samples
+    }
+    return data, counts
+
+def summarize_binary_tactile(source: Union[str, bytes], tactile_mode: str = "features") -> Tuple[str, Dict[str, Any]]:
+    """Prompt text and info for a binary recording given as a file path or bytes
+
+    Binary data can't be embedded verbatim, so "raw" is treated as "features".
+    """
+    with TactileArrays(source) as arrays:
+        if not arrays.channels:
+            raise ValueError("No numeric channels found in binary tactile file")
+        if tactile_mode == "downsampled":
+            data, counts = binary_downsample(arrays)
+            serialized = json.dumps({"sample_rate": arrays.sample_rate, "channels": data}, separators=(",", ":"))
+            return f"Tactile data (downsampled JSON): {serialized}", {"mode": "downsampled", "format": "binary", **counts}
+        features = binary_features(arrays)
+        serialized = json.dumps(features, separators=(",", ":"))
+        return f"Tactile features (summary): {serialized}", {"mode": "features", "format": "binary"}
@@ -0,0 +1,121 @@
+import json
+import math
+import os
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+
+from services.response_cache import hash_bytes
+from services.tactile_features import parse_channels, feature_cache
+
+# Token budget for an embedded tactile recording, across all channels
+TACTILE_TOKEN_BUDGET = int(os.getenv("TACTILE_TOKEN_BUDGET", "2000"))
+# "minmax" keeps each bucket's extremes; "lttb" keeps the visually most significant point
+TACTILE_DOWNSAMPLE_METHOD = os.getenv("TACTILE_DOWNSAMPLE_METHOD", "minmax").lower()
+# Rough token cost of one serialized number such as "0.1234,"
+TOKENS_PER_VALUE = 2.5
+VALUE_DIGITS = 4
+
+def minmax_downsample(values: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the min and max of each bucket, in time order"""
+    n = values.size
+    if n <= max_points:
+        return np.arange(n)
+
+    bucket_size = math.ceil(n / max(1, max_points // 2))
+    # Recount buckets from the rounded-up size so only the last one is padded (and never entirely)
+    buckets = math.ceil(n / bucket_size)
+    padded = np.full(buckets * bucket_size, np.nan)
+    padded[:n] = values
+    rows = padded.reshape(buckets, bucket_size)
+    offsets = np.arange(buckets) * bucket_size
+    lows = np.nanargmin(rows, axis=1) + offsets
+    highs = np.nanargmax(rows, axis=1) + offsets
+    return np.unique(np.concatenate([lows, highs]))
+
+def lttb_downsample(values: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices chosen by Largest-Triangle-Three-Buckets, including both endpoints"""
+    n = values.size
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 3:
+        return np.linspace(0, n - 1, max(max_points, 1)).astype(np.int64)
+
+    # Interior points split into max_points - 2 buckets
+    edges = (np.arange(max_points - 1) * ((n - 2) / (max_points - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Average of the next bucket (or the last point) is the third triangle vertex
+        if bucket + 2 < edges.size:
+            next_start, next_end = end, edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = (next_start + next_end - 1) / 2.0
+        avg_y = values[next_start:next_end].mean()
+
+        xs = np.arange(start, end)
+        areas = np.abs(
+            (previous - avg_x) * (values[start:end] - values[previous])
+            - (previous - xs) * (avg_y - values[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+def downsample_channels(channels: Dict[str, np.ndarray],
+                        token_budget: int = TACTILE_TOKEN_BUDGET,
+                        method: str = TACTILE_DOWNSAMPLE_METHOD) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Shrink every channel to fit the token budget; returns (serializable data, sample counts)"""
+    # Reduced channels carry an index array as well as values
+    per_channel_values = max(4, int(token_budget / TOKENS_PER_VALUE / max(1, len(channels))))
+    max_points = per_channel_values // 2
+
+    data: Dict[str, Any] = {}
+    original_samples: Dict[str, int] = {}
+    reduced_samples: Dict[str, int] = {}
+    for name, values in channels.items():
+        values = values[np.isfinite(values)]
+        original_samples[name] = int(values.size)
+        if values.size <= per_channel_values:
+            data[name] = {"v": np.round(values, VALUE_DIGITS).tolist()}
+            reduced_samples[name] = int(values.size)
+            continue
+
+        if method == "lttb":
+            indices = lttb_downsample(values, max_points)
+        else:
+            indices = minmax_downsample(values, max_points)
+        data[name] = {"i": indices.tolist(), "v": np.round(values[indices], VALUE_DIGITS).tolist()}
+        reduced_samples[name] = int(indices.size)
+
+    counts = {
+        "method": method,
+        "token_budget": token_budget,
+        "original_samples": original_samples,
+        "reduced_samples": reduced_samples
+    }
+    return data, counts
+
+def downsample_tactile(content: bytes,
+                       token_budget: int = TACTILE_TOKEN_BUDGET,
+                       method: str = TACTILE_DOWNSAMPLE_METHOD) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Compact JSON of the downsampled recording plus sample counts; None if not numeric"""
+    key = f"downsample:{method}:{token_budget}:{hash_bytes(content)}"
+    cached = feature_cache.get(key)
+    if cached is not None:
+        return cached["summary"], cached["counts"]
+
+    channels, sample_rate = parse_channels(content)
+    if not channels:
+        return None
+    data, counts = downsample_channels(channels, token_budget, method)
+    serialized = json.dumps(
+        {"sample_rate": sample_rate, "channels": data},
+        separators=(",", ":")
+    )
+    feature_cache.set(key, {"summary": serialized, "counts": counts})
+    return serialized, counts
@@ -0,0 +1,217 @@
+import json
+import os
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+
+from services.response_cache import ResponseCache, hash_bytes
+
+# Feature summary cache settings (keyed by tactile file content hash)
+FEATURE_CACHE_MAX_BYTES = int(os.getenv("TACTILE_FEATURE_CACHE_BYTES", str(8 * 1024 * 1024)))
+FEATURE_CACHE_TTL = float(os.getenv("TACTILE_FEATURE_CACHE_TTL", "86400"))
+DOMINANT_FREQUENCIES = 3
+
+SAMPLE_RATE_KEYS = ("sample_rate", "sampling_rate", "sample_rate_hz", "fs", "frequency")
+DATA_KEYS = ("data", "samples", "readings", "values", "channels")
+NORMAL_FORCE_HINTS = ("normal", "pressure", "fz", "force_z")
+SHEAR_FORCE_HINTS = ("shear", "tangential", "friction", "fx", "fy", "force_x", "force_y")
+
+feature_cache = ResponseCache(max_bytes=FEATURE_CACHE_MAX_BYTES, default_ttl=FEATURE_CACHE_TTL,
+                              namespace="tactile_features")
+
+def _numeric_array(value: Any) -> Optional[np.ndarray]:
+    """Convert a JSON value to a float array, or None if it isn't numeric"""
+    if not isinstance(value, list) or not value:
+        return None
+    try:
+        array = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if array.ndim not in (1, 2) or array.size == 0:
+        return None
+    return array
+
+def _add_channels(channels: Dict[str, np.ndarray], name: str, array: np.ndarray) -> None:
+    if array.ndim == 1:
+        channels[name] = array
+    else:
+        for i in range(array.shape[1]):
+            channels[f"{name}_{i}"] = array[:, i]
+
+def channels_from_json(data: Any) -> Tuple[Dict[str, np.ndarray], Optional[float]]:
+    """Extract named numeric channels (and sample rate, if given) from parsed tactile JSON"""
+    channels: Dict[str, np.ndarray] = {}
+    sample_rate = None
+
+    if isinstance(data, dict):
+        for key in SAMPLE_RATE_KEYS:
+            if isinstance(data.get(key), (int, float)) and data[key] > 0:
+                sample_rate = float(data[key])
+                break
+        for key in DATA_KEYS:
+            if key in data and isinstance(data[key], (list, dict)):
+                nested, nested_rate = channels_from_json(data[key])
+                if nested:
+                    return nested, sample_rate or nested_rate
+        for name, value in data.items():
+            array = _numeric_array(value)
+            if array is not None:
+                _add_channels(channels, str(name), array)
+
+    elif isinstance(data, list) and data:
+        if all(isinstance(row, dict) for row in data):
+            # List of records: one channel per numeric field
+            for name in data[0]:
+                array = _numeric_array([row.get(name) for row in data])
+                if array is not None:
+                    _add_channels(channels, str(name), array)
+        else:
+            array = _numeric_array(data)
+            if array is not None:
+                _add_channels(channels, "value" if array.ndim == 1 else "channel", array)
+
+    return channels, sample_rate
+
+def channels_from_text(text: str) -> Dict[str, np.ndarray]:
+    """Extract channels from CSV / whitespace-separated numeric text with an optional header row"""
+    lines = [line for line in text.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+    if not lines:
+        return {}
+
+    delimiter = "," if "," in lines[0] else None
+    header = None
+    first = lines[0].split(delimiter)
+    try:
+        [float(token) for token in first]
+    except ValueError:
+        header = [token.strip() for token in first]
+        lines = lines[1:]
+    if not lines:
+        return {}
+
+    array = np.loadtxt(lines, delimiter=delimiter, ndmin=2, dtype=np.float64)
+    names = header if header and len(header) == array.shape[1] else [f"channel_{i}" for i in range(array.shape[1])]
+    return {name: array[:, i] for i, name in enumerate(names)}
+
+def peak_frequencies(spectrum: np.ndarray, frequencies: np.ndarray) -> list:
+    """Frequencies of the largest spectral peaks, excluding DC"""
+    spectrum = spectrum.copy()
+    spectrum[0] = 0.0
+    count = min(DOMINANT_FREQUENCIES, spectrum.size - 1)
+    if count <= 0:
+        return []
+    top = np.argpartition(spectrum, -count)[-count:]
+    top = top[np.argsort(spectrum[top])[::-1]]
+    return [float(frequencies[i]) for i in top if spectrum[i] > 0]
+
+def dominant_frequencies(values: np.ndarray, sample_rate: Optional[float]) -> list:
+    """Top spectral peaks (excluding DC), in Hz if the sample rate is known, else cycles/sample"""
+    if values.size < 4:
+        return []
+    spectrum = np.abs(np.fft.rfft(values - values.mean()))
+    frequencies = np.fft.rfftfreq(values.size, d=1.0 / sample_rate if sample_rate else 1.0)
+    return peak_frequencies(spectrum, frequencies)
+
+def _contact_events(values: np.ndarray) -> int:
+    """Count rising crossings of the mid-range level (each crossing ~ one contact onset)"""
+    low, high = values.min(), values.max()
+    if high <= low:
+        return 0
+    above = values > low + 0.5 * (high - low)
+    return int(np.count_nonzero(above[1:] & ~above[:-1]) + (1 if above[0] else 0))
+
+def channel_features(values: np.ndarray, sample_rate: Optional[float] = None) -> Dict[str, Any]:
+    """Summary statistics for one tactile channel"""
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return {"n": 0}
+    diffs = np.diff(values)
+    return {
+        "n": int(values.size),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "dominant_freqs": dominant_frequencies(values, sample_rate),
+        # Roughness proxy: RMS of sample-to-sample change
+        "roughness": float(np.sqrt(np.mean(diffs ** 2))) if diffs.size else 0.0,
+        "contact_events": _contact_events(values)
+    }
+
+def friction_channels(names) -> Tuple[Optional[str], list]:
+    """Pick the normal-force channel and shear channels by name, if present"""
+    def find(hints):
+        return [name for name in names if any(hint in name.lower() for hint in hints)]
+
+    normal = find(NORMAL_FORCE_HINTS)
+    shear = [name for name in find(SHEAR_FORCE_HINTS) if name not in normal]
+    if not normal or not shear:
+        return None, []
+    return normal[0], shear
+
+def _friction_proxy(channels: Dict[str, np.ndarray]) -> Optional[float]:
+    """Mean |shear| / mean |normal| when both kinds of channel are present"""
+    normal, shear = friction_channels(channels)
+    if normal is None:
+        return None
+    normal_mean = float(np.mean(np.abs(channels[normal])))
+    if normal_mean == 0:
+        return None
+    shear_magnitude = np.sqrt(sum(channels[name] ** 2 for name in shear if channels[name].size == channels[shear[0]].size))
+    return float(np.mean(shear_magnitude)) / normal_mean
+
+def round_summary(value: Any, digits: int = 4) -> Any:
+    """Round floats to a few significant digits to keep the summary compact"""
+    if isinstance(value, float):
+        return float(f"{value:.{digits}g}")
+    if isinstance(value, list):
+        return [round_summary(v, digits) for v in value]
+    if isinstance(value, dict):
+        return {k: round_summary(v, digits) for k, v in value.items()}
+    return value
+
+def compute_features(channels: Dict[str, np.ndarray], sample_rate: Optional[float] = None) -> Dict[str, Any]:
+    """Compact feature summary across all channels"""
+    summary = {
+        "sample_rate": sample_rate,
+        "channels": {name: channel_features(values, sample_rate) for name, values in channels.items()}
+    }
+    friction = _friction_proxy(channels)
+    if friction is not None:
+        summary["friction_ratio"] = friction
+    return round_summary(summary)
+
+def parse_channels(content: bytes) -> Tuple[Dict[str, np.ndarray], Optional[float]]:
+    """Parse tactile file content (JSON or CSV) into named channels and sample rate"""
+    text = content.decode("utf-8")
+    try:
+        return channels_from_json(json.loads(text))
+    except json.JSONDecodeError:
+        try:
+            return channels_from_text(text), None
+        except ValueError:
+            return {}, None
+
+def extract_features(content: bytes) -> Optional[Dict[str, Any]]:
+    """Parse tactile file content and compute features; None if it holds no numeric channels"""
+    channels, sample_rate = parse_channels(content)
+    if not channels:
+        return None
+    return compute_features(channels, sample_rate)
+
+def summarize_tactile(content: bytes) -> Optional[str]:
+    """Compact JSON feature summary for tactile content, cached by content hash"""
+    key = hash_bytes(content)
+    cached = feature_cache.get(key)
+    if cached is not None:
+        return cached["summary"]
+
+    features = extract_features(content)
+    if features is None:
+        return None
+    summary = json.dumps(features, separators=(",", ":"))
+    feature_cache.set(key, {"summary": summary})
+    return summary
+
+def get_feature_cache_stats() -> Dict[str, Any]:
+    """Get tactile feature cache hit/miss counters"""
+    return feature_cache.get_stats()
@@ -0,0 +1,656 @@
+"""
+Incremental parsing of large tactile JSON / CSV uploads.
+
+Uploads are fed chunk by chunk into StreamingTactileParser, which pushes
+batches of samples into per-channel running aggregates (for feature
+summaries) or a streaming min/max downsampler. Memory use depends on the
+chunk size and token budget, not on the length of the recording.
+
+Supported JSON layouts and channel names mirror tactile_features.channels_from_json:
+an array of numbers, an array of rows ([[...], ...]), an array of records
+([{...}, ...]) or an object of named channel arrays, optionally nested
+under "data"/"samples"/... with a "sample_rate" key. Non-numeric arrays and
+other nested objects are skipped.
+"""
+import codecs
+import json
+import math
+import os
+import re
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+
+from services.tactile_features import peak_frequencies, friction_channels, round_summary, SAMPLE_RATE_KEYS, DATA_KEYS
+from services.tactile_downsampling import (
+    lttb_downsample, TACTILE_TOKEN_BUDGET, TACTILE_DOWNSAMPLE_METHOD, TOKENS_PER_VALUE, VALUE_DIGITS
+)
+from services.tactile_binary import FFT_SEGMENT, LTTB_CANDIDATE_RATIO
+
+# Hard cap on a tactile upload; larger uploads are rejected as soon as the limit is crossed
+TACTILE_MAX_UPLOAD_BYTES = int(os.getenv("TACTILE_MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+# A single JSON element (record or scalar) larger than this can't be streamed
+MAX_ELEMENT_CHARS = 8 * 1024 * 1024
+RECORD_BATCH = 4096
+ROW_SEPARATOR = re.compile(r"\]\s*,\s*\[")
+OUTER_ARRAY_END = re.compile(r"\]\s*\]")
+# np.fromstring silently misreads some tokens (e.g. a partial "nul" as -1), so screen out characters
+# of JSON strings, literals and containers first
+NON_NUMERIC_CHARS = '"ntfalsru[]{}:'
+NUMBER_CHARS = "0123456789.eE+-"
+
+class TactileTooLargeError(ValueError):
+    """Raised when a tactile upload exceeds TACTILE_MAX_UPLOAD_BYTES"""
+
+class RunningChannelStats:
+    """Single-pass equivalent of tactile_features.channel_features
+
+    contact_events is approximate: the mid-range level adapts as the
+    running min/max grow, instead of using the final range.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.low = math.inf
+        self.high = -math.inf
+        self.diff_sq = 0.0
+        self.last = None
+        self.events = 0
+        self.was_above = False
+        self.spectrum = np.zeros(FFT_SEGMENT // 2 + 1)
+        self.segments = 0
+        # Samples not yet forming a full FFT segment
+        self.pending = np.empty(0)
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+
+        # Merge moments (Chan et al. parallel variance)
+        count = values.size
+        chunk_mean = float(values.mean())
+        chunk_m2 = float(np.sum((values - chunk_mean) ** 2))
+        delta = chunk_mean - self.mean
+        total = self.n + count
+        self.mean += delta * count / total
+        self.m2 += chunk_m2 + delta * delta * self.n * count / total
+        self.n = total
+
+        self.low = min(self.low, float(values.min()))
+        self.high = max(self.high, float(values.max()))
+
+        diffs = np.diff(values if self.last is None else np.concatenate(([self.last], values)))
+        self.diff_sq += float(np.dot(diffs, diffs))
+        self.last = float(values[-1])
+
+        if self.high > self.low:
+            above = values > self.low + 0.5 * (self.high - self.low)
+            self.events += int(np.count_nonzero(above[1:] & ~above[:-1])) + int(above[0] and not self.was_above)
+            self.was_above = bool(above[-1])
+
+        buffered = np.concatenate((self.pending, values))
+        full = buffered.size // FFT_SEGMENT * FFT_SEGMENT
+        if full:
+            rows = buffered[:full].reshape(-1, FFT_SEGMENT)
+            rows = rows - rows.mean(axis=1, keepdims=True)
+            self.spectrum += np.abs(np.fft.rfft(rows, axis=1)).sum(axis=0)
+            self.segments += rows.shape[0]
+        self.pending = buffered[full:]
+
+    def result(self, sample_rate: Optional[float]) -> Dict[str, Any]:
+        if self.n == 0:
+            return {"n": 0}
+        d = 1.0 / sample_rate if sample_rate else 1.0
+        if self.segments:
+            dominant = peak_frequencies(self.spectrum, np.fft.rfftfreq(FFT_SEGMENT, d=d))
+        elif self.pending.size >= 4:
+            spectrum = np.abs(np.fft.rfft(self.pending - self.pending.mean()))
+            dominant = peak_frequencies(spectrum, np.fft.rfftfreq(self.pending.size, d=d))
+        else:
+            dominant = []
+        return {
+            "n": self.n,
+            "mean": self.mean,
+            "std": math.sqrt(self.m2 / self.n),
+            "min": self.low,
+            "max": self.high,
+            "dominant_freqs": dominant,
+            "roughness": math.sqrt(self.diff_sq / (self.n - 1)) if self.n > 1 else 0.0,
+            "contact_events": self.events
+        }
+
+class StreamingMinMax:
+    """Min/max bucketing over a stream of unknown length
+
+    Buckets double in size (pairs merge) whenever their count reaches
+    2 * max_buckets, so memory stays O(max_buckets). The first head_size
+    samples are also kept so short channels can be returned verbatim.
+    """
+
+    def __init__(self, max_buckets: int, head_size: int):
+        self.max_buckets = max(1, max_buckets)
+        self.head_size = head_size
+        self.head = []
+        self.n = 0
+        self.bucket_size = 1
+        # Columns: min index, min value, max index, max value
+        self.buckets = np.empty((0, 4))
+        # Partial bucket: [min index, min value, max index, max value, count]
+        self.partial = None
+
+    def _merge_into_partial(self, values: np.ndarray, offset: int) -> None:
+        lo, hi = int(np.argmin(values)), int(np.argmax(values))
+        piece = [offset + lo, float(values[lo]), offset + hi, float(values[hi]), values.size]
+        if self.partial is None:
+            self.partial = piece
+            return
+        partial = self.partial
+        if piece[1] < partial[1]:
+            partial[0], partial[1] = piece[0], piece[1]
+        if piece[3] > partial[3]:
+            partial[2], partial[3] = piece[2], piece[3]
+        partial[4] += piece[4]
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        if len(self.head) < self.head_size:
+            self.head.extend(values[:self.head_size - len(self.head)].tolist())
+
+        offset = self.n
+        self.n += values.size
+        pos = 0
+        if self.partial is not None:
+            take = min(self.bucket_size - self.partial[4], values.size)
+            self._merge_into_partial(values[:take], offset)
+            pos = take
+            if self.partial[4] >= self.bucket_size:
+                self.buckets = np.vstack((self.buckets, [self.partial[:4]]))
+                self.partial = None
+
+        full = (values.size - pos) // self.bucket_size * self.bucket_size
+        if full:
+            rows = values[pos:pos + full].reshape(-1, self.bucket_size)
+            starts = offset + pos + np.arange(rows.shape[0]) * self.bucket_size
+            lows, highs = rows.argmin(axis=1), rows.argmax(axis=1)
+            taken = np.arange(rows.shape[0])
+            self.buckets = np.vstack((self.buckets, np.column_stack((
+                starts + lows, rows[taken, lows], starts + highs, rows[taken, highs]
+            ))))
+        if pos + full < values.size:
+            self._merge_into_partial(values[pos + full:], offset + pos + full)
+
+        while self.buckets.shape[0] >= 2 * self.max_buckets:
+            self._halve()
+
+    def _halve(self) -> None:
+        """Merge adjacent bucket pairs, doubling the bucket size"""
+        count = self.buckets.shape[0] // 2 * 2
+        leftover = self.buckets[count:]
+        pairs = self.buckets[:count].reshape(-1, 2, 4)
+        first_min = pairs[:, 0, 1] <= pairs[:, 1, 1]
+        first_max = pairs[:, 0, 3] >= pairs[:, 1, 3]
+        merged = np.column_stack((
+            np.where(first_min, pairs[:, 0, 0], pairs[:, 1, 0]),
+            np.where(first_min, pairs[:, 0, 1], pairs[:, 1, 1]),
+            np.where(first_max, pairs[:, 0, 2], pairs[:, 1, 2]),
+            np.where(first_max, pairs[:, 0, 3], pairs[:, 1, 3])
+        ))
+        self.bucket_size *= 2
+        self.buckets = merged
+        if leftover.size:
+            # An unpaired last bucket becomes part of the (now larger) partial bucket
+            row = leftover[0]
+            old_partial = self.partial
+            self.partial = [int(row[0]), float(row[1]), int(row[2]), float(row[3]), self.bucket_size // 2]
+            if old_partial is not None:
+                if old_partial[1] < self.partial[1]:
+                    self.partial[0], self.partial[1] = old_partial[0], old_partial[1]
+                if old_partial[3] > self.partial[3]:
+                    self.partial[2], self.partial[3] = old_partial[2], old_partial[3]
+                self.partial[4] += old_partial[4]
+
+    def result(self, max_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Sorted sample indices and values, reduced to at most max_buckets buckets"""
+        if self.partial is not None:
+            self.buckets = np.vstack((self.buckets, [self.partial[:4]]))
+            self.partial = None
+        while self.buckets.shape[0] > max(1, max_buckets):
+            self._halve()
+            if self.partial is not None:
+                self.buckets = np.vstack((self.buckets, [self.partial[:4]]))
+                self.partial = None
+        indices = np.concatenate((self.buckets[:, 0], self.buckets[:, 2])).astype(np.int64)
+        values = np.concatenate((self.buckets[:, 1], self.buckets[:, 3]))
+        indices, first = np.unique(indices, return_index=True)
+        return indices, values[first]
+
+class StreamingTactileSummary:
+    """Per-channel running aggregates fed by StreamingTactileParser"""
+
+    def __init__(self,
+                 tactile_mode: str = "features",
+                 token_budget: int = TACTILE_TOKEN_BUDGET,
+                 method: str = TACTILE_DOWNSAMPLE_METHOD):
+        self.tactile_mode = "downsampled" if tactile_mode == "downsampled" else "features"
+        self.token_budget = token_budget
+        self.method = method
+        self.sample_rate: Optional[float] = None
+        self.channels: Dict[str, Any] = {}
+        # Friction proxy over batches where normal and shear channels arrive together
+        self.normal_abs_sum = 0.0
+        self.shear_magnitude_sum = 0.0
+        # Channels found to contain non-numeric values; later samples for them are ignored
+        self.dropped = set()
+
+        # Until the channel count is known, size buckets as if there were only one channel
+        self._max_values = max(4, int(token_budget / TOKENS_PER_VALUE))
+        self._max_buckets = self._max_values // 4
+        if method == "lttb":
+            self._max_buckets *= LTTB_CANDIDATE_RATIO
+
+    def _channel(self, name: str):
+        if name not in self.channels:
+            if self.tactile_mode == "downsampled":
+                self.channels[name] = StreamingMinMax(self._max_buckets, self._max_values)
+            else:
+                self.channels[name] = RunningChannelStats()
+        return self.channels[name]
+
+    def drop(self, name: str) -> None:
+        """Discard a channel (e.g. an array that turned out not to be numeric)"""
+        self.channels.pop(name, None)
+        self.dropped.add(name)
+
+    def keep_only(self, names) -> None:
+        for name in list(self.channels):
+            if name not in names:
+                self.drop(name)
+
+    def add_batch(self, columns: Dict[str, np.ndarray]) -> None:
+        """Add aligned samples for one or more channels"""
+        columns = {name: values for name, values in columns.items() if name not in self.dropped}
+        for name, values in columns.items():
+            self._channel(name).update(np.asarray(values, dtype=np.float64))
+
+        normal, shear = friction_channels(columns)
+        if normal is not None and self.tactile_mode == "features":
+            size = columns[normal].size
+            shear = [name for name in shear if columns[name].size == size]
+            if shear:
+                self.normal_abs_sum += float(np.abs(columns[normal]).sum())
+                self.shear_magnitude_sum += float(np.sqrt(sum(columns[name] ** 2 for name in shear)).sum())
+
+    def result(self) -> Tuple[str, Dict[str, Any]]:
+        """Prompt text and info, in the same shape as the in-memory paths"""
+        if not self.channels:
+            raise ValueError("No numeric channels found in tactile data")
+
+        if self.tactile_mode == "features":
+            summary = {
+                "sample_rate": self.sample_rate,
+                "channels": {name: stats.result(self.sample_rate) for name, stats in self.channels.items()}
+            }
+            if self.normal_abs_sum > 0:
+                summary["friction_ratio"] = self.shear_magnitude_sum / self.normal_abs_sum
+            serialized = json.dumps(round_summary(summary), separators=(",", ":"))
+            return f"Tactile features (summary): {serialized}", {"mode": "features", "streamed": True}
+
+        per_channel_values = max(4, int(self.token_budget / TOKENS_PER_VALUE / len(self.channels)))
+        max_points = per_channel_values // 2
+        data: Dict[str, Any] = {}
+        original_samples: Dict[str, int] = {}
+        reduced_samples: Dict[str, int] = {}
+        for name, sampler in self.channels.items():
+            original_samples[name] = sampler.n
+            if sampler.n <= per_channel_values:
+                data[name] = {"v": np.round(np.asarray(sampler.head), VALUE_DIGITS).tolist()}
+                reduced_samples[name] = sampler.n
+                continue
+            if self.method == "lttb":
+                candidates, candidate_values = sampler.result(max_points * LTTB_CANDIDATE_RATIO // 2)
+                selected = lttb_downsample(candidate_values, max_points)
+                indices, values = candidates[selected], candidate_values[selected]
+            else:
+                indices, values = sampler.result(max_points // 2)
+            data[name] = {"i": indices.tolist(), "v": np.round(values, VALUE_DIGITS).tolist()}
+            reduced_samples[name] = int(indices.size)
+
+        serialized = json.dumps({"sample_rate": self.sample_rate, "channels": data}, separators=(",", ":"))
+        counts = {
+            "method": self.method,
+            "token_budget": self.token_budget,
+            "original_samples": original_samples,
+            "reduced_samples": reduced_samples
+        }
+        return f"Tactile data (downsampled JSON): {serialized}", {"mode": "downsampled", "streamed": True, **counts}
+
+class StreamingTactileParser:
+    """Push parser: feed() raw upload chunks, then close() and read summary.result()"""
+
+    def __init__(self, summary: StreamingTactileSummary, max_bytes: int = TACTILE_MAX_UPLOAD_BYTES):
+        self.summary = summary
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.format: Optional[str] = None
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._parser = None
+        self._done = False
+        # CSV state
+        self._delimiter = None
+        self._header = None
+        # JSON state: channels found under a "data"/"samples"/... key take precedence over their siblings
+        self._data_depth = 0
+        self._data_channels = set()
+        self._rate_depth = None
+
+    def feed(self, data: bytes) -> None:
+        self.bytes_read += len(data)
+        if self.bytes_read > self.max_bytes:
+            raise TactileTooLargeError(f"Tactile upload exceeds the {self.max_bytes} byte limit")
+        self._buf = self._buf[self._pos:] + self._text_decoder.decode(data)
+        self._pos = 0
+        self._run()
+
+    def close(self) -> StreamingTactileSummary:
+        self._buf = self._buf[self._pos:] + self._text_decoder.decode(b"", final=True)
+        self._pos = 0
+        self._eof = True
+        self._run()
+        if self._parser is not None and not self._done:
+            raise ValueError("Unexpected end of tactile data")
+        if self._data_channels & set(self.summary.channels):
+            self.summary.keep_only(self._data_channels)
+        return self.summary
+
+    def _run(self) -> None:
+        if self._done:
+            return
+        if self._parser is None:
+            stripped = self._buf.lstrip()
+            if not stripped:
+                return
+            self.format = "json" if stripped[0] in "[{" else "csv"
+            self._parser = self._json() if self.format == "json" else self._csv()
+        try:
+            next(self._parser)
+        except StopIteration:
+            self._done = True
+
+    # JSON helpers: generators that yield whenever more input is needed
+
+    def _skip_ws(self):
+        while True:
+            buf = self._buf
+            while self._pos < len(buf) and buf[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(buf):
+                return
+            if self._eof:
+                raise ValueError("Unexpected end of tactile data")
+            yield
+
+    def _decode_value(self):
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buf, self._pos)
+                # A number at the very end of the buffer (or cut short, e.g. "0." / "1e") may continue in the next chunk
+                if (self._eof or not isinstance(value, (int, float))
+                        or (end < len(self._buf) and self._buf[end] not in NUMBER_CHARS)):
+                    self._pos = end
+                    return value
+            except ValueError:
+                if self._eof:
+                    raise
+            if len(self._buf) - self._pos > MAX_ELEMENT_CHARS:
+                raise ValueError("Tactile JSON element too large to stream")
+            yield
+
+    def _add(self, columns: Dict[str, np.ndarray]) -> None:
+        if self._data_depth:
+            self._data_channels.update(columns)
+        self.summary.add_batch(columns)
+
+    def _json(self):
+        yield from self._skip_ws()
+        if self._buf[self._pos] == "[":
+            # Same default names as channels_from_json for unnamed top-level arrays
+            yield from self._array("value", "channel", records=True)
+        else:
+            yield from self._object(0)
+
+    def _object(self, depth: int, discard: bool = False):
+        """Object of channels; with discard=True (objects channels_from_json ignores) it is only skipped"""
+        self._pos += 1
+        while True:
+            yield from self._skip_ws()
+            ch = self._buf[self._pos]
+            if ch == "}":
+                self._pos += 1
+                return
+            if ch == ",":
+                self._pos += 1
+                continue
+            key = yield from self._decode_value()
+            yield from self._skip_ws()
+            if self._buf[self._pos] != ":":
+                raise ValueError("Malformed tactile JSON object")
+            self._pos += 1
+            yield from self._skip_ws()
+            ch = self._buf[self._pos]
+            is_data = key in DATA_KEYS and not discard
+            if ch in "[{":
+                self._data_depth += is_data
+                if discard:
+                    self._pos += 1
+                    yield from (self._values(None) if ch == "[" else self._object(depth + 1, discard=True))
+                elif ch == "{":
+                    # Only objects under a data key hold channels (e.g. "data": {"normal": [...]})
+                    yield from self._object(depth + 1, discard=not is_data)
+                elif is_data:
+                    yield from self._array("value", "channel", records=True)
+                else:
+                    yield from self._array(str(key), str(key), records=False)
+                self._data_depth -= is_data
+            else:
+                value = yield from self._decode_value()
+                if (not discard and key in SAMPLE_RATE_KEYS and isinstance(value, (int, float)) and value > 0
+                        and (self._rate_depth is None or depth < self._rate_depth)):
+                    # The outermost sample rate wins, as in channels_from_json
+                    self.summary.sample_rate = float(value)
+                    self._rate_depth = depth
+
+    def _array(self, name: str, row_name: str, records: bool):
+        self._pos += 1
+        yield from self._skip_ws()
+        ch = self._buf[self._pos]
+        if ch == "]":
+            self._pos += 1
+        elif ch == "[":
+            yield from self._rows(row_name)
+        elif ch == "{" and records:
+            yield from self._records()
+        elif ch in "{\"tfn":
+            yield from self._values(name if ch != "{" else None)
+        else:
+            yield from self._numbers(name)
+
+    def _parse_numbers(self, text: str) -> np.ndarray:
+        if not text.strip():
+            return np.empty(0)
+        if any(ch in text for ch in NON_NUMERIC_CHARS):
+            raise ValueError("Non-numeric value in tactile array")
+        values = np.fromstring(text, sep=",")
+        if values.size != text.count(",") + 1:
+            raise ValueError("Non-numeric value in tactile array")
+        return values
+
+    def _numbers(self, name: str):
+        """Flat array of numbers: parse everything up to the last complete value in bulk"""
+        while True:
+            end = self._buf.find("]", self._pos)
+            cut = end if end != -1 else self._buf.rfind(",", self._pos)
+            if cut != -1:
+                try:
+                    values = self._parse_numbers(self._buf[self._pos:cut])
+                except ValueError:
+                    # null, booleans or strings: finish the array element by element
+                    yield from self._values(name)
+                    return
+                self._add({name: values})
+                self._pos = cut + 1
+                if end != -1:
+                    return
+            if self._eof:
+                raise ValueError("Unexpected end of tactile data")
+            yield
+
+    def _values(self, name: Optional[str]):
+        """Rest of an array, one element at a time: null counts as NaN, and a non-numeric
+        element drops the channel; with name=None the array is only skipped"""
+        batch = []
+        while True:
+            yield from self._skip_ws()
+            ch = self._buf[self._pos]
+            if ch == "]":
+                self._pos += 1
+                break
+            if ch == ",":
+                self._pos += 1
+                continue
+            value = yield from self._decode_value()
+            if name is None:
+                continue
+            if value is None:
+                value = math.nan
+            if not isinstance(value, (int, float)):
+                self.summary.drop(name)
+                name = None
+                batch = []
+                continue
+            batch.append(float(value))
+            if len(batch) >= RECORD_BATCH:
+                self._add({name: np.asarray(batch)})
+                batch = []
+        if name is not None and batch:
+            self._add({name: np.asarray(batch)})
+
+    def _rows(self, name: str):
+        """Array of flat numeric rows: complete rows in the buffer are parsed in bulk"""
+        columns = None
+        while True:
+            yield from self._skip_ws()
+            ch = self._buf[self._pos]
+            if ch == "]":
+                self._pos += 1
+                return
+            if ch == ",":
+                self._pos += 1
+                continue
+            if ch != "[":
+                raise ValueError("Malformed tactile row array")
+
+            last_close = self._buf.rfind("]", self._pos)
+            if last_close == -1:
+                if self._eof:
+                    raise ValueError("Unexpected end of tactile data")
+                yield
+                continue
+            segment = self._buf[self._pos:last_close + 1]
+            outer = OUTER_ARRAY_END.search(segment)
+            if outer is not None:
+                segment = segment[:outer.start() + 1]
+            try:
+                if columns is None:
+                    columns = self._parse_numbers(segment[1:segment.index("]")]).size
+                values = self._parse_numbers(ROW_SEPARATOR.sub(",", segment.strip()[1:-1]))
+                if columns == 0 or values.size % columns:
+                    raise ValueError("Tactile rows have inconsistent lengths")
+            except ValueError:
+                # Ragged or non-numeric rows aren't a channel array (channels_from_json skips them too)
+                for i in range(columns or 0):
+                    self.summary.drop(f"{name}_{i}")
+                yield from self._values(None)
+                return
+            rows = values.reshape(-1, columns)
+            self._add({f"{name}_{i}": rows[:, i] for i in range(columns)})
+            if outer is not None:
+                self._pos += outer.end()
+                return
+            self._pos = last_close + 1
+
+    def _flush_records(self, batch: list, names: list) -> None:
+        columns = {}
+        for name in names:
+            try:
+                columns[str(name)] = np.asarray([record.get(name) for record in batch], dtype=np.float64)
+            except (TypeError, ValueError):
+                self.summary.drop(str(name))
+        if columns:
+            self._add(columns)
+
+    def _records(self):
+        """Array of records: decoded one at a time, aggregated in batches (fields of the first record)"""
+        batch = []
+        names = None
+        while True:
+            yield from self._skip_ws()
+            ch = self._buf[self._pos]
+            if ch == "]":
+                self._pos += 1
+                break
+            if ch == ",":
+                self._pos += 1
+                continue
+            record = yield from self._decode_value()
+            if isinstance(record, dict):
+                if names is None:
+                    names = list(record)
+                batch.append(record)
+            if len(batch) >= RECORD_BATCH:
+                self._flush_records(batch, names)
+                batch = []
+        if batch:
+            self._flush_records(batch, names)
+
+    # CSV
+
+    def _process_lines(self, lines: list) -> None:
+        lines = [line for line in lines if line.strip() and not line.lstrip().startswith("#")]
+        if not lines:
+            return
+        if self._delimiter is None:
+            self._delimiter = "," if "," in lines[0] else " "
+            first = lines[0].split(None if self._delimiter == " " else ",")
+            try:
+                [float(token) for token in first]
+                self._header = [f"channel_{i}" for i in range(len(first))]
+            except ValueError:
+                self._header = [token.strip() for token in first]
+                lines = lines[1:]
+            if not lines:
+                return
+        array = np.loadtxt(lines, delimiter=None if self._delimiter == " " else ",", ndmin=2, dtype=np.float64)
+        if array.shape[1] != len(self._header):
+            raise ValueError("Tactile CSV rows have inconsistent column counts")
+        self.summary.add_batch({name: array[:, i] for i, name in enumerate(self._header)})
+
+    def _csv(self):
+        while True:
+            newline = self._buf.rfind("\n", self._pos)
+            if newline != -1:
+                lines = self._buf[self._pos:newline].splitlines()
+                self._pos = newline + 1
+                self._process_lines(lines)
+            if self._eof:
+                self._process_lines(self._buf[self._pos:].splitlines())
+                self._pos = len(self._buf)
+                return
+            yield
@@ -0,0 +1,174 @@
+import asyncio
+import itertools
+import time
+
+import httpx
+import openai
+import pytest
+
+from benchmarks import mock_server
+from services.backend_pool import Backend, BackendPool, EJECT_AFTER_FAILURES
+from services.gpt_integration import GPTService
+from services.resilience import RetryPolicy
+
+_names = itertools.count()
+
+def run(coro):
+    return asyncio.run(coro)
+
+def upstream_client() -> httpx.AsyncClient:
+    """http://mock.test serves benchmarks.mock_server in-process; http://down.test refuses connections"""
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    return httpx.AsyncClient(mounts={
+        "http://mock.test": httpx.ASGITransport(app=mock_server.app),
+        "http://down.test": httpx.MockTransport(refuse),
+    })
+
+def backend(host: str = "mock.test", client=None, **kwargs) -> Backend:
+    # Breakers are process-wide per name, so every test backend gets a fresh one
+    return Backend(f"test-{next(_names)}", f"http://{host}/v1", "key", client or upstream_client(), **kwargs)
+
+def pool(*backends, **kwargs) -> BackendPool:
+    return BackendPool(list(backends), health_check_interval=0, **kwargs)
+
+def test_least_outstanding_picks_least_loaded_relative_to_capacity():
+    small, large = backend(max_concurrency=2), backend(max_concurrency=10)
+    small.outstanding, large.outstanding = 1, 3
+    assert pool(small, large).select() is large
+
+def test_ewma_prefers_faster_backend_and_tries_unmeasured_first():
+    fast, slow, new = backend(), backend(), backend()
+    fast.ewma_ms, slow.ewma_ms = 100.0, 400.0
+    assert pool(fast, slow, policy="ewma").select() is fast
+    assert pool(fast, slow, new, policy="ewma").select() is new
+
+def test_retries_prefer_untried_backends():
+    first, second = backend(), backend()
+    backends = pool(first, second)
+    assert backends.select(exclude=[first]) is second
+    # Everything tried: fall back to the best available one
+    assert backends.select(exclude=[first, second]) is first
+
+def test_ejected_and_open_backends_are_skipped():
+    ejected, broken, ok = backend(), backend(), backend()
+    ejected.healthy = False
+    broken.breaker.record_failure()
+    broken.breaker.state, broken.breaker.opened_at = "open", time.monotonic()
+    assert pool(ejected, broken, ok).select() is ok
+
+def test_open_backend_past_reset_timeout_gets_a_probe():
+    recovering, busy = backend(), backend()
+    recovering.breaker.state = "open"
+    recovering.breaker.opened_at = time.monotonic() - recovering.breaker.reset_timeout - 1
+    busy.outstanding = 5
+    assert recovering.available()
+    assert pool(recovering, busy).select() is recovering
+
+def test_lease_ejects_after_repeated_outages_but_not_a_lone_backend():
+    async def fail(backends, target, times):
+        for _ in range(times):
+            with pytest.raises(openai.APIConnectionError):
+                async with backends.lease(target):
+                    raise openai.APIConnectionError(request=httpx.Request("POST", "http://down.test"))
+
+    flaky, other, lone = backend(), backend(), backend()
+    run(fail(pool(flaky, other), flaky, EJECT_AFTER_FAILURES))
+    run(fail(pool(lone), lone, EJECT_AFTER_FAILURES))
+    assert not flaky.healthy and flaky.ejections == 1
+    assert lone.healthy
+    assert flaky.outstanding == 0
+
+def test_client_errors_do_not_count_against_a_backend():
+    target = backend()
+
+    async def main():
+        request = httpx.Request("POST", "http://mock.test/v1/chat/completions")
+        error = openai.APIStatusError("bad request", response=httpx.Response(400, request=request), body=None)
+        for _ in range(EJECT_AFTER_FAILURES):
+            with pytest.raises(openai.APIStatusError):
+                async with pool(target, backend()).lease(target):
+                    raise error
+
+    run(main())
+    assert target.healthy and target.failures == 0
+
+def test_health_checks_eject_and_reinstate():
+    down, up = backend("down.test"), backend()
+    up.healthy = False
+    backends = pool(down, up)
+    run(backends.run_health_checks())
+    assert not down.healthy
+    assert up.healthy
+
+def test_lease_bounds_concurrency():
+    target = backend(max_concurrency=2)
+    backends = pool(target)
+    peak = 0
+    active = 0
+
+    async def call():
+        nonlocal peak, active
+        async with backends.lease(target):
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def main():
+        await asyncio.gather(*[call() for _ in range(6)])
+
+    run(main())
+    assert peak == 2
+    assert target.outstanding == 0
+
+def test_service_fails_over_to_mock_server(monkeypatch):
+    monkeypatch.setitem(mock_server.SETTINGS, "latency_ms", 0)
+    monkeypatch.setitem(mock_server.SETTINGS, "tokens", 3)
+
+    async def main():
+        client = upstream_client()
+        down, mock = backend("down.test", client), backend("mock.test", client, model="mock-model")
+        service = GPTService()
+        service.backend_pool = pool(down, mock)
+        service.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+        before = mock_server.STATS["requests"]
+        try:
+            result = await service.generate_text_response("hello", use_cache=False)
+        finally:
+            await client.aclose()
+        return result, down, mock, mock_server.STATS["requests"] - before
+
+    result, down, mock, served = run(main())
+    assert result["success"], result
+    assert result["response"] == "tok tok tok"
+    # The backend's pinned model is what was sent and is what gets reported
+    assert result["model"] == "mock-model"
+    assert served == 1
+    assert down.failures == 1 and mock.failures == 0
+    assert down.outstanding == mock.outstanding == 0
+
+def test_stream_fails_over_and_releases_the_lease(monkeypatch):
+    monkeypatch.setitem(mock_server.SETTINGS, "latency_ms", 0)
+    monkeypatch.setitem(mock_server.SETTINGS, "tokens", 10)
+
+    async def main():
+        client = upstream_client()
+        down, mock = backend("down.test", client), backend("mock.test", client, max_concurrency=1)
+        service = GPTService()
+        service.backend_pool = pool(down, mock)
+        service.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+        try:
+            events = [event async for event in service.stream_response("hello", use_cache=False)]
+        finally:
+            await client.aclose()
+        return events, down, mock
+
+    events, down, mock = run(main())
+    assert events[-1]["type"] == "done", events[-1]
+    assert "".join(event["content"] for event in events if event["type"] == "delta").split() == ["tok"] * 10
+    assert down.failures == 1
+    assert mock.requests == 1
+    assert down.outstanding == mock.outstanding == 0
+    assert mock.semaphore._value == 1
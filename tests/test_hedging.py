@@ -0,0 +1,104 @@
+import asyncio
+from collections import deque
+
+import pytest
+
+from services.hedging import Hedger
+
+def run(coro):
+    return asyncio.run(coro)
+
+def warmed(latency_ms: float = 10, **kwargs) -> Hedger:
+    """Hedger that already has enough samples to hedge after ~latency_ms"""
+    options = {"enabled": True, "percentile": 0.95, "max_rate": 1.0, "min_delay_ms": 0, "min_samples": 5}
+    options.update(kwargs)
+    hedger = Hedger(**options)
+    hedger.latencies["model"] = deque([latency_ms] * 10)
+    return hedger
+
+class Upstream:
+    """call() whose n-th invocation sleeps delays[n] seconds, then returns n or raises errors[n]"""
+
+    def __init__(self, delays, errors=None):
+        self.delays = delays
+        self.errors = errors or {}
+        self.started = 0
+        self.cancelled = []
+
+    async def __call__(self):
+        n = self.started
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delays[n])
+        except asyncio.CancelledError:
+            self.cancelled.append(n)
+            raise
+        if n in self.errors:
+            raise self.errors[n]
+        return n
+
+def test_no_hedge_until_enough_samples():
+    hedger = Hedger(enabled=True, min_samples=5, min_delay_ms=0)
+    upstream = Upstream([0.02])
+    assert run(hedger.run("model", upstream)) == 0
+    assert upstream.started == 1
+    assert hedger.hedge_delay("model") is None
+
+def test_hedge_delay_uses_percentile_and_floor():
+    hedger = warmed(min_delay_ms=0)
+    hedger.latencies["model"] = deque(range(1, 101))
+    assert hedger.hedge_delay("model") == pytest.approx(0.096)
+    hedger.min_delay_ms = 500
+    assert hedger.hedge_delay("model") == 0.5
+
+def test_slow_primary_is_hedged_and_cancelled():
+    hedger = warmed(latency_ms=10)
+    upstream = Upstream([1.0, 0.01])
+    assert run(hedger.run("model", upstream)) == 1
+    assert upstream.cancelled == [0]
+    stats = hedger.get_stats()
+    assert stats["hedged"] == 1
+    assert stats["hedge_wins"] == 1
+
+def test_fast_primary_is_not_hedged():
+    hedger = warmed(latency_ms=200)
+    upstream = Upstream([0.01])
+    assert run(hedger.run("model", upstream)) == 0
+    assert upstream.started == 1
+    assert hedger.hedged == 0
+
+def test_hedge_rate_is_capped():
+    hedger = warmed(latency_ms=5, max_rate=0.5)
+    hedger.latencies["model"] = deque([5] * 100)
+    # Every primary is slow; only the second call is within the 50% budget
+    upstream = Upstream([0.03, 0.03, 0.001, 0.03])
+
+    async def main():
+        return [await hedger.run("model", upstream) for _ in range(3)]
+
+    run(main())
+    assert hedger.calls == 3
+    assert hedger.hedged == 1
+    assert hedger.capped == 2
+    assert upstream.started == 4
+    assert hedger.get_stats()["duplicate_rate"] <= 0.5
+
+def test_failed_primary_waits_for_running_hedge():
+    hedger = warmed(latency_ms=10)
+    upstream = Upstream([0.03, 0.05], errors={0: RuntimeError("primary failed")})
+    assert run(hedger.run("model", upstream)) == 1
+
+def test_error_raised_when_every_call_fails():
+    hedger = warmed(latency_ms=10)
+    upstream = Upstream([0.03, 0.03], errors={0: RuntimeError("a"), 1: RuntimeError("b")})
+    with pytest.raises(RuntimeError):
+        run(hedger.run("model", upstream))
+    # Failures are not latency samples
+    assert len(hedger.latencies["model"]) == 10
+
+def test_disabled_never_duplicates():
+    hedger = warmed(latency_ms=1, enabled=False)
+    upstream = Upstream([0.02])
+    assert run(hedger.run("model", upstream)) == 0
+    assert upstream.started == 1
+    assert hedger.calls == 0
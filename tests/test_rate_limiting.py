@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from services.rate_limiting import (
+    IMAGE_TOKEN_ESTIMATE, PRIORITY_BATCH, PRIORITY_INTERACTIVE, RateLimiter, RateLimitQueueFullError, estimate_tokens
+)
+
+def run(coro):
+    return asyncio.run(coro)
+
+def drained(tpm: float = 6000, max_queue: int = 10) -> RateLimiter:
+    """Limiter with an empty token bucket that refills 1 token per 10 ms"""
+    limiter = RateLimiter(rpm=0, tpm=tpm, max_queue=max_queue)
+    limiter.tokens.tokens = 0
+    return limiter
+
+def test_disabled_limiter_never_waits():
+    async def main():
+        limiter = RateLimiter(rpm=0, tpm=0)
+        await asyncio.wait_for(limiter.acquire(10 ** 9), 0.1)
+        return limiter
+
+    assert run(main()).get_stats()["queue_depth"] == 0
+
+def test_interactive_calls_are_admitted_before_batch():
+    order = []
+
+    async def call(limiter, name, priority):
+        await limiter.acquire(1, priority=priority)
+        order.append(name)
+
+    async def main():
+        limiter = drained()
+        batch = [asyncio.create_task(call(limiter, f"batch{i}", PRIORITY_BATCH)) for i in range(3)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call(limiter, "interactive", PRIORITY_INTERACTIVE))
+        await asyncio.gather(*batch, interactive)
+
+    run(main())
+    assert order[0] == "interactive"
+    assert order[1:] == ["batch0", "batch1", "batch2"]
+
+def test_full_queue_rejects():
+    async def main():
+        limiter = drained(max_queue=2)
+        waiters = [asyncio.create_task(limiter.acquire(100)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(RateLimitQueueFullError):
+            await limiter.acquire(100)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return limiter
+
+    assert run(main()).rejected == 1
+
+def test_cancelled_waiters_leave_the_queue():
+    async def main():
+        limiter = drained(max_queue=2)
+        stuck = [asyncio.create_task(limiter.acquire(6000)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for waiter in stuck:
+            waiter.cancel()
+        await asyncio.gather(*stuck, return_exceptions=True)
+        depth = limiter.get_stats()["queue_depth"]
+        # Freed slots accept new callers, which are not held up behind the cancelled ones
+        await asyncio.wait_for(asyncio.gather(limiter.acquire(1), limiter.acquire(1)), 1.0)
+        return limiter, depth
+
+    limiter, depth = run(main())
+    assert depth == 0
+    assert limiter.rejected == 0
+    assert limiter._queue == []
+
+def test_admitted_but_cancelled_call_returns_its_budget():
+    async def main():
+        limiter = RateLimiter(rpm=0, tpm=6000)
+        limiter.tokens.tokens = 0
+        waiter = asyncio.create_task(limiter.acquire(50))
+        await asyncio.sleep(0)
+        # Refill enough for the waiter, admit it, and cancel it before it resumes
+        limiter.tokens.tokens = 50
+        limiter._dispatch()
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return limiter
+
+    limiter = run(main())
+    assert limiter.tokens.tokens >= 50
+
+def test_estimate_tokens_counts_text_images_and_completion():
+    messages = [
+        {"role": "system", "content": "x" * 40},
+        {"role": "user", "content": [{"type": "text", "text": "y" * 80}, {"type": "image_url", "image_url": {}}]}
+    ]
+    assert estimate_tokens(messages, 100) == 10 + 20 + IMAGE_TOKEN_ESTIMATE + 100
@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from services.request_coalescing import SingleFlight
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def main():
+        flight = SingleFlight(enabled=True)
+        results = await asyncio.gather(*[flight.do("key", fetch) for _ in range(5)])
+        return flight, results
+
+    flight, results = run(main())
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    assert flight.get_stats()["coalesced"] == 4
+    assert flight.get_stats()["in_flight"] == 0
+
+def test_errors_reach_every_waiter():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream")
+
+    async def main():
+        flight = SingleFlight(enabled=True)
+        return await asyncio.gather(*[flight.do("key", fail) for _ in range(3)], return_exceptions=True)
+
+    results = run(main())
+    assert all(isinstance(result, ValueError) for result in results)
+
+def test_one_cancelled_waiter_does_not_cancel_the_call():
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        flight = SingleFlight(enabled=True)
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return flight, await second
+
+    flight, result = run(main())
+    assert result == "answer"
+    assert flight.cancelled == 0
+
+def test_caller_after_cancelled_call_starts_fresh():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            # Upstream teardown takes a moment, so the task is not done when the next caller arrives
+            await asyncio.sleep(0.02)
+            raise
+        return "answer"
+
+    async def main():
+        flight = SingleFlight(enabled=True)
+        first = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        await asyncio.sleep(0)
+        result = await flight.do("key", fetch)
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return flight, result
+
+    flight, result = run(main())
+    assert result == "answer"
+    assert len(calls) == 2
+    assert flight.cancelled == 1
+
+def test_disabled_calls_through():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        flight = SingleFlight(enabled=False)
+        return await asyncio.gather(flight.do("key", fetch), flight.do("key", fetch))
+
+    assert sorted(run(main())) == [1, 2]
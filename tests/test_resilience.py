@@ -0,0 +1,166 @@
+import asyncio
+import random
+import time
+
+import httpx
+import openai
+import pytest
+
+from services.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, call_through, is_outage, is_retryable, retry_after_seconds
+)
+
+def run(coro):
+    return asyncio.run(coro)
+
+def status_error(status: int, headers=None) -> openai.APIStatusError:
+    request = httpx.Request("POST", "http://upstream.test/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return openai.APIStatusError(f"status {status}", response=response, body=None)
+
+class Flaky:
+    """Fails with the given errors, then returns "ok" """
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+@pytest.mark.parametrize("status, retryable, outage", [
+    (400, False, False),
+    (429, True, False),
+    (500, True, True),
+    (503, True, True),
+])
+def test_error_classification(status, retryable, outage):
+    error = status_error(status)
+    assert is_retryable(error) is retryable
+    assert is_outage(error) is outage
+
+@pytest.mark.parametrize("headers, expected", [
+    ({"retry-after": "2"}, 2.0),
+    ({"retry-after-ms": "250"}, 0.25),
+    ({"retry-after": "soon"}, None),
+    ({}, None),
+])
+def test_retry_after_headers(headers, expected):
+    assert retry_after_seconds(status_error(429, headers)) == expected
+
+def test_retry_after_http_date():
+    date = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+    assert 25 < retry_after_seconds(status_error(503, {"retry-after": date})) <= 30
+
+def test_backoff_is_full_jitter_within_bounds():
+    policy = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=3)
+    random.seed(1)
+    for attempt in range(6):
+        delays = [policy.backoff_delay(attempt, status_error(503)) for _ in range(200)]
+        assert all(0 <= delay <= min(3, 0.5 * 2 ** attempt) for delay in delays)
+        assert max(delays) > 0.5 * min(3, 0.5 * 2 ** attempt)
+
+def test_backoff_honors_retry_after_up_to_max_delay():
+    policy = RetryPolicy(base_delay=0.5, max_delay=10)
+    assert policy.backoff_delay(0, status_error(429, {"retry-after": "4"})) == 4.0
+    # Waiting longer than max_delay is pointless: fail now
+    assert policy.backoff_delay(0, status_error(429, {"retry-after": "60"})) is None
+
+def test_retries_transient_errors_then_succeeds():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+    fn = Flaky(status_error(503), status_error(429, {"retry-after-ms": "1"}))
+    assert run(policy.call(fn)) == "ok"
+    assert fn.calls == 3
+    assert policy.get_stats()["retries"] == 2
+    assert policy.get_stats()["retry_after_honored"] == 1
+
+def test_client_errors_are_not_retried():
+    policy = RetryPolicy(max_attempts=3, base_delay=0.001)
+    fn = Flaky(status_error(400))
+    with pytest.raises(openai.APIStatusError):
+        run(policy.call(fn))
+    assert fn.calls == 1
+    assert policy.failures == 1
+
+def test_gives_up_after_max_attempts():
+    policy = RetryPolicy(max_attempts=2, base_delay=0.001, max_delay=0.01)
+    fn = Flaky(*[status_error(500)] * 3)
+    with pytest.raises(openai.APIStatusError):
+        run(policy.call(fn))
+    assert fn.calls == 2
+
+def test_breaker_opens_after_consecutive_outages():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    for _ in range(2):
+        with pytest.raises(openai.APIStatusError):
+            run(call_through(breaker, Flaky(status_error(502))))
+    assert breaker.state == "open"
+    assert not breaker.ready()
+    fn = Flaky()
+    with pytest.raises(CircuitOpenError):
+        run(call_through(breaker, fn))
+    assert fn.calls == 0
+    assert breaker.rejected == 1
+
+def test_breaker_ignores_rate_limits_and_local_errors():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    with pytest.raises(openai.APIStatusError):
+        run(call_through(breaker, Flaky(status_error(429))))
+    with pytest.raises(RuntimeError):
+        run(call_through(breaker, Flaky(RuntimeError("queue full"))))
+    assert breaker.state == "closed"
+
+def test_half_open_allows_a_single_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.01)
+    with pytest.raises(openai.APIStatusError):
+        run(call_through(breaker, Flaky(status_error(500))))
+    time.sleep(0.02)
+    assert breaker.ready()
+
+    async def main():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def probe():
+            started.set()
+            await release.wait()
+            return "ok"
+
+        first = asyncio.create_task(call_through(breaker, probe))
+        await started.wait()
+        assert breaker.state == "half_open"
+        assert not breaker.ready()
+        with pytest.raises(CircuitOpenError):
+            await call_through(breaker, Flaky())
+        release.set()
+        return await first
+
+    assert run(main()) == "ok"
+    assert breaker.state == "closed"
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0.01)
+    breaker.state = "open"
+    time.sleep(0.02)
+    with pytest.raises(openai.APIStatusError):
+        run(call_through(breaker, Flaky(status_error(503))))
+    assert breaker.state == "open"
+    assert not breaker.ready()
+
+def test_cancelled_probe_frees_the_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.state = "open"
+
+    async def main():
+        task = asyncio.create_task(call_through(breaker, lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    run(main())
+    assert breaker.state == "half_open"
+    assert breaker.ready()
@@ -0,0 +1,50 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from services import tactile_binary
+from services.tactile_binary import summarize_binary_tactile
+from services.tactile_features import compute_features, round_summary
+
+def npz_bytes(**channels) -> bytes:
+    buffer = io.BytesIO()
+    np.savez(buffer, **channels)
+    return buffer.getvalue()
+
+def binary_summary(content: bytes):
+    text, info = summarize_binary_tactile(content, "features")
+    assert info["mode"] == "features"
+    return json.loads(text.split(": ", 1)[1])
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Exercise chunk boundaries without large arrays
+    monkeypatch.setattr(tactile_binary, "BINARY_CHUNK_SAMPLES", 4096)
+
+@pytest.mark.parametrize("n", [500, 50_000])
+def test_binary_features_match_in_memory(n):
+    rng = np.random.default_rng(1)
+    normal, shear = rng.random(n), rng.random(n)
+    summary = binary_summary(npz_bytes(normal=normal, shear=shear))
+    expected = round_summary(compute_features({"normal": normal, "shear": shear}))
+    for name in ("normal", "shear"):
+        for key in ("n", "mean", "std", "min", "max", "roughness", "contact_events"):
+            assert summary["channels"][name][key] == pytest.approx(expected["channels"][name][key], rel=1e-3)
+
+def test_non_finite_samples_are_dropped():
+    rng = np.random.default_rng(2)
+    normal = rng.random(20_000)
+    normal[::9] = np.nan
+    normal[5] = np.inf
+    summary = binary_summary(npz_bytes(normal=normal))
+    expected = round_summary(compute_features({"normal": normal}))
+    channel = summary["channels"]["normal"]
+    assert channel["n"] == int(np.isfinite(normal).sum())
+    for key in ("mean", "std", "min", "max", "roughness", "contact_events"):
+        assert channel[key] == pytest.approx(expected["channels"]["normal"][key], rel=1e-3)
+
+def test_all_nan_channel_is_empty():
+    summary = binary_summary(npz_bytes(normal=np.full(100, np.nan)))
+    assert summary["channels"]["normal"] == {"n": 0}
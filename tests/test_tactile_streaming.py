@@ -0,0 +1,50 @@
+import json
+
+import numpy as np
+import pytest
+
+from services.tactile_features import parse_channels
+from services.tactile_streaming import StreamingTactileParser, StreamingTactileSummary
+
+rng = np.random.default_rng(0)
+normal = rng.random(500).round(4).tolist()
+shear = rng.random(500).round(4).tolist()
+rows = rng.random((300, 3)).round(4).tolist()
+
+PAYLOADS = {
+    "channels": {"sample_rate": 500, "normal": normal, "shear": shear},
+    "units": {"sample_rate": 500, "units": ["N", "N"], "normal": normal, "shear": shear},
+    "mixed_array": {"normal": normal, "flags": [1, 2, "x", 4]},
+    "nulls": {"normal": normal[:10] + [None] + normal[10:]},
+    "rows_top_level": rows,
+    "rows_named": {"forces": rows, "normal": normal},
+    "data_rows": {"sample_rate": 250, "data": rows},
+    "data_values": {"data": normal},
+    "data_object": {"timestamps": list(range(500)), "samples": {"sample_rate": 100, "normal": normal}},
+    "records": [{"normal": n, "shear": s, "label": "a"} for n, s in zip(normal, shear)],
+    "metadata_object": {"meta": {"gain": [1, 2, 3]}, "normal": normal},
+    "ragged_rows": {"grid": [[1, 2], [3]], "normal": normal},
+}
+
+def stream(content: bytes, chunk_size: int) -> StreamingTactileSummary:
+    parser = StreamingTactileParser(StreamingTactileSummary("features"))
+    for start in range(0, len(content), chunk_size):
+        parser.feed(content[start:start + chunk_size])
+    return parser.close()
+
+@pytest.mark.parametrize("chunk_size", [7, 65536])
+@pytest.mark.parametrize("name", sorted(PAYLOADS))
+def test_streamed_json_matches_in_memory_channels(name, chunk_size):
+    content = json.dumps(PAYLOADS[name]).encode("utf-8")
+    channels, sample_rate = parse_channels(content)
+    summary = stream(content, chunk_size)
+
+    assert set(summary.channels) == set(channels)
+    assert summary.sample_rate == sample_rate
+    for channel, values in channels.items():
+        values = values[np.isfinite(values)]
+        stats = summary.channels[channel]
+        assert stats.n == values.size
+        assert stats.low == pytest.approx(values.min())
+        assert stats.high == pytest.approx(values.max())
+        assert stats.mean == pytest.approx(values.mean())